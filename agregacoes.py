@@ -0,0 +1,215 @@
+import pandas as pd
+import streamlit as st
+from pymongo.errors import OperationFailure
+
+from conexao import colecao
+from dados import (
+    INTERVALO_SINCRONIZACAO,
+    carregar_detalhes_exercicios,
+    carregar_treinos,
+    para_datetime,
+    versao_escrita,
+)
+from instrumentacao import cronometrado
+from snapshots import consultar
+
+# Métricas dos treinos calculadas em SQL no DuckDB sobre os snapshots Parquet (snapshots.py).
+# Sem snapshot utilizável, o cálculo vai para o MongoDB (só o resultado agregado trafega
+# pela rede); se o servidor não suportar algum estágio, é feito em pandas sobre a cópia local.
+
+COLUNAS_ZONAS = {
+    "Leve": "Zona Leve (min)",
+    "Intensa": "Zona Intensa (min)",
+    "Aeróbica": "Zona Aeróbica (min)",
+    "Anaeróbica": "Zona Anaeróbica (min)",
+    "VO2 Máximo": "Zona Max. VO2 (min)",
+}
+
+# "$campo" com ponto seria um caminho aninhado: "Zona Max. VO2 (min)" vai por $getField (MongoDB 5.0+;
+# antes disso a agregação falha com OperationFailure e o cálculo vai para o pandas)
+def _campo(coluna):
+    return {"$getField": coluna} if "." in coluna else f"${coluna}"
+
+
+# O intervalo de datas vira um $match sobre o índice de "Data"; o mês, um $expr
+def _filtro_periodo(data_inicio=None, data_fim=None, mes=None):
+    filtro = {}
+    if data_inicio or data_fim:
+        filtro["Data"] = {}
+        if data_inicio:
+            filtro["Data"]["$gte"] = para_datetime(data_inicio)
+        if data_fim:
+            filtro["Data"]["$lte"] = para_datetime(data_fim)
+    if mes:
+        filtro["$expr"] = {"$eq": [{"$month": "$Data"}, mes]}
+    return [{"$match": filtro}] if filtro else []
+
+
+# Mesmo filtro do _filtro_periodo, como cláusula WHERE do DuckDB
+def _where_periodo(data_inicio=None, data_fim=None, mes=None):
+    condicoes, parametros = [], []
+    if data_inicio:
+        condicoes.append('"Data" >= ?')
+        parametros.append(para_datetime(data_inicio))
+    if data_fim:
+        condicoes.append('"Data" <= ?')
+        parametros.append(para_datetime(data_fim))
+    if mes:
+        condicoes.append('month("Data") = ?')
+        parametros.append(mes)
+    return (f"WHERE {' AND '.join(condicoes)}" if condicoes else ""), parametros
+
+
+def _agregar(pipeline):
+    return list(colecao("treinos").aggregate(pipeline))
+
+
+def _treinos_pandas(data_inicio=None, data_fim=None, mes=None):
+    df = carregar_treinos(colunas=["Data", "Tempo Total (min)", "Calorias Queimadas", "Batimento Médio (bpm)"])
+    if df.empty:
+        return df
+    if data_inicio:
+        df = df[df["Data"] >= pd.Timestamp(data_inicio)]
+    if data_fim:
+        df = df[df["Data"] <= pd.Timestamp(data_fim)]
+    if mes:
+        df = df[df["Data"].dt.month == mes]
+    return df
+
+
+# Totais e médias de tempo e calorias no período
+@st.cache_data(ttl=INTERVALO_SINCRONIZACAO, show_spinner=False)
+def _estatisticas_treinos(data_inicio, data_fim, mes, versao):
+    where, parametros = _where_periodo(data_inicio, data_fim, mes)
+    resultado = consultar(f"""
+        SELECT
+            count(*) AS total,
+            sum("Tempo Total (min)")::BIGINT AS tempo_total,
+            avg("Tempo Total (min)") AS tempo_medio,
+            sum("Calorias Queimadas")::BIGINT AS calorias_total,
+            avg("Calorias Queimadas") AS calorias_media,
+            avg("Batimento Médio (bpm)") AS bpm_medio
+        FROM {{treinos}} {where}
+    """, parametros)
+    if resultado is not None:
+        # Sem linhas no período as médias vêm nulas (NaN): caem no padrão abaixo
+        estatisticas = {chave: valor for chave, valor in resultado.to_dict("records")[0].items() if pd.notna(valor)}
+    else:
+        estatisticas = _estatisticas_mongo(data_inicio, data_fim, mes)
+    padrao = {"total": 0, "tempo_total": 0, "tempo_medio": 0, "calorias_total": 0, "calorias_media": 0, "bpm_medio": 0}
+    return {chave: estatisticas.get(chave) or padrao[chave] for chave in padrao}
+
+
+def _estatisticas_mongo(data_inicio, data_fim, mes):
+    try:
+        resultado = _agregar([
+            *_filtro_periodo(data_inicio, data_fim, mes),
+            {"$group": {
+                "_id": None,
+                "total": {"$sum": 1},
+                "tempo_total": {"$sum": "$Tempo Total (min)"},
+                "tempo_medio": {"$avg": "$Tempo Total (min)"},
+                "calorias_total": {"$sum": "$Calorias Queimadas"},
+                "calorias_media": {"$avg": "$Calorias Queimadas"},
+                "bpm_medio": {"$avg": "$Batimento Médio (bpm)"},
+            }},
+        ])
+        estatisticas = resultado[0] if resultado else {}
+        estatisticas.pop("_id", None)
+    except OperationFailure:
+        df = _treinos_pandas(data_inicio, data_fim, mes)
+        estatisticas = {} if df.empty else {
+            "total": len(df),
+            "tempo_total": df["Tempo Total (min)"].sum(),
+            "tempo_medio": df["Tempo Total (min)"].mean(),
+            "calorias_total": df["Calorias Queimadas"].sum(),
+            "calorias_media": df["Calorias Queimadas"].mean(),
+            "bpm_medio": df["Batimento Médio (bpm)"].mean(),
+        }
+    return estatisticas
+
+
+# Minutos totais em cada zona de esforço
+@st.cache_data(ttl=INTERVALO_SINCRONIZACAO, show_spinner=False)
+def _tempo_por_zona(versao):
+    somas = ", ".join(f'sum("{coluna}")::BIGINT AS "{zona}"' for zona, coluna in COLUNAS_ZONAS.items())
+    resultado = consultar(f"SELECT {somas} FROM {{treinos}}")
+    if resultado is not None:
+        return {zona: int(valor) if pd.notna(valor) else 0 for zona, valor in resultado.to_dict("records")[0].items()}
+    try:
+        resultado = _agregar([
+            {"$group": {"_id": None, **{zona: {"$sum": _campo(coluna)} for zona, coluna in COLUNAS_ZONAS.items()}}},
+        ])
+        totais = resultado[0] if resultado else {}
+    except OperationFailure:
+        df = carregar_treinos(colunas=list(COLUNAS_ZONAS.values()))
+        totais = {zona: df[coluna].sum() for zona, coluna in COLUNAS_ZONAS.items() if coluna in df.columns}
+    return {zona: totais.get(zona, 0) for zona in COLUNAS_ZONAS}
+
+
+# Quantidade de treinos por "Tipo de Treino", do mais frequente ao menos frequente
+@st.cache_data(ttl=INTERVALO_SINCRONIZACAO, show_spinner=False)
+def _frequencia_por_tipo(versao):
+    resultado = consultar("""
+        SELECT "Tipo de Treino", count(*) AS "Frequência"
+        FROM {treinos}
+        GROUP BY "Tipo de Treino"
+        ORDER BY "Frequência" DESC
+    """)
+    if resultado is not None:
+        return resultado.set_index("Tipo de Treino")["Frequência"]
+    try:
+        resultado = _agregar([
+            {"$group": {"_id": "$Tipo de Treino", "Frequência": {"$sum": 1}}},
+            {"$sort": {"Frequência": -1}},
+        ])
+        return pd.Series(
+            [doc["Frequência"] for doc in resultado],
+            index=pd.Index([doc["_id"] for doc in resultado], name="Tipo de Treino"),
+            name="Frequência",
+        )
+    except OperationFailure:
+        df = carregar_treinos(colunas=["Tipo de Treino"])
+        if df.empty:
+            return pd.Series(dtype="int64", name="Frequência")
+        return df["Tipo de Treino"].astype(str).value_counts().rename("Frequência")
+
+
+# As funções públicas passam a versão de escrita dos treinos como chave de cache,
+# então um treino salvo pelo app aparece na hora, sem esperar o TTL.
+@cronometrado("agregacao")
+def estatisticas_treinos(data_inicio=None, data_fim=None, mes=None):
+    return _estatisticas_treinos(data_inicio, data_fim, mes, versao_escrita("treinos"))
+
+
+@cronometrado("agregacao")
+def tempo_por_zona():
+    return _tempo_por_zona(versao_escrita("treinos"))
+
+
+@cronometrado("agregacao")
+def frequencia_por_tipo():
+    return _frequencia_por_tipo(versao_escrita("treinos"))
+
+
+# Volume por grupo muscular, só com exercícios do catálogo: a soma exata das séries nos
+# registros por série, peso x repetições x séries nos antigos. Partições gravadas antes da
+# coluna "volume" existir a leem como NULL e caem na estimativa.
+@st.cache_data(ttl=INTERVALO_SINCRONIZACAO, show_spinner=False)
+def _volume_por_musculo(versao_registros, versao_exercicios):
+    resultado = consultar("""
+        SELECT musculo, sum(coalesce(volume, "Peso (kg)" * "Repetições" * series)) AS volume_total
+        FROM {detalhes_exercicios}
+        WHERE coalesce(volume, "Peso (kg)" * "Repetições" * series) IS NOT NULL AND musculo IS NOT NULL
+        GROUP BY musculo
+        ORDER BY musculo
+    """)
+    if resultado is not None:
+        return resultado
+    df = carregar_detalhes_exercicios().dropna(subset=["volume", "musculo"])
+    return df.groupby("musculo", observed=True)["volume"].sum().rename("volume_total").reset_index()
+
+
+@cronometrado("agregacao")
+def volume_por_musculo():
+    return _volume_por_musculo(versao_escrita("registros_exercicios"), versao_escrita("exercicios"))
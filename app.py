@@ -1,20 +1,44 @@
 import streamlit as st
-from pymongo import MongoClient
-from datetime import datetime
+from datetime import datetime, timedelta
 import pandas as pd
 import plotly.express as px
-import pytesseract
-from PIL import Image
-import holidays
-import os
-import sweetviz as sv
-import streamlit.components.v1 as components
-import requests
-
-
-# Configuração do pytesseract
-pytesseract.pytesseract.tesseract_cmd = r"C:\\Program Files\\Tesseract-OCR\\tesseract.exe"
-os.environ["TESSDATA_PREFIX"] = r"C:\Program Files\Tesseract-OCR"
+from pymongo.errors import PyMongoError
+import repositorios
+from conexao import ARMAZENAMENTO, ARQUIVO_LOCAL, estatisticas_pool
+from dados import (
+    criar_indices,
+    para_datetime,
+    converter_datas,
+    versao_dados,
+    limites_datas,
+    carregar_treinos,
+    carregar_dados,
+    series_do_exercicio,
+)
+from agregacoes import estatisticas_treinos, tempo_por_zona, frequencia_por_tipo, volume_por_musculo
+from rollups import garantir_rollups, ler_rollups
+from carga_treino import garantir_carga, ler_carga
+from recordes import (
+    DIAS_RECORDES_RECENTES,
+    METRICAS,
+    garantir_recordes,
+    ler_recordes,
+    progressao_recordes,
+    recorde,
+    recordes_recentes,
+)
+from snapshots import CONJUNTOS, garantir_snapshots
+from dias_uteis import SUBDIVISAO_PADRAO, SUBDIVISOES, calcular_dias_uteis
+from graficos import exibir, periodo_para, reduzir, rotular
+from instrumentacao import (
+    METRICAS_PORTA,
+    acumulado,
+    exportar_prometheus,
+    finalizar_rerun,
+    iniciar_rerun,
+    iniciar_servidor_metricas,
+    medir,
+)
 
 # Configuração de página
 st.set_page_config(
@@ -22,78 +46,33 @@ st.set_page_config(
     layout="wide",
     initial_sidebar_state="expanded",
 )
+# Tempo deste rerun por etapa (painel "Performance" no fim do script)
+iniciar_rerun()
 
 # Título do app
 st.title("Dashboard de Treinos")
 
-# Conexão com o MongoDB
-mongo_url = os.getenv("MONGO_URL") #Para o Deploy
-client = MongoClient(mongo_url)
-db = client['dashboard_db']
-treinos_collection = db['treinos']
-medidas_collection = db['medidas']
-exercicios_collection = db['exercicios']
-registros_exercicios_collection = db['registros_exercicios']
-condicoes_treino_collection = db['condicoes_treino']
-
-# Funções para carregar dados
-# Funções para carregar dados
-def carregar_treinos():
-    dados = list(treinos_collection.find({}, {"_id": 0}))
-    return pd.DataFrame(dados)
-
-def carregar_medidas():
-    dados = list(medidas_collection.find({}, {"_id": 0}))
-    return pd.DataFrame(dados)
-
-def carregar_exercicios():
-    dados = list(exercicios_collection.find({}))
-    return pd.DataFrame(dados)
-
-# Função para calcular dias úteis
-def calcular_dias_uteis(data_inicial, data_final):
-    feriados_brasil = holidays.BR(years=range(data_inicial.year, data_final.year + 1), subdiv="SP")
-    dias_uteis = pd.date_range(start=data_inicial, end=data_final, freq='B')
-    return len([dia for dia in dias_uteis if dia not in feriados_brasil])
-
-# Função para processar imagem
-def processar_imagem(imagem):
-    texto = pytesseract.image_to_string(imagem, lang="por")
-    dados = {
-        "bpm_medio": None,
-        "bpm_max": None,
-        "calorias": None,
-        "tempo_total": None,
-    }
-    for linha in texto.splitlines():
-        if "Média de frequência cardíaca" in linha:
-            dados["bpm_medio"] = int(linha.split()[0])
-        elif "BPM máximo" in linha:
-            dados["bpm_max"] = int(linha.split()[0])
-        elif "Queimou" in linha:
-            dados["calorias"] = int(linha.split()[0])
-        elif "Tempo total" in linha:
-            tempo = linha.split()[0].split(":")
-            dados["tempo_total"] = int(tempo[0]) * 60 + int(tempo[1])
-    return dados
-
-# Função para carregar as condições de treino
-def carregar_condicoes():
-    dados = list(condicoes_treino_collection.find({}))  # Certifique-se de que a coleção existe
-    return pd.DataFrame(dados)
-
-# Função para carregar registros de exercícios
-def carregar_registros_exercicios():
-    """
-    Carrega os registros de exercícios da coleção 'registros_exercicios' no MongoDB.
-    """
-    dados = list(registros_exercicios_collection.find({}, {"_id": 0}))
-    return dados
-
-def carregar_medidas():
-    medidas_collection = db['medidas']  # Certifique-se de que a coleção 'medidas' existe no MongoDB
-    dados = list(medidas_collection.find({}, {"_id": 0}))
-    return pd.DataFrame(dados)
+# Coleções do MongoDB
+try:
+    criar_indices()
+    garantir_rollups()
+    garantir_carga()
+    garantir_recordes()
+except PyMongoError:
+    # As análises seguem com os snapshots Parquet (snapshots.py); os formulários não gravam
+    st.warning("MongoDB indisponível: as análises usam o último snapshot salvo.")
+
+if ARMAZENAMENTO == "local":
+    st.sidebar.caption(f"💾 Armazenamento local: {ARQUIVO_LOCAL}")
+else:
+    # Estado do pool de conexões compartilhado (útil para dimensionar MONGO_MAX_POOL)
+    with st.sidebar.expander("🔌 Conexões MongoDB"):
+        st.json(estatisticas_pool())
+
+# Endpoint /metrics no formato do Prometheus, um por processo
+if METRICAS_PORTA:
+    iniciar_servidor_metricas(METRICAS_PORTA, estatisticas_pool)
+st.sidebar.toggle("⏱️ Performance", key="desempenho", help="Tempo gasto em cada etapa deste rerun")
 
 # Define DE:PARA para tipos de treino
 de_para = {
@@ -105,27 +84,102 @@ de_para = {
     "Aeróbico": "Treino F - Aeróbico"
 }
 
-# Dashboard Tabs
-abas = st.tabs([
-    "Adicionar Treino", "Registrar Exercícios", "Adicionar Medidas", 
-    "Análise de Treinos", "Meta Anual e Assiduidade",
-    "Medidas Corporais", "Indicadores de Treinos"
-])
+# Páginas do dashboard e os conjuntos de dados que cada uma usa (ver dados.CARREGADORES),
+# com as colunas necessárias (None = todas). Só a página escolhida roda a cada interação:
+# as outras não consultam o banco nem montam gráficos.
+PAGINAS = {
+    "Adicionar Treino": {},
+    "Registrar Exercícios": {},
+    "Adicionar Medidas": {},
+    "Análise de Treinos": {},
+    "Meta Anual e Assiduidade": {},
+    "Medidas Corporais": {"medidas": None},
+    "Indicadores de Treinos": {
+        "medidas": ["Data", "Peso (kg)", "Tórax (cm)", "Cintura (cm)", "Abdômen (cm)", "Quadril (cm)"],
+        "treinos": ["Data", "Calorias Queimadas"],
+    },
+    "Relatório de Perfil": {"treinos": None},
+}
+
+# A página escolhida fica na URL (?pagina=...), para recarregar ou compartilhar o link
+if "pagina" not in st.session_state:
+    pagina_url = st.query_params.get("pagina")
+    st.session_state.pagina = pagina_url if pagina_url in PAGINAS else next(iter(PAGINAS))
+pagina = st.sidebar.radio("Página", options=list(PAGINAS), key="pagina")
+st.query_params["pagina"] = pagina
+# Snapshots Parquet dos conjuntos da página em dia: são a fonte se o MongoDB cair
+garantir_snapshots(*[nome for nome in PAGINAS[pagina] if nome in CONJUNTOS])
+dados_pagina = carregar_dados(PAGINAS[pagina])
 
 # Aba 1: Adicionar Treino
-with abas[0]:
+if pagina == "Adicionar Treino":
     st.header("📋 Adicionar Novo Treino")
-    imagem = st.file_uploader("Carregar Relatório do Relógio (Imagem)", type=["jpg", "jpeg", "png"])
+    imagens = st.file_uploader(
+        "Carregar Relatório do Relógio (Imagem)",
+        type=["jpg", "jpeg", "png"],
+        accept_multiple_files=True,
+    )
     dados_extraidos = {}
-    if imagem:
-        imagem_pil = Image.open(imagem)
-        st.image(imagem_pil, caption="Imagem Carregada", use_container_width=True)
-        dados_extraidos = processar_imagem(imagem_pil)
-        st.success("Dados extraídos da imagem com sucesso!")
+    if imagens:
+        # Importado só quando há imagens: pytesseract/PIL ficam fora da inicialização
+        from ocr import fila_ocr
+
+        # OCR em paralelo num pool de processos; imagens já lidas vêm direto do cache
+        progresso = st.progress(0.0, text="Extraindo dados das imagens...")
+        with medir("OCR", "ocr"):
+            resultados = fila_ocr().processar_lote(
+                [imagem.getvalue() for imagem in imagens],
+                ao_concluir=lambda concluidas, total: progresso.progress(concluidas / total, text=f"Imagens processadas: {concluidas}/{total}"),
+            )
+        progresso.empty()
+
+        if len(imagens) > 1:
+            st.dataframe(pd.DataFrame([
+                {"Imagem": imagem.name, **(resultado if isinstance(resultado, dict) else {"erro": str(resultado)})}
+                for imagem, resultado in zip(imagens, resultados)
+            ]))
+        indice = 0
+        if len(imagens) > 1:
+            indice = st.selectbox(
+                "Imagem usada para preencher o formulário",
+                options=range(len(imagens)),
+                format_func=lambda i: imagens[i].name,
+            )
+
+        st.image(imagens[indice], caption="Imagem Carregada", use_container_width=True)
+        if isinstance(resultados[indice], dict):
+            dados_extraidos = {campo: valor for campo, valor in resultados[indice].items() if valor is not None}
+            st.success("Dados extraídos da imagem com sucesso!")
+        else:
+            st.error(f"Não foi possível extrair os dados da imagem: {resultados[indice]}")
+
+    # Arquivo bruto do relógio: zonas, FC, duração e calorias calculadas da série de FC
+    arquivo_relogio = st.file_uploader(
+        "Ou carregar o arquivo do treino (FIT, TCX ou GPX)",
+        type=["fit", "tcx", "gpx", "gz"],
+    )
+    serie_fc = None
+    if arquivo_relogio:
+        from arquivos_relogio import ler_arquivo
+
+        # Peso mais recente para as calorias (quando o arquivo não traz as do relógio)
+        df_peso = repositorios.medidas.listar(["Data", "Peso (kg)"])
+        pesos = df_peso.sort_values("Data")["Peso (kg)"].dropna() if "Peso (kg)" in df_peso else pd.Series(dtype="float64")
+        try:
+            with medir("arquivo do relógio", "arquivo"):
+                resumo_arquivo, segundos_fc, bpm_fc = ler_arquivo(
+                    arquivo_relogio.getvalue(), arquivo_relogio.name, float(pesos.iloc[-1]) if not pesos.empty else None
+                )
+        except ValueError as erro:
+            st.error(f"Não foi possível ler o arquivo: {erro}")
+        else:
+            serie_fc = (segundos_fc, bpm_fc)
+            dados_extraidos.update({campo: valor for campo, valor in resumo_arquivo.items() if campo not in ("amostras", "formato")})
+            st.success(f"Arquivo lido: {resumo_arquivo['amostras']} amostras de FC a partir de {resumo_arquivo['data']:%d/%m/%Y %H:%M}.")
 
     # Preencher os campos automaticamente, se os dados foram extraídos
     with st.form("form_treino"):
-        data = st.date_input("Data do treino", value=datetime.now())
+        data = st.date_input("Data do treino", value=dados_extraidos.get("data", datetime.now()))
         tipo_treino = st.selectbox(
             "Tipo de Treino",
             ["Posterior, Glúteos e Adutores", "Quadríceps, Glúteos e Panturrilhas", "Peito, Ombro e Tríceps", "Costas e Bíceps", "Core + HIIT", "Aeróbico", "Outro"]
@@ -134,11 +188,11 @@ with abas[0]:
         calorias = st.number_input("Calorias Queimadas", min_value=0, step=1, value=dados_extraidos.get("calorias", 0))
         bpm_medio = st.number_input("Batimento Médio (bpm)", min_value=0, step=1, value=dados_extraidos.get("bpm_medio", 0))
         bpm_max = st.number_input("Batimento Máximo (bpm)", min_value=0, step=1, value=dados_extraidos.get("bpm_max", 0))
-        zona_leve = st.number_input("Zona Leve (min)", min_value=0, step=1)
-        zona_intensa = st.number_input("Zona Intensa (min)", min_value=0, step=1)
-        zona_aerobica = st.number_input("Zona Aeróbica (min)", min_value=0, step=1)
-        zona_anaerobica = st.number_input("Zona Anaeróbica (min)", min_value=0, step=1)
-        zona_maxvo = st.number_input("Zona Max. VO2 (min)", min_value=0, step=1)
+        zona_leve = st.number_input("Zona Leve (min)", min_value=0, step=1, value=dados_extraidos.get("zona_leve", 0))
+        zona_intensa = st.number_input("Zona Intensa (min)", min_value=0, step=1, value=dados_extraidos.get("zona_intensa", 0))
+        zona_aerobica = st.number_input("Zona Aeróbica (min)", min_value=0, step=1, value=dados_extraidos.get("zona_aerobica", 0))
+        zona_anaerobica = st.number_input("Zona Anaeróbica (min)", min_value=0, step=1, value=dados_extraidos.get("zona_anaerobica", 0))
+        zona_maxvo = st.number_input("Zona Max. VO2 (min)", min_value=0, step=1, value=dados_extraidos.get("zona_maxvo", 0))
         mobilidade = st.number_input("Mobilidade (min)", min_value=0, step=1)
         aerobico = st.number_input("Aeróbico (min)", min_value=0, step=1)
         comentarios = st.text_area("Comentários sobre o treino")
@@ -170,7 +224,7 @@ with abas[0]:
                 st.error(f"Os seguintes campos estão incompletos: {', '.join(campos_vazios)}")
             else:
                 novo_treino = {
-                    "Data": data.strftime("%d/%m/%Y"),
+                    "Data": para_datetime(data),
                     "Tipo de Treino": tipo_treino,
                     "Tempo Total (min)": duracao,
                     "Calorias Queimadas": calorias,
@@ -185,39 +239,46 @@ with abas[0]:
                     "Aeróbico (min)": aerobico,
                     "Comentários": comentarios
                 }
-                treinos_collection.insert_one(novo_treino)
-                st.success("Treino salvo com sucesso!")
-
-        if submit_button:
-            novo_treino = {
-                "Data": data.strftime("%d/%m/%Y"),
-                "Tipo de Treino": tipo_treino,
-                "Tempo Total (min)": duracao,
-                "Calorias Queimadas": calorias,
-                "Batimento Médio (bpm)": bpm_medio,
-                "Batimento Máximo (bpm)": bpm_max,
-                "Zona Leve (min)": zona_leve,
-                "Zona Intensa (min)": zona_intensa,
-                "Zona Aeróbica (min)": zona_aerobica,
-                "Zona Anaeróbica (min)": zona_anaerobica,
-                "Zona Max. VO2 (min)": zona_maxvo,
-                "Mobilidade (min)": mobilidade,
-                "Aeróbico (min)": aerobico,
-                "Comentários": comentarios
-            }
-            treinos_collection.insert_one(novo_treino)
-            st.success("Treino salvo com sucesso!")
+                # Um treino por data e tipo: reenviar o formulário atualiza o já salvo. A série
+                # de FC do arquivo vai junto (gráfico na aba de análise)
+                gravacao = repositorios.treinos.salvar(novo_treino, serie_fc)
+                if gravacao.situacao == repositorios.INSERIDO:
+                    st.success("Treino salvo com sucesso!")
+                elif gravacao.situacao == repositorios.ATUALIZADO:
+                    st.success("Treino desta data e tipo atualizado com sucesso!")
+                else:
+                    st.info("Este treino já estava salvo.")
+
+    # Importação do histórico (exportações do relógio)
+    with st.expander("📥 Importar histórico de treinos (CSV, Parquet ou JSON)"):
+        arquivo_historico = st.file_uploader("Arquivo de exportação", type=["csv", "parquet", "json", "jsonl"])
+        if arquivo_historico and st.button("Importar treinos"):
+            from importar_treinos import importar
+
+            status = st.empty()
+            totais = importar(
+                arquivo_historico,
+                ao_concluir_lote=lambda parcial: status.info(
+                    f"Inseridos: {parcial['inseridos']} | Atualizados: {parcial['atualizados']} | "
+                    f"Inválidos: {parcial['invalidos']} | Repetidos: {parcial['duplicados']}"
+                ),
+            )
+            status.success(
+                f"Importação concluída: {totais['inseridos']} inseridos, "
+                f"{totais['atualizados']} atualizados, {totais['invalidos']} linhas inválidas ignoradas, "
+                f"{totais['duplicados']} linhas repetidas (Data e Tipo de Treino) substituídas pela última."
+            )
 
 # Aba 2: Registrar Exercícios
 # Registrar Exercícios
-with abas[1]:
+if pagina == "Registrar Exercícios":
     st.header("🏋️‍♀️ Registrar Exercícios")
     st.subheader("Selecione o Treino e Registre os Detalhes")
 
-    # Carrega os exercícios do banco de dados
-    df_exercicios = carregar_exercicios()
+    # Catálogo indexado por dia do treino, refeito só quando o catálogo muda
+    catalogo = repositorios.exercicios.catalogo()
 
-    if not df_exercicios.empty:
+    if catalogo.por_nome:
         # Ajuste no dropdown para usar os valores corretos
         tipo_treino = st.selectbox(
             "Selecione o Tipo de Treino",
@@ -230,43 +291,67 @@ with abas[1]:
             ]
         )
 
-        # Filtrar exercícios com base no dia_do_treino
-        exercicios_filtrados = df_exercicios[df_exercicios["dia_do_treino"] == tipo_treino]
+        exercicios_filtrados = catalogo.por_dia.get(tipo_treino)
 
-        if not exercicios_filtrados.empty:
+        if exercicios_filtrados is not None:
             st.write(f"Exercícios para o treino: {tipo_treino}")
             st.dataframe(exercicios_filtrados)
             with st.form("form_exercicios"):
                 # Entrada para selecionar a data do treino
                 data_treino = st.date_input("Data do Treino", value=datetime.now())
-                
+                st.caption("Preencha repetições e peso de cada série feita; séries com 0 repetições não são salvas.")
+
                 registros = []
-                for _, row in exercicios_filtrados.iterrows():
-                    repeticoes = st.number_input(f"Repetições - {row['nome']}", min_value=0, step=1)
-                    peso = st.number_input(f"Peso (kg) - {row['nome']}", min_value=0.0, step=0.1)
-                    registros.append({
-                        "Exercício": row["nome"], 
-                        "Repetições": repeticoes, 
-                        "Peso (kg)": peso,
-                        "Data": data_treino.strftime("%Y-%m-%d")  # Formatar a data como string
-                    })
+                for exercicio in exercicios_filtrados.to_dict("records"):
+                    nome = exercicio["nome"]
+                    series = series_do_exercicio(exercicio)
+                    st.markdown(f"**{nome}** · {series} séries")
+                    recordes_exercicio = recorde(nome)
+                    if recordes_exercicio and recordes_exercicio.get("peso_max") is not None:
+                        st.caption(
+                            f"🏆 Recorde: {recordes_exercicio['peso_max']:g} kg"
+                            + (f" · 1RM estimado {recordes_exercicio['e1rm_epley']:g} kg" if recordes_exercicio.get("e1rm_epley") else "")
+                        )
+                    repeticoes, pesos = [], []
+                    for numero, coluna in enumerate(st.columns(series), start=1):
+                        repeticoes.append(coluna.number_input(
+                            f"Repetições ({numero}ª)", min_value=0, step=1, key=f"repeticoes-{nome}-{numero}"
+                        ))
+                        pesos.append(coluna.number_input(
+                            f"Peso kg ({numero}ª)", min_value=0.0, step=0.1, key=f"peso-{nome}-{numero}"
+                        ))
+                    # Uma posição por série feita, nas duas listas
+                    feitas = [indice for indice, valor in enumerate(repeticoes) if valor > 0]
+                    if feitas:
+                        registros.append({
+                            "Exercício": nome,
+                            "Repetições": [repeticoes[indice] for indice in feitas],
+                            "Peso (kg)": [pesos[indice] for indice in feitas],
+                            "Data": para_datetime(data_treino)
+                        })
 
                 submit_exercicio = st.form_submit_button("Salvar Exercícios")
                 if submit_exercicio:
-                    registros_exercicios_collection.insert_one({
-                        "Treino": tipo_treino,
-                        "Data do Registro": data_treino.strftime("%Y-%m-%d"),
-                        "Detalhes": registros
-                    })
-                    st.success("Exercícios registrados com sucesso!")
+                    if registros:
+                        repositorios.registros.inserir({
+                            "Treino": tipo_treino,
+                            "Data do Registro": para_datetime(data_treino),
+                            "Detalhes": registros
+                        })
+                        st.success("Exercícios registrados com sucesso!")
+                        # Recordes batidos na data do treino, já com este registro
+                        for evento in recordes_recentes(para_datetime(data_treino), para_datetime(data_treino)):
+                            st.success(f"🏅 Novo recorde! {evento['descricao']}")
+                    else:
+                        st.warning("Nenhuma série preenchida: informe as repetições de pelo menos uma série.")
         else:
             st.warning(f"Nenhum exercício encontrado para o treino selecionado: {tipo_treino}.")
     else:
         st.warning("Nenhum exercício disponível no banco de dados.")
 
 # Aba 3: Adicionar Medidas Corporais
-with abas[2]:
-    st.header("📏 Adicionar Medidas Corporais e Condições do Treino")
+if pagina == "Adicionar Medidas":
+    st.header("📏 Adicionar Medidas Corporais")
     with st.form("form_medidas"):
         # Medidas Corporais
         st.subheader("📐 Medidas Corporais")
@@ -283,12 +368,7 @@ with abas[2]:
         panturrilha_direita = st.number_input("Panturrilha Direita (cm)", min_value=0.0, step=0.1)
         panturrilha_esquerda = st.number_input("Panturrilha Esquerda (cm)", min_value=0.0, step=0.1)
         observacoes = st.text_area("Observações sobre as medidas")
-
-        # Condições do Treino
-        st.subheader("💪 Condições do Treino")
-        tsb = st.number_input("TSB (Forma de Treinamento)", min_value=0.0, step=0.1)
-        fadiga = st.number_input("Fadiga (ATL)", min_value=0.0, step=0.1)
-        condicao_fisica = st.number_input("Condição Física (CTL)", min_value=0.0, step=0.1)
+        st.caption("💪 TSB, Fadiga (ATL) e Condição Física (CTL) são calculados a partir dos treinos (Indicadores de Treinos).")
 
         # Botão de submissão
         submit_button = st.form_submit_button(label="Salvar Dados")
@@ -300,7 +380,7 @@ with abas[2]:
 
             # Salvar medidas corporais
             nova_medida = {
-                "Data": data.strftime("%Y-%m-%d"),
+                "Data": para_datetime(data),
                 "Peso (kg)": substitui_zero_por_none(peso),
                 "Tórax (cm)": substitui_zero_por_none(torax),
                 "Cintura (cm)": substitui_zero_por_none(cintura),
@@ -314,30 +394,24 @@ with abas[2]:
                 "Panturrilha Esquerda (cm)": substitui_zero_por_none(panturrilha_esquerda),
                 "Observações": observacoes
             }
-            medidas_collection.insert_one(nova_medida)
-
-            # Salvar condições do treino
-            nova_condicao = {
-                "Data": data.strftime("%Y-%m-%d"),
-                "TSB": substitui_zero_por_none(tsb),
-                "Fadiga (ATL)": substitui_zero_por_none(fadiga),
-                "Condição Física (CTL)": substitui_zero_por_none(condicao_fisica)
-            }
-            condicoes_treino_collection.insert_one(nova_condicao)
+            # Uma medida por data: salvar de novo no mesmo dia substitui a anterior
+            gravacao = repositorios.medidas.salvar(nova_medida)
 
-            st.success("Dados salvos com sucesso!")
+            if gravacao.situacao == repositorios.INSERIDO:
+                st.success("Dados salvos com sucesso!")
+            elif gravacao.situacao == repositorios.ATUALIZADO:
+                st.success("Medidas desta data atualizadas com sucesso!")
+            else:
+                st.info("Estas medidas já estavam salvas.")
 
 # Aba 4: Análise e Progresso
-with abas[3]:
+if pagina == "Análise de Treinos":
     st.header("📊 Análise e Progresso")
 
-    # Carregar treinos
-    df_treinos = carregar_treinos()
-
-    if not df_treinos.empty:
-        # Converte a coluna de data para datetime
-        df_treinos["Data"] = pd.to_datetime(df_treinos["Data"], format="%d/%m/%Y")
+    # Primeira e última data de treino, lidas pelo índice de "Data"
+    data_minima, data_maxima = limites_datas("treinos")
 
+    if data_minima is not None:
         # Seção de Filtros
         st.subheader("📅 Filtros de Período")
         col1, col2 = st.columns(2)
@@ -347,9 +421,9 @@ with abas[3]:
             st.write("Selecionar período:")
             data_inicio, data_fim = st.date_input(
                 "Selecione o intervalo",
-                value=(df_treinos["Data"].min(), df_treinos["Data"].max()),
-                min_value=df_treinos["Data"].min(),
-                max_value=df_treinos["Data"].max(),
+                value=(data_minima, data_maxima),
+                min_value=data_minima,
+                max_value=data_maxima,
             )
 
         # Filtro por mês
@@ -357,19 +431,10 @@ with abas[3]:
             st.write("Filtrar por mês:")
             mes_selecionado = st.selectbox(
                 "Selecione o mês:",
-                options=["Todos os meses"] + list(df_treinos["Data"].dt.strftime("%B").unique()),
+                options=["Todos os meses"] + list(pd.date_range(data_minima.replace(day=1), data_maxima, freq="MS").strftime("%B").unique()),
             )
 
-        # Aplica os filtros
-        df_filtrado = df_treinos.copy()
-        if data_inicio and data_fim:
-            df_filtrado = df_filtrado[(df_filtrado["Data"] >= pd.Timestamp(data_inicio)) & (df_filtrado["Data"] <= pd.Timestamp(data_fim))]
-
-        if mes_selecionado and mes_selecionado != "Todos os meses":
-            mes_index = pd.Timestamp(datetime.strptime(mes_selecionado, "%B")).month
-            df_filtrado = df_filtrado[df_filtrado["Data"].dt.month == mes_index]
-
-        # Reorganizar as colunas antes de exibir
+        # Colunas exibidas, na ordem da tabela
         colunas_ordenadas = [
             "Data",  # Primeira coluna
             "Tipo de Treino",
@@ -386,81 +451,116 @@ with abas[3]:
             "Aeróbico (min)",
             "Comentários"
         ]
+
+        # Aplica os filtros (o período é uma consulta por intervalo no índice de "Data",
+        # trazendo do banco só as colunas exibidas)
+        df_filtrado = carregar_treinos(data_inicio, data_fim, colunas=colunas_ordenadas)
+
+        mes_index = None
+        if mes_selecionado and mes_selecionado != "Todos os meses":
+            mes_index = pd.Timestamp(datetime.strptime(mes_selecionado, "%B")).month
+            df_filtrado = df_filtrado[df_filtrado["Data"].dt.month == mes_index]
+
         colunas_ordenadas = [col for col in colunas_ordenadas if col in df_filtrado.columns]
         df_reordenado = df_filtrado[colunas_ordenadas]
 
         # Exibir DataFrame filtrado e reordenado
         st.dataframe(df_reordenado)
 
-        # Estatísticas gerais com base no filtro
+        # Estatísticas gerais com base no filtro (agregadas no MongoDB)
         st.subheader("📈 Estatísticas Gerais")
+        estatisticas = estatisticas_treinos(
+            data_inicio if data_inicio and data_fim else None,
+            data_fim if data_inicio and data_fim else None,
+            mes_index,
+        )
         col1, col2, col3 = st.columns(3)
 
         with col1:
-            st.metric("Total de Treinos", len(df_filtrado))
+            st.metric("Total de Treinos", estatisticas["total"])
 
         with col2:
-            st.metric("Tempo Total de Treino (min)", df_filtrado["Tempo Total (min)"].sum())
-            st.metric("Tempo Médio de Treino (min)", df_filtrado["Tempo Total (min)"].mean().astype(int) if len(df_filtrado) > 0 else 0)
+            st.metric("Tempo Total de Treino (min)", estatisticas["tempo_total"])
+            st.metric("Tempo Médio de Treino (min)", int(estatisticas["tempo_medio"]))
 
         with col3:
-            st.metric("Total de Calorias Queimadas", df_filtrado["Calorias Queimadas"].sum())
-            st.metric("Média de Calorias por Treino", df_filtrado["Calorias Queimadas"].mean().astype(int) if len(df_filtrado) > 0 else 0)
+            st.metric("Total de Calorias Queimadas", estatisticas["calorias_total"])
+            st.metric("Média de Calorias por Treino", int(estatisticas["calorias_media"]))
 
         # Gráficos de Progresso
         st.subheader("📊 Gráficos de Progresso")
 
-        # Calorias acumuladas por dia
-        calorias_acumuladas = df_treinos.groupby(df_treinos["Data"].dt.date)["Calorias Queimadas"].sum().reset_index()
-        calorias_acumuladas.columns = ["Data", "Calorias Queimadas"]
-        fig_calorias = px.bar(
-            calorias_acumuladas, 
-            x="Data", 
-            y="Calorias Queimadas", 
-            title="Calorias Queimadas",
-            text="Calorias Queimadas"  # Adiciona o texto
+        # Calorias e tempo por dia, semana ou mês conforme o período escolhido (totais
+        # pré-calculados em treinos_rollups), com no máximo graficos.BARRAS_MAXIMAS barras
+        periodo, inicio_periodo = periodo_para(data_inicio, data_fim)
+        por_periodo = {"dia": "por dia", "semana": "por semana", "mes": "por mês"}[periodo]
+        df_totais = ler_rollups(periodo, inicio_periodo, data_fim).rename(
+            columns={"inicio": "Data", "calorias": "Calorias Queimadas", "minutos": "Tempo Total (min)"}
         )
-        fig_calorias.update_traces(
-            textposition="outside",  # Posição do texto acima da barra
-            texttemplate="%{text}"  # Exibe o valor no formato padrão
-        )
-        st.plotly_chart(fig_calorias, use_container_width=True)
-
-        # Tempo de treino acumulado por dia
-        tempo_acumulado = df_treinos.groupby(df_treinos["Data"].dt.date)["Tempo Total (min)"].sum().reset_index()
-        tempo_acumulado.columns = ["Data", "Tempo Total (min)"]
-        fig_tempo = px.bar(
-            tempo_acumulado, 
-            x="Data", 
-            y="Tempo Total (min)", 
-            title="Tempo Gasto",
-            text="Tempo Total (min)"  # Adiciona o texto
-        )
-        fig_tempo.update_traces(
-            textposition="outside",  # Posição do texto acima da barra
-            texttemplate="%{text}"  # Exibe o valor no formato padrão
-        )
-        st.plotly_chart(fig_tempo, use_container_width=True)
+
+        def figura_calorias():
+            fig_calorias = px.bar(df_totais, x="Data", y="Calorias Queimadas", title=f"Calorias Queimadas {por_periodo}")
+            return rotular(fig_calorias, len(df_totais), "%{y:.0f}", barras=True)
+
+        def figura_tempo():
+            fig_tempo = px.bar(df_totais, x="Data", y="Tempo Total (min)", title=f"Tempo Gasto {por_periodo}")
+            return rotular(fig_tempo, len(df_totais), "%{y:.0f}", barras=True)
+
+        filtros = (periodo, inicio_periodo, data_fim)
+        exibir("calorias", versao_dados("treinos"), filtros, figura_calorias)
+        exibir("tempo", versao_dados("treinos"), filtros, figura_tempo)
+
+        # FC amostra a amostra dos treinos do período carregados de arquivo (FIT, TCX ou GPX)
+        from arquivos_relogio import NOMES_ZONAS, ler_serie, limites_zonas, listar_series
+
+        series_fc = listar_series(data_inicio, data_fim)
+        if series_fc is None:
+            st.caption("🫀 MongoDB indisponível: as séries de frequência cardíaca não estão nos snapshots.")
+        elif not series_fc.empty:
+            st.subheader("🫀 Frequência Cardíaca do Treino")
+            rotulos_series = {
+                linha["_id"]: f"{linha['inicio']:%d/%m/%Y %H:%M} - {linha['Tipo de Treino']}"
+                for linha in series_fc.to_dict("records")
+            }
+            serie_id = st.selectbox("Treino", options=list(rotulos_series), format_func=rotulos_series.get)
+
+            def figura_fc():
+                serie = reduzir(ler_serie(serie_id), "Tempo", "Batimento (bpm)")
+                fig_fc = px.line(serie, x="Tempo", y="Batimento (bpm)", title=f"Frequência Cardíaca: {rotulos_series[serie_id]}")
+                # Faixas das zonas de FC, da Leve à VO2 Máximo
+                limites = [0, *limites_zonas(), 250]
+                cores = ["#9e9e9e", "#2196f3", "#4caf50", "#ff9800", "#f44336"]
+                for nome, cor, baixo, alto in zip(NOMES_ZONAS, cores, limites, limites[1:]):
+                    fig_fc.add_hrect(y0=baixo, y1=alto, fillcolor=cor, opacity=0.1, line_width=0,
+                                     annotation_text=nome, annotation_position="top left")
+                fig_fc.update_yaxes(range=[serie["Batimento (bpm)"].min() - 10, serie["Batimento (bpm)"].max() + 10])
+                return rotular(fig_fc, len(serie), "%{y:.0f}")
+
+            exibir("frequência cardíaca", versao_dados("treinos"), (str(serie_id),), figura_fc)
     else:
         st.warning("Nenhum dado encontrado para gerar análises ou gráficos.")
 
 # Aba 5: Meta Anual e Indicador de Assiduidade
-with abas[4]:
+if pagina == "Meta Anual e Assiduidade":
     st.header("📊 Meta Anual e Indicador de Assiduidade")
 
-    # Carregar dados do MongoDB
-    df_treinos = carregar_treinos()
-    if not df_treinos.empty:
-        # Garantir que as datas estejam no formato correto
-        df_treinos["Data"] = pd.to_datetime(df_treinos["Data"], format="%d/%m/%Y")
+    # Totais mensais do ano corrente (pré-calculados em treinos_rollups)
+    hoje = datetime.now()
+    df_meses = ler_rollups("mes", datetime(hoje.year, 1, 1).date(), hoje.date())
+    if not df_meses.empty:
+        # Feriados estaduais considerados no cálculo de dias úteis
+        subdivisao = st.selectbox(
+            "Feriados estaduais (UF):",
+            options=SUBDIVISOES,
+            index=SUBDIVISOES.index(SUBDIVISAO_PADRAO),
+        )
 
         # Dados gerais
-        hoje = datetime.now()
-        dias_uteis_ano = calcular_dias_uteis(datetime(hoje.year, 1, 1), hoje)
-        dias_uteis_mes = calcular_dias_uteis(datetime(hoje.year, hoje.month, 1), hoje)
+        dias_uteis_ano = calcular_dias_uteis(datetime(hoje.year, 1, 1), hoje, subdivisao)
+        dias_uteis_mes = calcular_dias_uteis(datetime(hoje.year, hoje.month, 1), hoje, subdivisao)
 
-        dias_treinados_ano = df_treinos["Data"].nunique()
-        dias_treinados_mes = df_treinos[df_treinos["Data"].dt.month == hoje.month]["Data"].nunique()
+        dias_treinados_ano = int(df_meses["dias"].sum())
+        dias_treinados_mes = int(df_meses.loc[df_meses["inicio"].dt.month == hoje.month, "dias"].sum())
 
         assiduidade_anual = (dias_treinados_ano / dias_uteis_ano) * 100
         assiduidade_mensal = (dias_treinados_mes / dias_uteis_mes) * 100
@@ -481,25 +581,25 @@ with abas[4]:
 
         # Gráfico Progresso Anual
         st.subheader("📅 Progresso Anual")
-        progresso_anual = df_treinos.groupby(df_treinos["Data"].dt.month).size().reset_index(name="Dias Treinados")
-        progresso_anual.columns = ["Mês", "Dias Treinados"]
+        progresso_anual = pd.DataFrame({"Mês": df_meses["inicio"].dt.month, "Dias Treinados": df_meses["sessoes"]})
         progresso_anual["Mês"] = progresso_anual["Mês"].apply(lambda x: datetime(2025, x, 1).strftime("%B"))
-        fig_progresso_anual = px.bar(progresso_anual, x="Mês", y="Dias Treinados", title="Progresso Anual")
-        st.plotly_chart(fig_progresso_anual, use_container_width=True)
+        with medir("gráfico progresso anual", "grafico"):
+            fig_progresso_anual = px.bar(progresso_anual, x="Mês", y="Dias Treinados", title="Progresso Anual")
+            st.plotly_chart(fig_progresso_anual, use_container_width=True)
 
     else:
         st.warning("Nenhum dado disponível para a meta anual.")
 
 # Aba 6: Medidas Corporais
-with abas[5]:  # Certifique-se de que esta seja a 5ª aba adicionada
+if pagina == "Medidas Corporais":
     st.header("📏 Medidas Corporais")
 
     # Carregar dados de medidas corporais
-    df_medidas = carregar_medidas()
+    df_medidas = dados_pagina["medidas"]
 
     if not df_medidas.empty:
         # Conversão de tipos
-        df_medidas["Data"] = pd.to_datetime(df_medidas["Data"], errors="coerce")
+        df_medidas["Data"] = converter_datas(df_medidas["Data"])
         
         # Garantir que todas as colunas de medidas estejam no formato float
         colunas_medidas = [
@@ -512,8 +612,8 @@ with abas[5]:  # Certifique-se de que esta seja a 5ª aba adicionada
             if col in df_medidas.columns:  # Verifica se a coluna existe
                 df_medidas[col] = pd.to_numeric(df_medidas[col], errors="coerce")
 
-        # Remover duplicatas e organizar por data
-        df_medidas = df_medidas.drop_duplicates(subset=["Data"]).sort_values(by="Data")
+        # Organizar por data (uma medida por data, garantido pelo índice único)
+        df_medidas = df_medidas.sort_values(by="Data")
 
         # Exibição da tabela
         st.dataframe(df_medidas)
@@ -531,27 +631,31 @@ with abas[5]:  # Certifique-se de que esta seja a 5ª aba adicionada
         )
 
         if medidas_selecionadas:
-            # Criar gráfico temporal com base nas medidas selecionadas
-            fig_medidas = px.line(
-                df_medidas,
-                x="Data",
-                y=medidas_selecionadas,
-                title="Evolução das Medidas ao Longo do Tempo",
-                labels={"value": "Valor (cm ou kg)", "variable": "Medidas"},
-            )
-            fig_medidas.update_traces(
-                mode="lines+markers+text",  # Adiciona valores como texto
-                textposition="top center",  # Define a posição do texto
-                texttemplate="%{y}"  # Exibe apenas os valores no texto
-            )
-            st.plotly_chart(fig_medidas, use_container_width=True)
+            # Criar gráfico temporal com base nas medidas selecionadas (cada medida reduzida
+            # a no máximo graficos.PONTOS_POR_SERIE pontos)
+            def figura_medidas():
+                serie = reduzir(
+                    df_medidas.melt(id_vars="Data", value_vars=medidas_selecionadas, var_name="Medidas", value_name="Valor"),
+                    "Data", "Valor", grupo="Medidas",
+                )
+                fig_medidas = px.line(
+                    serie,
+                    x="Data",
+                    y="Valor",
+                    color="Medidas",
+                    title="Evolução das Medidas ao Longo do Tempo",
+                    labels={"Valor": "Valor (cm ou kg)"},
+                )
+                return rotular(fig_medidas, len(serie))
+
+            exibir("medidas", versao_dados("medidas"), tuple(medidas_selecionadas), figura_medidas)
         else:
             st.warning("Selecione ao menos uma medida para exibir no gráfico.")
     else:
         st.warning("Nenhuma medida corporal encontrada no banco de dados.")
 
 # Aba 7: Indicadores de Treinos
-with abas[6]:
+if pagina == "Indicadores de Treinos":
     st.header("📊 Indicadores de Treinos e Progresso")
 
     # Cálculo da idade com base na data de nascimento
@@ -561,31 +665,28 @@ with abas[6]:
     # Indicadores - Divisão do layout em 2 colunas
     col1, col2 = st.columns(2)
 
+    # Totais de todo o histórico (agregados no MongoDB)
+    resumo_treinos = estatisticas_treinos()
+
     # Coluna 1: Gráficos de distribuição e intensidade
     with col1:
-        if not df_treinos.empty:
+        if resumo_treinos["total"]:
             st.subheader("📈 Treinos: Distribuição e Intensidade")
             
             # Distribuição de Tempo por Zona de Esforço
-            zonas = ["Leve", "Intensa", "Aeróbica", "Anaeróbica", "VO2 Máximo"]
-            tempos_zonas = [
-                df_treinos["Zona Leve (min)"].sum(),
-                df_treinos["Zona Intensa (min)"].sum(),
-                df_treinos["Zona Aeróbica (min)"].sum(),
-                df_treinos["Zona Anaeróbica (min)"].sum(),
-                df_treinos["Zona Max. VO2 (min)"].sum(),
-            ]
-            fig_zonas = px.pie(
-                names=zonas,
-                values=tempos_zonas,
-                title="Distribuição de Tempo por Zona de Esforço",
-            )
-            st.plotly_chart(fig_zonas, use_container_width=True)
+            tempos_zonas = tempo_por_zona()
+            with medir("gráfico zonas", "grafico"):
+                fig_zonas = px.pie(
+                    names=list(tempos_zonas.keys()),
+                    values=list(tempos_zonas.values()),
+                    title="Distribuição de Tempo por Zona de Esforço",
+                )
+                st.plotly_chart(fig_zonas, use_container_width=True)
 
         # Intensidade Média
         max_bpm = 220 - idade
         intensidade_media = (
-            df_treinos["Batimento Médio (bpm)"].mean() / max_bpm * 100
+            resumo_treinos["bpm_medio"] / max_bpm * 100
             if max_bpm > 0
             else 0
         )
@@ -596,20 +697,21 @@ with abas[6]:
         st.subheader("📊 Eficiência e Variedade")
         
         # Eficiência Calórica
-        total_calorias = df_treinos["Calorias Queimadas"].sum()
-        total_tempo = df_treinos["Tempo Total (min)"].sum()
+        total_calorias = resumo_treinos["calorias_total"]
+        total_tempo = resumo_treinos["tempo_total"]
         eficiencia_calorica = total_calorias / total_tempo if total_tempo > 0 else 0
         st.metric("Calorias por Minuto", f"{eficiencia_calorica:.2f} cal/min")
 
         # Variedade de Treinos
-        frequencias_treino = df_treinos["Tipo de Treino"].value_counts()
-        fig_variedade = px.bar(
-            x=frequencias_treino.index,
-            y=frequencias_treino.values,
-            labels={"x": "Tipo de Treino", "y": "Frequência"},
-            title="Frequência por Tipo de Treino",
-        )
-        st.plotly_chart(fig_variedade, use_container_width=True)
+        frequencias_treino = frequencia_por_tipo()
+        with medir("gráfico variedade", "grafico"):
+            fig_variedade = px.bar(
+                x=frequencias_treino.index,
+                y=frequencias_treino.values,
+                labels={"x": "Tipo de Treino", "y": "Frequência"},
+                title="Frequência por Tipo de Treino",
+            )
+            st.plotly_chart(fig_variedade, use_container_width=True)
 
     # Indicadores de Progresso Físico
     col3, col4 = st.columns(2)
@@ -618,175 +720,131 @@ with abas[6]:
         st.subheader("📏 Progresso Físico")
 
         # Mudança em Medidas Corporais
-        df_medidas["Data"] = pd.to_datetime(df_medidas["Data"])
+        df_medidas = dados_pagina["medidas"].sort_values(by="Data")
+        df_medidas["Data"] = converter_datas(df_medidas["Data"])
         medidas_selecionadas = [
             "Tórax (cm)", "Cintura (cm)", "Abdômen (cm)", "Quadril (cm)"
         ]
         if not df_medidas.empty:
-            fig_progresso_medidas = px.line(
-                df_medidas,
-                x="Data",
-                y=medidas_selecionadas,
-                title="Evolução das Medidas Corporais",
-                labels={"value": "Medidas (cm)", "variable": "Medidas"},
-            )
-            fig_progresso_medidas.update_traces(
-                mode="lines+markers+text",
-                textposition="top center",
-                texttemplate="%{y:.1f}",
-                connectgaps=True,
-            )
-            st.plotly_chart(fig_progresso_medidas, use_container_width=True)
+            def figura_progresso_medidas():
+                serie = reduzir(
+                    df_medidas.melt(id_vars="Data", value_vars=medidas_selecionadas, var_name="Medidas", value_name="Valor"),
+                    "Data", "Valor", grupo="Medidas",
+                )
+                fig_progresso_medidas = px.line(
+                    serie,
+                    x="Data",
+                    y="Valor",
+                    color="Medidas",
+                    title="Evolução das Medidas Corporais",
+                    labels={"Valor": "Medidas (cm)"},
+                )
+                return rotular(fig_progresso_medidas, len(serie))
+
+            exibir("progresso medidas", versao_dados("medidas"), (), figura_progresso_medidas)
 
         # Mudança no Peso Corporal
         st.subheader("📉 Mudança no Peso Corporal")
         peso_meta = 58  # Meta de peso
         if "Peso (kg)" in df_medidas.columns:
-            fig_peso = px.line(
-                df_medidas,
-                x="Data",
-                y="Peso (kg)",
-                title="Progresso do Peso Corporal",
-                labels={"value": "Peso (kg)", "variable": "Peso"},
-            )
-            fig_peso.add_hline(
-                y=peso_meta,
-                line_dash="dot",
-                annotation_text=f"Meta: {peso_meta} kg",
-                annotation_position="bottom right",
-                
-            )
-            fig_peso.update_traces(
-                mode="lines+markers+text",
-                textposition="top center",
-                texttemplate="%{y:.1f}",
-                connectgaps=True
-            )
-            st.plotly_chart(fig_peso, use_container_width=True)
+            def figura_peso():
+                serie = reduzir(df_medidas, "Data", "Peso (kg)")
+                fig_peso = px.line(
+                    serie,
+                    x="Data",
+                    y="Peso (kg)",
+                    title="Progresso do Peso Corporal",
+                )
+                fig_peso.add_hline(
+                    y=peso_meta,
+                    line_dash="dot",
+                    annotation_text=f"Meta: {peso_meta} kg",
+                    annotation_position="bottom right",
+                )
+                return rotular(fig_peso, len(serie))
+
+            exibir("peso", versao_dados("medidas"), (peso_meta,), figura_peso)
 
     with col4:
         st.subheader("📈 Progressão de Carga")
 
-        # Carregar registros de exercícios
-        registros_exercicios = carregar_registros_exercicios()
-
-        if registros_exercicios:  # Verifica se há registros disponíveis
-            # Converter a lista de registros para um DataFrame
-            df_registros_exercicios = pd.DataFrame(registros_exercicios)
-
-            # Verifica se o DataFrame possui a coluna "Detalhes" e processa os dados
-            if "Detalhes" in df_registros_exercicios.columns and not df_registros_exercicios.empty:
-                registros_detalhes = []
-                for _, registro in df_registros_exercicios.iterrows():
-                    if "Detalhes" in registro and isinstance(registro["Detalhes"], list):
-                        for detalhe in registro["Detalhes"]:
-                            detalhe["Data"] = registro["Data do Registro"]  # Adiciona a data do registro
-                            registros_detalhes.append(detalhe)
-
-                # Transformar os detalhes em DataFrame
-                df_detalhes = pd.DataFrame(registros_detalhes)
-
-                if not df_detalhes.empty:
-                    # Garantir que as colunas estão no formato correto
-                    if "Peso (kg)" in df_detalhes.columns:
-                        df_detalhes["Peso (kg)"] = pd.to_numeric(df_detalhes["Peso (kg)"], errors="coerce")
-
-                    if "Data" in df_detalhes.columns:
-                        df_detalhes["Data"] = pd.to_datetime(df_detalhes["Data"], format="%Y-%m-%d")
-                        df_detalhes["Data"] = df_detalhes["Data"].dt.strftime("%d/%m/%Y")
-
-                    # Selecionar exercícios para exibição no gráfico
-                    exercicios_disponiveis = df_detalhes["Exercício"].unique().tolist()
-                    exercicios_selecionados = st.multiselect(
-                        "Selecione os Exercícios para Visualizar:",
-                        options=exercicios_disponiveis,
-                        default=exercicios_disponiveis[:5],  # Seleciona os 5 primeiros por padrão
+        # Recordes pessoais (recordes.py): a progressão lê só as vezes em que cada recorde foi batido
+        df_recordes = ler_recordes()
+
+        if not df_recordes.empty:
+            recentes = recordes_recentes(datetime.now() - timedelta(days=DIAS_RECORDES_RECENTES))
+            if recentes:
+                st.markdown(
+                    f"**🏅 Novos recordes nos últimos {DIAS_RECORDES_RECENTES} dias:** "
+                    + " ".join(f":orange-background[{evento['descricao']} ({evento['Data']:%d/%m})]" for evento in recentes[:10])
+                )
+
+            # Selecionar exercícios para exibição no gráfico
+            exercicios_disponiveis = df_recordes["Exercício"].tolist()
+            exercicios_selecionados = st.multiselect(
+                "Selecione os Exercícios para Visualizar:",
+                options=exercicios_disponiveis,
+                default=exercicios_disponiveis[:5],  # Seleciona os 5 mais registrados por padrão
+            )
+            metrica = st.radio("Recorde", options=list(METRICAS), format_func=METRICAS.get, horizontal=True)
+
+            if exercicios_selecionados:
+                # Recorde em degraus: sobe a cada marca batida
+                def figura_carga():
+                    serie = progressao_recordes(exercicios_selecionados, metrica)
+                    fig_carga = px.line(
+                        serie,
+                        x="Data",
+                        y="valor",
+                        color="Exercício",
+                        line_shape="hv",
+                        title="Evolução dos Recordes nos Exercícios Selecionados",
+                        labels={"Data": "Data", "valor": METRICAS[metrica], "Exercício": "Exercício"},
+                        markers=True,
                     )
-
-                    # Filtrar os dados para os exercícios selecionados
-                    df_filtrado = df_detalhes[df_detalhes["Exercício"].isin(exercicios_selecionados)]
-
-                    if not df_filtrado.empty:
-                        # Criar o gráfico de progressão de carga
-                        fig_carga = px.line(
-                            df_filtrado,
-                            x="Data",
-                            y="Peso (kg)",
-                            color="Exercício",
-                            title="Evolução de Carga nos Exercícios Selecionados",
-                            labels={"Data": "Data", "Peso (kg)": "Carga (kg)", "Exercício": "Exercício"},
-                            markers=True
-                        )
-                        fig_carga.update_traces(connectgaps=True)
-                        st.plotly_chart(fig_carga, use_container_width=True)
-                    else:
-                        st.warning("Nenhum dado encontrado para os exercícios selecionados.")
-                else:
-                    st.warning("Nenhum detalhe de exercícios disponível.")
+                    return fig_carga
+
+                exibir(
+                    "carga",
+                    versao_dados("registros_exercicios"),
+                    (tuple(exercicios_selecionados), metrica),
+                    figura_carga,
+                )
             else:
-                st.warning("Nenhum dado válido encontrado nos registros de exercícios.")
+                st.warning("Nenhum exercício selecionado.")
+
+            with st.expander("🏆 Recordes por exercício"):
+                st.dataframe(
+                    df_recordes.rename(columns={
+                        **METRICAS,
+                        "repeticoes_no_peso_max": "Repetições no peso máximo",
+                        "sessoes": "Sessões",
+                        "ultima_sessao": "Última sessão",
+                    }),
+                    hide_index=True,
+                )
         else:
             st.warning("Nenhum registro de exercícios encontrado.")
 
         # Volume Total do Treino
         st.subheader("📊 Volume Total por Grupo Muscular")
 
-        # Carregar registros de exercícios e exercícios do banco de dados
-        registros_exercicios = carregar_registros_exercicios()
-        df_exercicios = carregar_exercicios()
-
-        if registros_exercicios and not df_exercicios.empty:
-            # Converter registros para DataFrame
-            df_registros_exercicios = pd.DataFrame(registros_exercicios)
-
-            # Verifica se "Detalhes" e "Data do Registro" estão presentes
-            if "Detalhes" in df_registros_exercicios.columns and "Data do Registro" in df_registros_exercicios.columns:
-                registros_detalhes = []
-                for _, registro in df_registros_exercicios.iterrows():
-                    if isinstance(registro["Detalhes"], list):
-                        for detalhe in registro["Detalhes"]:
-                            detalhe["Data"] = registro["Data do Registro"]  # Adiciona a data do registro
-                            registros_detalhes.append(detalhe)
-
-                # Transformar os detalhes em DataFrame
-                df_detalhes = pd.DataFrame(registros_detalhes)
-
-                if not df_detalhes.empty:
-                    # Garantir os tipos corretos das colunas
-                    df_detalhes["Peso (kg)"] = pd.to_numeric(df_detalhes["Peso (kg)"], errors="coerce")
-                    df_detalhes["Repetições"] = pd.to_numeric(df_detalhes["Repetições"], errors="coerce")
-                    df_detalhes["Data"] = pd.to_datetime(df_detalhes["Data"], format="%Y-%m-%d")
-
-                    # Combinar os registros com o número de séries do banco de exercícios
-                    df_combinado = pd.merge(
-                        df_detalhes,
-                        df_exercicios[["nome", "series", "musculo"]],
-                        left_on="Exercício",
-                        right_on="nome",
-                        how="inner"
-                    )
-
-                    # Calcular o volume total: Peso (kg) * Repetições * Séries
-                    df_combinado["volume_total"] = df_combinado["Peso (kg)"] * df_combinado["Repetições"] * df_combinado["series"]
-
-                    # Agrupar por grupo muscular e somar o volume total
-                    volume_por_musculo = df_combinado.groupby("musculo")["volume_total"].sum().reset_index()
-
-                    # Criar gráfico de barras
-                    fig_volume = px.bar(
-                        volume_por_musculo,
-                        x="musculo",
-                        y="volume_total",
-                        title="Volume Total por Grupo Muscular",
-                        text="volume_total",
-                        labels={"musculo": "Grupo Muscular", "volume_total": "Volume Total (kg)"},
-                    )
-                    fig_volume.update_traces(textposition="outside")
-                    st.plotly_chart(fig_volume, use_container_width=True)
-                else:
-                    st.warning("Nenhum detalhe de exercícios disponível.")
-            else:
-                st.warning("Os registros de exercícios não possuem os campos esperados.")
+        # Volume (peso x repetições de cada série) somado por grupo muscular, só com exercícios do catálogo
+        df_volume = volume_por_musculo()
+
+        if not df_volume.empty:
+            # Criar gráfico de barras
+            with medir("gráfico volume", "grafico"):
+                fig_volume = px.bar(
+                    df_volume,
+                    x="musculo",
+                    y="volume_total",
+                    title="Volume Total por Grupo Muscular",
+                    text="volume_total",
+                    labels={"musculo": "Grupo Muscular", "volume_total": "Volume Total (kg)"},
+                )
+                fig_volume.update_traces(textposition="outside")
+                st.plotly_chart(fig_volume, use_container_width=True)
         else:
             st.warning("Nenhum dado disponível para calcular o volume total.")
 
@@ -796,45 +854,38 @@ with abas[6]:
     with col5:
         st.subheader("💤 Indicadores de Recuperação")
 
-        df_condicoes = carregar_condicoes()
-        if not df_condicoes.empty:
-            numeric_columns = ["TSB", "Fadiga (ATL)", "Condição Física (CTL)"]
-            for col in numeric_columns:
-                df_condicoes[col] = pd.to_numeric(df_condicoes[col], errors="coerce")
-
-            df_long = df_condicoes.melt(
-                id_vars="Data", 
-                value_vars=numeric_columns, 
-                var_name="Indicador", 
-                value_name="Valor"
-            )
-            df_long["Data"] = pd.to_datetime(df_long["Data"], errors="coerce")
-            df_long = df_long.dropna(subset=["Valor", "Data"])
-
-            fig_fadiga = px.line(
-                df_long,
-                x="Data",
-                y="Valor",
-                color="Indicador",
-                title="Evolução dos Indicadores de Recuperação",
-                markers=True
-            )
-            fig_fadiga.update_traces(
-                mode="lines+markers+text",
-                textposition="top center",
-                texttemplate="%{y:.1f}",
-                connectgaps=True
-            )
-            st.plotly_chart(fig_fadiga, use_container_width=True)
+        # ATL/CTL/TSB diários calculados dos treinos (carga_treino.py), até hoje
+        df_carga = ler_carga()
+        if not df_carga.empty:
+            def figura_fadiga():
+                numeric_columns = ["TSB", "Fadiga (ATL)", "Condição Física (CTL)"]
+                df_condicoes = df_carga.rename(columns={"tsb": "TSB", "atl": "Fadiga (ATL)", "ctl": "Condição Física (CTL)"})
+
+                df_long = df_condicoes.melt(
+                    id_vars="Data",
+                    value_vars=numeric_columns,
+                    var_name="Indicador",
+                    value_name="Valor"
+                )
+                # Uma série por indicador, com no máximo graficos.PONTOS_POR_SERIE pontos
+                serie = reduzir(df_long, "Data", "Valor", grupo="Indicador")
+
+                fig_fadiga = px.line(
+                    serie,
+                    x="Data",
+                    y="Valor",
+                    color="Indicador",
+                    title="Evolução dos Indicadores de Recuperação",
+                )
+                return rotular(fig_fadiga, len(serie))
+
+            exibir("fadiga", versao_dados("treinos"), (df_carga["Data"].iloc[-1],), figura_fadiga)
 
     with col6:
         # Relação Treino/Recuperação
-        df_treinos = carregar_treinos()
+        df_treinos = dados_pagina["treinos"]
 
         if not df_treinos.empty:
-            # Converte a coluna de data para datetime
-            df_treinos["Data"] = pd.to_datetime(df_treinos["Data"], format="%d/%m/%Y")
-
             # Cálculo do número de dias corridos no ano até hoje
             hoje = datetime.now()
             inicio_ano = datetime(hoje.year, 1, 1)
@@ -853,41 +904,109 @@ with abas[6]:
             })
 
             # Criar figura com eixo duplo
-            fig_recuperacao = px.bar(
-                df_recuperacao,
-                x="Indicador",
-                y="Valor",
-                title="Relação Treino/Recuperação",
-                text="Valor",
-                labels={"Indicador": "Indicador", "Valor": "Valor"},
-            )
+            with medir("gráfico recuperacao", "grafico"):
+                fig_recuperacao = px.bar(
+                    df_recuperacao,
+                    x="Indicador",
+                    y="Valor",
+                    title="Relação Treino/Recuperação",
+                    text="Valor",
+                    labels={"Indicador": "Indicador", "Valor": "Valor"},
+                )
+
+                # Adicionar o eixo secundário para a relação treino/recuperação
+                fig_recuperacao.add_scatter(
+                    x=["Relação Treino/Recuperação"],
+                    y=[relacao_treino_recuperacao * 100],  # Converter para percentual
+                    mode="markers+text",
+                    text=[f"{relacao_treino_recuperacao:.0%}"],  # Exibir como percentual
+                    textposition="top center",
+                    name="Relação (%)",
+                    yaxis="y2"
+                )
+
+                # Atualizar layout para incluir o eixo direito
+                fig_recuperacao.update_layout(
+                    yaxis2=dict(
+                        title="Relação Treino/Recuperação (%)",
+                        overlaying="y",
+                        side="right",
+                        showgrid=False,
+                    ),
+                    yaxis=dict(title="Dias"),
+                )
+
+                st.plotly_chart(fig_recuperacao, use_container_width=True)
 
-            # Adicionar o eixo secundário para a relação treino/recuperação
-            fig_recuperacao.add_scatter(
-                x=["Relação Treino/Recuperação"],
-                y=[relacao_treino_recuperacao * 100],  # Converter para percentual
-                mode="markers+text",
-                text=[f"{relacao_treino_recuperacao:.0%}"],  # Exibir como percentual
-                textposition="top center",
-                name="Relação (%)",
-                yaxis="y2"
-            )
+        else:
+            st.warning("Nenhum dado de treino encontrado no banco de dados.")
 
-            # Atualizar layout para incluir o eixo direito
-            fig_recuperacao.update_layout(
-                yaxis2=dict(
-                    title="Relação Treino/Recuperação (%)",
-                    overlaying="y",
-                    side="right",
-                    showgrid=False,
-                ),
-                yaxis=dict(title="Dias"),
-            )
 
-            st.plotly_chart(fig_recuperacao, use_container_width=True)
+# Aba 8: Relatório de Perfil (sweetviz), gerado em segundo plano
+if pagina == "Relatório de Perfil":
+    st.header("🔎 Relatório de Perfil dos Treinos")
+    df_treinos = dados_pagina["treinos"]
 
-        else:
-            st.warning("Nenhum dado de treino encontrado no banco de dados.")
+    if df_treinos.empty:
+        st.warning("Nenhum dado de treino encontrado no banco de dados.")
+    else:
+        # Importados só aqui: o sweetviz roda num processo à parte (relatorio_perfil.py)
+        import streamlit.components.v1 as components
+        from relatorio_perfil import gerador_relatorio, ler_html
+
+        with medir("relatório de perfil", "relatorio"):
+            estado = gerador_relatorio().pedir(df_treinos, refazer=st.session_state.pop("refazer_relatorio", False))
+
+        if estado.erro is not None:
+            st.error(f"Não foi possível gerar o relatório: {estado.erro}")
+            st.button("Tentar novamente", on_click=lambda: st.session_state.update(refazer_relatorio=True))
+
+        if estado.gerando:
+            # Consulta o gerador a cada poucos segundos sem refazer a página; recarrega ao terminar
+            @st.fragment(run_every=3)
+            def aguardar_relatorio():
+                if not gerador_relatorio().gerando():
+                    st.rerun()
+                if estado.caminho:
+                    st.info("⏳ Atualizando o relatório com os treinos novos. Enquanto isso, segue o último gerado.")
+                else:
+                    st.info("⏳ Gerando o relatório em segundo plano; ele aparece aqui ao terminar.")
+
+            aguardar_relatorio()
+
+        if estado.caminho:
+            components.html(ler_html(estado.caminho), height=1200, scrolling=True)
 
 
 # Executar a aplicação
+
+# Painel "Performance": etapas deste rerun (montado depois da medição, fica fora da conta)
+resumo_rerun = finalizar_rerun(pagina)
+if st.session_state.get("desempenho") and resumo_rerun:
+    with st.sidebar.expander("⏱️ Performance deste rerun", expanded=True):
+        st.metric("Rerun", f"{resumo_rerun['total_ms']:.0f} ms")
+        st.caption(f"Fora das etapas medidas: {resumo_rerun['nao_medido_ms']:.0f} ms")
+        if resumo_rerun["etapas"]:
+            etapas = pd.DataFrame(resumo_rerun["etapas"])
+            # Etapas chamadas dentro de outras aparecem recuadas
+            etapas["etapa"] = etapas["nivel"].map(lambda nivel: "· " * nivel) + etapas["etapa"]
+            st.dataframe(etapas[["etapa", "categoria", "ms", "chamadas"]].round({"ms": 1}), hide_index=True)
+        if resumo_rerun["mongo"]:
+            st.dataframe(pd.DataFrame(resumo_rerun["mongo"]).round({"ms": 1}), hide_index=True)
+        else:
+            st.caption("Nenhum comando enviado ao MongoDB neste rerun.")
+
+    with st.sidebar.expander("📈 Performance acumulada"):
+        totais = acumulado()
+        for grupo in ["reruns", "etapas", "mongo"]:
+            if totais[grupo]:
+                st.dataframe(
+                    pd.DataFrame(totais[grupo]).sort_values("total_ms", ascending=False).round(1),
+                    hide_index=True,
+                )
+        st.download_button(
+            "Exportar métricas (Prometheus)",
+            exportar_prometheus(estatisticas_pool()),
+            file_name="dashboard_metricas.prom",
+            mime="text/plain",
+        )
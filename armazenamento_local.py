@@ -0,0 +1,823 @@
+"""
+Armazenamento embutido (arquivo SQLite) com a mesma interface das coleções do pymongo
+usada pelo app: find/find_one com filtros, projeção e ordenação, count_documents,
+aggregate ($match, $group, $sort, $project, $limit), insert_one/insert_many, bulk_write,
+find_one_and_update/find_one_and_replace, update/replace/delete e create_index/drop_index,
+com índices únicos respeitados. O argumento session do pymongo é aceito e ignorado: cada
+gravação já é atômica no arquivo, mas não há transações entre gravações.
+
+Escolhido com ARMAZENAMENTO=local (ver conexao.py). Cada coleção é uma tabela de
+documentos em JSON estendido (bson.json_util, que preserva datas e ObjectId) mantida
+também em memória: as leituras não vão ao disco e a tabela só é relida quando outro
+processo grava no arquivo. Não há change streams (watch levanta OperationFailure, como
+num servidor standalone) e estágios de agregação não suportados também levantam
+OperationFailure, o que aciona os caminhos alternativos em pandas.
+"""
+import copy
+import sqlite3
+import threading
+from datetime import datetime
+
+from bson import ObjectId, json_util
+from pymongo import ASCENDING, ReturnDocument
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure
+from pymongo.operations import DeleteMany, DeleteOne, InsertOne, ReplaceOne, UpdateMany, UpdateOne
+
+_AUSENTE = object()
+
+# Nomes aceitos por $type
+TIPOS = {
+    "date": datetime,
+    "string": str,
+    "objectId": ObjectId,
+    "bool": bool,
+    "object": dict,
+    "array": list,
+    "double": float,
+    "int": int,
+    "long": int,
+    "number": (int, float),
+    "null": type(None),
+}
+
+
+class Resultado:
+    """Resultado de uma escrita, com os atributos dos resultados do pymongo."""
+
+    def __init__(self, **valores):
+        self.acknowledged = True
+        self.inserted_id = None
+        self.inserted_ids = []
+        self.inserted_count = 0
+        self.matched_count = 0
+        self.modified_count = 0
+        self.deleted_count = 0
+        self.upserted_id = None
+        self.upserted_ids = {}
+        self.__dict__.update(valores)
+
+    @property
+    def upserted_count(self):
+        return len(self.upserted_ids)
+
+
+# ---------------------------------------------------------------------------
+# Campos, comparação e filtros
+
+def _obter(documento, campo):
+    """
+    Valor de um campo: chave literal (ex.: "Zona Max. VO2 (min)") ou caminho com pontos. Como
+    no MongoDB, um caminho que passa por uma lista de subdocumentos (ex.: "Detalhes.Exercício")
+    dá a lista dos valores de cada um.
+    """
+    if campo in documento:
+        return documento[campo]
+    valor = documento
+    partes = campo.split(".")
+    for posicao, parte in enumerate(partes):
+        if isinstance(valor, list):
+            resto = ".".join(partes[posicao:])
+            valores = [_obter(item, resto) for item in valor if isinstance(item, dict)]
+            valores = [item for item in valores if item is not _AUSENTE]
+            return valores or _AUSENTE
+        if not isinstance(valor, dict) or parte not in valor:
+            return _AUSENTE
+        valor = valor[parte]
+    return valor
+
+
+def _definir(documento, campo, valor):
+    if campo in documento or "." not in campo:
+        documento[campo] = valor
+        return
+    partes = campo.split(".")
+    alvo = documento
+    for parte in partes[:-1]:
+        alvo = alvo.setdefault(parte, {})
+    alvo[partes[-1]] = valor
+
+
+def _remover(documento, campo):
+    if campo in documento:
+        del documento[campo]
+        return
+    *caminho, ultimo = campo.split(".")
+    alvo = _obter(documento, ".".join(caminho)) if caminho else documento
+    if isinstance(alvo, dict):
+        alvo.pop(ultimo, None)
+
+
+def _grupo(valor):
+    # Ordem de tipos do MongoDB: nulo < números < textos < objetos < listas < ObjectId < bool < datas
+    if valor is None or valor is _AUSENTE:
+        return 1
+    if isinstance(valor, bool):
+        return 8
+    if isinstance(valor, (int, float)):
+        return 2
+    if isinstance(valor, str):
+        return 3
+    if isinstance(valor, dict):
+        return 4
+    if isinstance(valor, list):
+        return 5
+    if isinstance(valor, ObjectId):
+        return 7
+    if isinstance(valor, datetime):
+        return 9
+    return 10
+
+
+def _chave_ordem(valor):
+    grupo = _grupo(valor)
+    if grupo == 1:
+        return (grupo, 0)
+    if grupo in (4, 5, 10):
+        return (grupo, json_util.dumps(valor))
+    return (grupo, valor)
+
+
+def _igual(valor, alvo):
+    if valor is _AUSENTE:
+        return alvo is None
+    if isinstance(valor, list) and not isinstance(alvo, list):
+        return any(_igual(item, alvo) for item in valor)
+    return _grupo(valor) == _grupo(alvo) and valor == alvo
+
+
+def _comparar(valor, alvo, operador):
+    # Como no MongoDB, só compara valores do mesmo tipo (número com número, data com data...)
+    if valor is _AUSENTE or _grupo(valor) != _grupo(alvo):
+        return False
+    chave, referencia = _chave_ordem(valor), _chave_ordem(alvo)
+    return {
+        "$gt": chave > referencia,
+        "$gte": chave >= referencia,
+        "$lt": chave < referencia,
+        "$lte": chave <= referencia,
+    }[operador]
+
+
+def _testar(operador, valor, alvo):
+    if operador == "$eq":
+        return _igual(valor, alvo)
+    if operador == "$ne":
+        return not _igual(valor, alvo)
+    if operador in ("$gt", "$gte", "$lt", "$lte"):
+        return _comparar(valor, alvo, operador)
+    if operador == "$in":
+        return any(_igual(valor, item) for item in alvo)
+    if operador == "$nin":
+        return not any(_igual(valor, item) for item in alvo)
+    if operador == "$exists":
+        return (valor is not _AUSENTE) == bool(alvo)
+    if operador == "$type":
+        tipos = tuple(TIPOS[nome] for nome in (alvo if isinstance(alvo, list) else [alvo]))
+        if isinstance(valor, bool) and bool not in tipos:
+            return False
+        return valor is not _AUSENTE and isinstance(valor, tipos)
+    raise OperationFailure(f"Operador de consulta não suportado pelo armazenamento local: {operador}")
+
+
+def _corresponde(documento, filtro):
+    for campo, condicao in (filtro or {}).items():
+        if campo == "$and":
+            if not all(_corresponde(documento, parte) for parte in condicao):
+                return False
+        elif campo == "$or":
+            if not any(_corresponde(documento, parte) for parte in condicao):
+                return False
+        elif campo == "$expr":
+            if not _avaliar(condicao, documento):
+                return False
+        else:
+            valor = _obter(documento, campo)
+            if isinstance(condicao, dict) and condicao and all(chave.startswith("$") for chave in condicao):
+                if not all(_testar(operador, valor, alvo) for operador, alvo in condicao.items()):
+                    return False
+            elif not _igual(valor, condicao):
+                return False
+    return True
+
+
+def _avaliar(expressao, documento):
+    """Expressões de agregação: "$campo", literais e os operadores usados pelo app."""
+    if isinstance(expressao, str) and expressao.startswith("$"):
+        valor = _obter(documento, expressao[1:])
+        return None if valor is _AUSENTE else valor
+    if isinstance(expressao, list):
+        return [_avaliar(item, documento) for item in expressao]
+    if not isinstance(expressao, dict) or not expressao:
+        return expressao
+    if not all(chave.startswith("$") for chave in expressao):
+        return {chave: _avaliar(valor, documento) for chave, valor in expressao.items()}
+
+    (operador, argumento), = expressao.items()
+    valores = _avaliar(argumento, documento)
+    if operador in ("$year", "$month", "$dayOfMonth", "$hour"):
+        atributo = {"$year": "year", "$month": "month", "$dayOfMonth": "day", "$hour": "hour"}[operador]
+        return getattr(valores, atributo) if isinstance(valores, datetime) else None
+    if operador == "$eq":
+        return _igual(*valores)
+    if operador == "$ne":
+        return not _igual(*valores)
+    if operador in ("$gt", "$gte", "$lt", "$lte"):
+        return _comparar(valores[0], valores[1], operador)
+    if operador == "$and":
+        return all(valores)
+    if operador == "$or":
+        return any(valores)
+    if operador in ("$add", "$multiply"):
+        numeros = [valor or 0 for valor in valores]
+        resultado = 0 if operador == "$add" else 1
+        for numero in numeros:
+            resultado = resultado + numero if operador == "$add" else resultado * numero
+        return resultado
+    if operador == "$getField":
+        valor = documento.get(valores, _AUSENTE)
+        return None if valor is _AUSENTE else valor
+    if operador == "$ifNull":
+        return next((valor for valor in valores if valor is not None), None)
+    if operador == "$size":
+        if not isinstance(valores, list):
+            raise OperationFailure("O argumento de $size precisa ser uma lista")
+        return len(valores)
+    raise OperationFailure(f"Expressão não suportada pelo armazenamento local: {operador}")
+
+
+def _projetar(documento, projecao):
+    if not projecao:
+        return copy.deepcopy(documento)
+    incluidos = [campo for campo, valor in projecao.items() if valor and campo != "_id"]
+    # {"_id": 1} sozinho também é inclusão
+    if incluidos or (projecao.get("_id") and len(projecao) == 1):
+        resultado = {}
+        if projecao.get("_id", 1) and "_id" in documento:
+            resultado["_id"] = documento["_id"]
+        for campo in incluidos:
+            valor = _obter(documento, campo)
+            if valor is _AUSENTE:
+                continue
+            if campo in documento:
+                resultado[campo] = copy.deepcopy(valor)
+            else:
+                _definir(resultado, campo, copy.deepcopy(valor))
+        return resultado
+    resultado = copy.deepcopy(documento)
+    for campo, valor in projecao.items():
+        if not valor:
+            _remover(resultado, campo)
+    return resultado
+
+
+def _ordenar(documentos, ordem):
+    # Ordenação estável, da última chave para a primeira
+    for campo, direcao in reversed(ordem):
+        documentos.sort(key=lambda documento: _chave_ordem(_obter(documento, campo)), reverse=direcao < 0)
+    return documentos
+
+
+def _normalizar_ordem(chave, direcao=ASCENDING):
+    if chave is None:
+        return []
+    if isinstance(chave, str):
+        return [(chave, direcao)]
+    return list(chave.items()) if isinstance(chave, dict) else list(chave)
+
+
+# ---------------------------------------------------------------------------
+# Atualizações
+
+def _eh_operadores(atualizacao):
+    return bool(atualizacao) and all(chave.startswith("$") for chave in atualizacao)
+
+
+def _aplicar(documento, atualizacao, inserindo=False):
+    """Aplica $set/$setOnInsert/$inc/$max/$min/$unset/$push a uma cópia e devolve o novo documento."""
+    novo = copy.deepcopy(documento)
+    for operador, campos in atualizacao.items():
+        for campo, valor in campos.items():
+            atual = _obter(novo, campo)
+            if operador == "$set":
+                _definir(novo, campo, valor)
+            elif operador == "$setOnInsert":
+                if inserindo:
+                    _definir(novo, campo, valor)
+            elif operador == "$inc":
+                _definir(novo, campo, (0 if atual is _AUSENTE or atual is None else atual) + valor)
+            elif operador == "$max":
+                if atual is _AUSENTE or _chave_ordem(valor) > _chave_ordem(atual):
+                    _definir(novo, campo, valor)
+            elif operador == "$min":
+                if atual is _AUSENTE or _chave_ordem(valor) < _chave_ordem(atual):
+                    _definir(novo, campo, valor)
+            elif operador == "$unset":
+                _remover(novo, campo)
+            elif operador == "$push":
+                # {"$each": [...]} acrescenta vários itens de uma vez
+                itens = valor["$each"] if isinstance(valor, dict) and "$each" in valor else [valor]
+                _definir(novo, campo, [*(atual if isinstance(atual, list) else []), *itens])
+            else:
+                raise OperationFailure(f"Operador de atualização não suportado pelo armazenamento local: {operador}")
+    return novo
+
+
+def _base_upsert(filtro):
+    # Campos de igualdade do filtro viram campos do documento inserido
+    base = {}
+    for campo, condicao in (filtro or {}).items():
+        if campo.startswith("$"):
+            continue
+        if isinstance(condicao, dict) and condicao and all(chave.startswith("$") for chave in condicao):
+            if "$eq" in condicao:
+                _definir(base, campo, condicao["$eq"])
+        else:
+            _definir(base, campo, condicao)
+    return base
+
+
+# ---------------------------------------------------------------------------
+# Agregação
+
+def _acumular(operador, expressao, documentos):
+    valores = [_avaliar(expressao, documento) for documento in documentos]
+    numeros = [valor for valor in valores if isinstance(valor, (int, float)) and not isinstance(valor, bool)]
+    if operador == "$sum":
+        return sum(numeros)
+    if operador == "$avg":
+        return sum(numeros) / len(numeros) if numeros else None
+    presentes = [valor for valor in valores if valor is not None]
+    if operador == "$max":
+        return max(presentes, key=_chave_ordem, default=None)
+    if operador == "$min":
+        return min(presentes, key=_chave_ordem, default=None)
+    if operador == "$first":
+        return valores[0] if valores else None
+    if operador == "$last":
+        return valores[-1] if valores else None
+    if operador == "$push":
+        return valores
+    if operador == "$addToSet":
+        return list({json_util.dumps(valor): valor for valor in valores}.values())
+    raise OperationFailure(f"Acumulador não suportado pelo armazenamento local: {operador}")
+
+
+def _agrupar(documentos, especificacao):
+    grupos = {}
+    for documento in documentos:
+        chave = _avaliar(especificacao["_id"], documento)
+        grupos.setdefault(json_util.dumps(chave), (chave, []))[1].append(documento)
+    resultado = []
+    for chave, membros in grupos.values():
+        saida = {"_id": chave}
+        for campo, acumulador in especificacao.items():
+            if campo != "_id":
+                (operador, expressao), = acumulador.items()
+                saida[campo] = _acumular(operador, expressao, membros)
+        resultado.append(saida)
+    return resultado
+
+
+def _executar_pipeline(documentos, pipeline):
+    for estagio in pipeline:
+        (operador, especificacao), = estagio.items()
+        if operador == "$match":
+            documentos = [documento for documento in documentos if _corresponde(documento, especificacao)]
+        elif operador == "$group":
+            documentos = _agrupar(documentos, especificacao)
+        elif operador == "$sort":
+            documentos = _ordenar(list(documentos), list(especificacao.items()))
+        elif operador == "$limit":
+            documentos = documentos[:especificacao]
+        elif operador == "$skip":
+            documentos = documentos[especificacao:]
+        elif operador == "$count":
+            documentos = [{especificacao: len(documentos)}] if documentos else []
+        elif operador == "$project" and all(valor in (0, 1, True, False) for valor in especificacao.values()):
+            documentos = [_projetar(documento, especificacao) for documento in documentos]
+        else:
+            raise OperationFailure(f"Estágio de agregação não suportado pelo armazenamento local: {operador}")
+    return documentos
+
+
+# ---------------------------------------------------------------------------
+# Coleções
+
+class CursorLocal:
+    """Resultado de find(): aceita sort/skip/limit encadeados, como o Cursor do pymongo."""
+
+    def __init__(self, colecao, filtro, projecao):
+        self._colecao = colecao
+        self._filtro = filtro
+        self._projecao = projecao
+        self._ordem = []
+        self._pular = 0
+        self._limite = 0
+
+    def sort(self, chave, direcao=ASCENDING):
+        self._ordem = _normalizar_ordem(chave, direcao)
+        return self
+
+    def skip(self, quantidade):
+        self._pular = quantidade
+        return self
+
+    def limit(self, quantidade):
+        self._limite = quantidade
+        return self
+
+    def __iter__(self):
+        documentos = _ordenar(self._colecao._filtrar(self._filtro), self._ordem)[self._pular:]
+        if self._limite:
+            documentos = documentos[:self._limite]
+        return iter([_projetar(documento, self._projecao) for documento in documentos])
+
+
+def _chave_valor(valor):
+    # Números iguais (1 e 1.0) têm a mesma chave, como na comparação do MongoDB
+    if isinstance(valor, float) and valor.is_integer():
+        valor = int(valor)
+    return json_util.dumps(None if valor is _AUSENTE else valor)
+
+
+def _igualdades(filtro):
+    # Campos do filtro comparados por igualdade simples (candidatos a busca pelo índice)
+    campos = {}
+    for campo, condicao in (filtro or {}).items():
+        if campo.startswith("$"):
+            continue
+        if isinstance(condicao, dict) and condicao and all(chave.startswith("$") for chave in condicao):
+            if set(condicao) == {"$eq"}:
+                campos[campo] = condicao["$eq"]
+        elif not isinstance(condicao, (list, dict)):
+            campos[campo] = condicao
+    return campos
+
+
+class ColecaoLocal:
+    """
+    Uma coleção: documentos em memória na ordem de inserção, espelhados numa tabela SQLite.
+    Cada índice criado com create_index vira um mapa em memória (valores da chave -> _ids),
+    usado nas buscas por igualdade e na verificação dos índices únicos.
+    """
+
+    def __init__(self, banco, nome):
+        self.banco = banco
+        self.nome = nome
+        self.tabela = '"' + nome.replace('"', '""') + '"'
+        self.documentos = {}
+        self.ordem = {}
+        self.contador = 0
+        self.indices = {}
+        self.mapas = {}
+        self.versao = None
+        with banco.lock:
+            banco.conexao.execute(f"CREATE TABLE IF NOT EXISTS {self.tabela} (id TEXT PRIMARY KEY, documento TEXT NOT NULL)")
+
+    # Leitura da tabela para a memória, refeita quando outro processo grava no arquivo
+    def _sincronizar(self):
+        versao = self.banco.versao_arquivo()
+        if versao == self.versao:
+            return
+        linhas = self.banco.conexao.execute(f"SELECT id, documento FROM {self.tabela} ORDER BY rowid")
+        self.documentos = {chave: json_util.loads(documento) for chave, documento in linhas}
+        self.ordem = {chave: posicao for posicao, chave in enumerate(self.documentos)}
+        self.contador = len(self.ordem)
+        self.indices = {
+            nome: (json_util.loads(chaves), bool(unico))
+            for nome, chaves, unico in self.banco.conexao.execute(
+                "SELECT nome, chaves, unico FROM _indices WHERE colecao = ?", (self.nome,)
+            )
+        }
+        self.mapas = {nome: self._mapear(chaves) for nome, (chaves, _) in self.indices.items()}
+        self.versao = versao
+
+    def _chave_indice(self, documento, chaves):
+        return "|".join(_chave_valor(_obter(documento, campo)) for campo, _ in chaves)
+
+    def _mapear(self, chaves):
+        mapa = {}
+        for chave, documento in self.documentos.items():
+            mapa.setdefault(self._chave_indice(documento, chaves), set()).add(chave)
+        return mapa
+
+    def _candidatos(self, filtro):
+        """Documentos que podem corresponder ao filtro, pelo _id ou por um índice quando possível."""
+        igualdades = _igualdades(filtro)
+        if "_id" in igualdades:
+            chave = json_util.dumps(igualdades["_id"])
+            return [self.documentos[chave]] if chave in self.documentos else []
+        for nome, (chaves, _) in self.indices.items():
+            if all(campo in igualdades for campo, _ in chaves):
+                ids = self.mapas[nome].get(self._chave_indice(igualdades, chaves), ())
+                return [self.documentos[chave] for chave in sorted(ids, key=self.ordem.get)]
+        return list(self.documentos.values())
+
+    def _filtrar(self, filtro):
+        with self.banco.lock:
+            self._sincronizar()
+            return [documento for documento in self._candidatos(filtro) if _corresponde(documento, filtro)]
+
+    def _verificar_unicos(self, documento, ignorar=None):
+        for nome, (chaves, unico) in self.indices.items():
+            if unico and self.mapas[nome].get(self._chave_indice(documento, chaves), set()) - {ignorar}:
+                raise DuplicateKeyError(f"E11000 duplicate key error collection: {self.nome} index: {nome}", 11000)
+
+    # Escritas: a memória só muda depois do commit no arquivo
+    def _gravar(self, documentos, removidos=()):
+        conexao = self.banco.conexao
+        conexao.execute("BEGIN")
+        try:
+            for chave in removidos:
+                conexao.execute(f"DELETE FROM {self.tabela} WHERE id = ?", (chave,))
+            for chave, documento in documentos:
+                conexao.execute(
+                    f"INSERT INTO {self.tabela} (id, documento) VALUES (?, ?) "
+                    "ON CONFLICT(id) DO UPDATE SET documento = excluded.documento",
+                    (chave, json_util.dumps(documento)),
+                )
+            conexao.execute("COMMIT")
+        except BaseException:
+            conexao.execute("ROLLBACK")
+            raise
+        for chave in [*removidos, *(chave for chave, _ in documentos)]:
+            anterior = self.documentos.get(chave)
+            if anterior is not None:
+                for nome, (chaves, _) in self.indices.items():
+                    self.mapas[nome].get(self._chave_indice(anterior, chaves), set()).discard(chave)
+        for chave in removidos:
+            self.documentos.pop(chave, None)
+            self.ordem.pop(chave, None)
+        for chave, documento in documentos:
+            if chave not in self.ordem:
+                self.ordem[chave] = self.contador
+                self.contador += 1
+            self.documentos[chave] = documento
+            for nome, (chaves, _) in self.indices.items():
+                self.mapas[nome].setdefault(self._chave_indice(documento, chaves), set()).add(chave)
+
+    def _inserir(self, documento):
+        documento = copy.deepcopy(documento)
+        documento.setdefault("_id", ObjectId())
+        chave = json_util.dumps(documento["_id"])
+        if chave in self.documentos:
+            raise DuplicateKeyError(f"E11000 duplicate key error collection: {self.nome} index: _id_", 11000)
+        self._verificar_unicos(documento)
+        self._gravar([(chave, documento)])
+        return documento["_id"]
+
+    def _atualizar(self, filtro, atualizacao, upsert=False, varios=False, substituir=False):
+        """Atualiza (ou substitui) os documentos do filtro; devolve (antes, depois, resultado) do primeiro."""
+        if substituir and _eh_operadores(atualizacao):
+            raise ValueError("replacement can not include $ operators")
+        if not substituir and not _eh_operadores(atualizacao):
+            raise ValueError("update only works with $ operators")
+        alvos = [documento for documento in self._candidatos(filtro) if _corresponde(documento, filtro)]
+        if not varios:
+            alvos = alvos[:1]
+        if not alvos:
+            if not upsert:
+                return None, None, Resultado()
+            base = _base_upsert(filtro)
+            novo = {**base, **copy.deepcopy(atualizacao)} if substituir else _aplicar(base, atualizacao, inserindo=True)
+            novo.setdefault("_id", base.get("_id", ObjectId()))
+            self._verificar_unicos(novo)
+            self._gravar([(json_util.dumps(novo["_id"]), novo)])
+            return None, novo, Resultado(upserted_id=novo["_id"], upserted_ids={0: novo["_id"]})
+
+        alterados = []
+        for documento in alvos:
+            if substituir:
+                novo = {"_id": documento["_id"], **copy.deepcopy(atualizacao)}
+            else:
+                novo = _aplicar(documento, atualizacao)
+            if novo != documento:
+                chave = json_util.dumps(documento["_id"])
+                self._verificar_unicos(novo, ignorar=chave)
+                alterados.append((chave, novo))
+        self._gravar(alterados)
+        depois = alterados[0][1] if alterados else alvos[0]
+        return alvos[0], depois, Resultado(matched_count=len(alvos), modified_count=len(alterados))
+
+    # Interface do pymongo.collection.Collection usada pelo app
+    def find(self, filtro=None, projecao=None, **_):
+        return CursorLocal(self, filtro, projecao)
+
+    def find_one(self, filtro=None, projecao=None, sort=None, **_):
+        cursor = self.find(filtro, projecao)
+        if sort:
+            cursor.sort(sort)
+        return next(iter(cursor.limit(1)), None)
+
+    def count_documents(self, filtro, **_):
+        if not filtro:
+            return self.estimated_document_count()
+        return len(self._filtrar(filtro))
+
+    def estimated_document_count(self):
+        with self.banco.lock:
+            self._sincronizar()
+            return len(self.documentos)
+
+    def aggregate(self, pipeline, **_):
+        documentos = self._filtrar({})
+        return iter(_executar_pipeline([copy.deepcopy(documento) for documento in documentos], pipeline))
+
+    def watch(self, *args, **kwargs):
+        raise OperationFailure("O armazenamento local não oferece change streams")
+
+    def create_index(self, chaves, unique=False, name=None, **_):
+        chaves = [list(chave) for chave in _normalizar_ordem(chaves)]
+        name = name or "_".join(f"{campo}_{direcao}" for campo, direcao in chaves)
+        with self.banco.lock:
+            self._sincronizar()
+            mapa = self._mapear(chaves)
+            # Como no MongoDB, um índice único não é criado sobre dados duplicados
+            if unique and any(len(ids) > 1 for ids in mapa.values()):
+                raise DuplicateKeyError(f"E11000 duplicate key error collection: {self.nome} index: {name}", 11000)
+            self.banco.conexao.execute(
+                "INSERT OR REPLACE INTO _indices (colecao, nome, chaves, unico) VALUES (?, ?, ?, ?)",
+                (self.nome, name, json_util.dumps(chaves), int(unique)),
+            )
+            self.indices[name] = (chaves, unique)
+            self.mapas[name] = mapa
+        return name
+
+    def index_information(self):
+        with self.banco.lock:
+            self._sincronizar()
+            informacoes = {"_id_": {"key": [("_id", ASCENDING)]}}
+            for nome, (chaves, unico) in self.indices.items():
+                informacoes[nome] = {"key": [tuple(chave) for chave in chaves], **({"unique": True} if unico else {})}
+            return informacoes
+
+    def drop_index(self, nome, **_):
+        with self.banco.lock:
+            self._sincronizar()
+            if nome not in self.indices:
+                raise OperationFailure(f"index not found with name [{nome}]", 27)
+            self.banco.conexao.execute("DELETE FROM _indices WHERE colecao = ? AND nome = ?", (self.nome, nome))
+            del self.indices[nome], self.mapas[nome]
+
+    def insert_one(self, documento, **_):
+        with self.banco.lock:
+            self._sincronizar()
+            # Como o pymongo, o _id gerado também aparece no dicionário recebido
+            documento.setdefault("_id", ObjectId())
+            return Resultado(inserted_id=self._inserir(documento), inserted_count=1)
+
+    def insert_many(self, documentos, ordered=True, **_):
+        resultado = Resultado()
+        erros = []
+        with self.banco.lock:
+            self._sincronizar()
+            for posicao, documento in enumerate(documentos):
+                documento.setdefault("_id", ObjectId())
+                try:
+                    resultado.inserted_ids.append(self._inserir(documento))
+                except DuplicateKeyError as erro:
+                    erros.append({"index": posicao, "code": 11000, "errmsg": str(erro)})
+                    if ordered:
+                        break
+        resultado.inserted_count = len(resultado.inserted_ids)
+        if erros:
+            raise BulkWriteError({"writeErrors": erros, "nInserted": resultado.inserted_count})
+        return resultado
+
+    def update_one(self, filtro, atualizacao, upsert=False, **_):
+        with self.banco.lock:
+            self._sincronizar()
+            return self._atualizar(filtro, atualizacao, upsert)[2]
+
+    def update_many(self, filtro, atualizacao, upsert=False, **_):
+        with self.banco.lock:
+            self._sincronizar()
+            return self._atualizar(filtro, atualizacao, upsert, varios=True)[2]
+
+    def replace_one(self, filtro, documento, upsert=False, **_):
+        with self.banco.lock:
+            self._sincronizar()
+            return self._atualizar(filtro, documento, upsert, substituir=True)[2]
+
+    def find_one_and_update(self, filtro, atualizacao, projecao=None, upsert=False,
+                            return_document=ReturnDocument.BEFORE, **_):
+        with self.banco.lock:
+            self._sincronizar()
+            antes, depois, _ = self._atualizar(filtro, atualizacao, upsert)
+        documento = depois if return_document == ReturnDocument.AFTER else antes
+        return None if documento is None else _projetar(documento, projecao)
+
+    def find_one_and_replace(self, filtro, substituto, projecao=None, upsert=False,
+                             return_document=ReturnDocument.BEFORE, **_):
+        with self.banco.lock:
+            self._sincronizar()
+            antes, depois, _ = self._atualizar(filtro, substituto, upsert, substituir=True)
+        documento = depois if return_document == ReturnDocument.AFTER else antes
+        return None if documento is None else _projetar(documento, projecao)
+
+    def delete_one(self, filtro, **_):
+        return self._apagar(filtro, varios=False)
+
+    def delete_many(self, filtro, **_):
+        return self._apagar(filtro, varios=True)
+
+    def _apagar(self, filtro, varios):
+        with self.banco.lock:
+            self._sincronizar()
+            chaves = [json_util.dumps(documento["_id"]) for documento in self._candidatos(filtro) if _corresponde(documento, filtro)]
+            chaves = chaves if varios else chaves[:1]
+            self._gravar([], removidos=chaves)
+        return Resultado(deleted_count=len(chaves))
+
+    def bulk_write(self, operacoes, ordered=True, **_):
+        total = Resultado()
+        erros = []
+        with self.banco.lock:
+            self._sincronizar()
+            for posicao, operacao in enumerate(operacoes):
+                # As operações do pymongo guardam os argumentos em atributos internos
+                filtro = getattr(operacao, "_filter", None)
+                try:
+                    if isinstance(operacao, InsertOne):
+                        operacao._doc.setdefault("_id", ObjectId())
+                        self._inserir(operacao._doc)
+                        total.inserted_count += 1
+                        continue
+                    if isinstance(operacao, (DeleteOne, DeleteMany)):
+                        chaves = [json_util.dumps(documento["_id"]) for documento in self._candidatos(filtro) if _corresponde(documento, filtro)]
+                        chaves = chaves if isinstance(operacao, DeleteMany) else chaves[:1]
+                        self._gravar([], removidos=chaves)
+                        total.deleted_count += len(chaves)
+                        continue
+                    if isinstance(operacao, (UpdateOne, UpdateMany, ReplaceOne)):
+                        _, _, resultado = self._atualizar(
+                            filtro,
+                            operacao._doc,
+                            upsert=bool(operacao._upsert),
+                            varios=isinstance(operacao, UpdateMany),
+                            substituir=isinstance(operacao, ReplaceOne),
+                        )
+                    else:
+                        raise OperationFailure(f"Operação não suportada pelo armazenamento local: {type(operacao).__name__}")
+                except DuplicateKeyError as erro:
+                    erros.append({"index": posicao, "code": 11000, "errmsg": str(erro), "op": filtro})
+                    if ordered:
+                        break
+                    continue
+                total.matched_count += resultado.matched_count
+                total.modified_count += resultado.modified_count
+                if resultado.upserted_id is not None:
+                    total.upserted_ids[posicao] = resultado.upserted_id
+        if erros:
+            raise BulkWriteError({
+                "writeErrors": erros,
+                "nInserted": total.inserted_count,
+                "nUpserted": total.upserted_count,
+                "nMatched": total.matched_count,
+                "nModified": total.modified_count,
+                "nRemoved": total.deleted_count,
+                "upserted": [{"index": i, "_id": _id} for i, _id in total.upserted_ids.items()],
+            })
+        return total
+
+    def drop(self):
+        with self.banco.lock:
+            self.banco.conexao.execute(f"DELETE FROM {self.tabela}")
+            self.banco.conexao.execute("DELETE FROM _indices WHERE colecao = ?", (self.nome,))
+            self.documentos, self.ordem, self.indices, self.mapas = {}, {}, {}, {}
+
+
+class BancoLocal:
+    """Arquivo SQLite com uma tabela por coleção; banco[nome] devolve a ColecaoLocal."""
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+        # Uma conexão por processo, protegida pelo lock (as sessões do Streamlit rodam em threads)
+        self.conexao = sqlite3.connect(caminho, check_same_thread=False, isolation_level=None)
+        self.conexao.execute("PRAGMA journal_mode=WAL")
+        self.conexao.execute(
+            "CREATE TABLE IF NOT EXISTS _indices (colecao TEXT, nome TEXT, chaves TEXT, unico INTEGER, PRIMARY KEY (colecao, nome))"
+        )
+        self.lock = threading.RLock()
+        self.colecoes = {}
+
+    def versao_arquivo(self):
+        # Muda quando outra conexão (outro processo, ex.: importar_treinos.py) grava no arquivo
+        return self.conexao.execute("PRAGMA data_version").fetchone()[0]
+
+    def __getitem__(self, nome):
+        with self.lock:
+            if nome not in self.colecoes:
+                self.colecoes[nome] = ColecaoLocal(self, nome)
+            return self.colecoes[nome]
+
+    def __getattr__(self, nome):
+        # banco.treinos, como no pymongo
+        if nome.startswith("_"):
+            raise AttributeError(nome)
+        return self[nome]
+
+    def list_collection_names(self):
+        with self.lock:
+            linhas = self.conexao.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name != '_indices'")
+            return [nome for (nome,) in linhas]
@@ -0,0 +1,265 @@
+"""
+Arquivos brutos do relógio (FIT, TCX ou GPX, também .gz) com a FC amostra a amostra.
+
+O arquivo é lido em fluxo, em blocos de TAMANHO_BLOCO amostras (FIT pelo fitdecode, TCX e
+GPX pelo iterparse, descartando cada ponto já lido), e cada bloco entra em somas vetorizadas
+com NumPy: segundos em cada zona de FC (carga_treino.zonas_fc), FC média ponderada pelo
+tempo, FC máxima e calorias pela fórmula de Keytel. O resumo preenche os mesmos campos de
+novo_treino na aba 1.
+
+A série salva com o treino fica em "series_fc", um documento por treino (_id do treino):
+segundos desde o início e batimentos como diferenças sucessivas comprimidas com zlib
+(~1 KB por hora de treino), lidas de volta inteiras para o gráfico da aba 4.
+"""
+import gzip
+import io
+import os
+import zlib
+import xml.etree.ElementTree as ET
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import OperationFailure, ServerSelectionTimeoutError
+
+from agregacoes import COLUNAS_ZONAS
+from carga_treino import FC_MAXIMA, IDADE, zonas_fc
+from conexao import colecao
+from dados import INTERVALO_SINCRONIZACAO, para_datetime, versao_escrita
+from instrumentacao import cronometrado
+
+FORMATOS = ["fit", "tcx", "gpx"]
+TAMANHO_BLOCO = int(os.getenv("ARQUIVOS_TAMANHO_BLOCO", "4096"))
+# Intervalo máximo (s) contado entre duas amostras: pausas não somam tempo nas zonas
+LACUNA_MAXIMA = 10
+# Peso (kg) para a fórmula de Keytel quando não há medida registrada
+PESO_PADRAO = float(os.getenv("PESO_PADRAO_KG", "80"))
+COLECAO_SERIES = "series_fc"
+
+# Zona de carga_treino.zonas_fc (na ordem de COLUNAS_ZONAS) -> campo do formulário da aba 1
+NOMES_ZONAS = list(COLUNAS_ZONAS)
+CAMPOS_ZONAS = [
+    {"Leve": "zona_leve", "Intensa": "zona_intensa", "Aeróbica": "zona_aerobica", "Anaeróbica": "zona_anaerobica",
+     "VO2 Máximo": "zona_maxvo"}[nome]
+    for nome in NOMES_ZONAS
+]
+
+
+def formato_do_arquivo(nome):
+    partes = nome.lower().removesuffix(".gz").rsplit(".", 1)
+    if len(partes) < 2 or partes[1] not in FORMATOS:
+        raise ValueError(f"Formato não suportado: {nome} (use {', '.join(FORMATOS)}, opcionalmente .gz)")
+    return partes[1]
+
+
+def _local(tag):
+    # Nome do elemento sem o namespace: "{http://...}Trackpoint" -> "Trackpoint"
+    return tag.rsplit("}", 1)[-1]
+
+
+def _bloco_fit(tempos, batimentos):
+    # Converte as listas acumuladas num bloco (segundos desde 1970, bpm) e as esvazia
+    bloco = (np.asarray(tempos, dtype="int64"), np.asarray(batimentos, dtype="float64"))
+    tempos.clear()
+    batimentos.clear()
+    return bloco
+
+
+def _ler_fit(fluxo, extras, tamanho):
+    import fitdecode
+
+    tempos, batimentos = [], []
+    try:
+        with fitdecode.FitReader(fluxo) as leitor:
+            for quadro in leitor:
+                if not isinstance(quadro, fitdecode.FitDataMessage):
+                    continue
+                if quadro.name == "record":
+                    if quadro.has_field("timestamp") and quadro.get_value("heart_rate", fallback=None):
+                        tempos.append(int(quadro.get_value("timestamp").timestamp()))
+                        batimentos.append(quadro.get_value("heart_rate"))
+                        if len(tempos) >= tamanho:
+                            yield _bloco_fit(tempos, batimentos)
+                elif quadro.name == "session" and quadro.get_value("total_calories", fallback=None):
+                    extras["calorias"] = extras.get("calorias", 0) + quadro.get_value("total_calories")
+    except fitdecode.FitError as erro:
+        raise ValueError(f"Arquivo FIT inválido: {erro}") from erro
+    if tempos:
+        yield _bloco_fit(tempos, batimentos)
+
+
+def _ler_xml(fluxo, extras, tamanho):
+    # TCX (Trackpoint, Time, HeartRateBpm/Value, Calories da volta) e GPX (trkpt, time, hr)
+    textos, batimentos = [], []
+    for _, elemento in ET.iterparse(fluxo, events=("end",)):
+        nome = _local(elemento.tag)
+        if nome in ("Trackpoint", "trkpt"):
+            tempo = batimento = None
+            for filho in elemento.iter():
+                filho_nome = _local(filho.tag)
+                if filho_nome in ("Time", "time"):
+                    tempo = filho.text
+                elif filho_nome in ("Value", "hr", "heartrate") and filho.text:
+                    batimento = filho.text
+            if tempo and batimento:
+                textos.append(tempo)
+                batimentos.append(float(batimento))
+            elemento.clear()
+            if len(textos) >= tamanho:
+                yield _bloco_xml(textos, batimentos)
+        elif nome in ("Track", "trkseg"):
+            elemento.clear()
+        elif nome == "Calories" and elemento.text:
+            extras["calorias"] = extras.get("calorias", 0) + float(elemento.text)
+    if textos:
+        yield _bloco_xml(textos, batimentos)
+
+
+def _bloco_xml(textos, batimentos):
+    # Datas ISO do bloco inteiro de uma vez
+    segundos = pd.to_datetime(textos, utc=True, format="ISO8601").as_unit("s").asi8
+    bloco = (segundos, np.asarray(batimentos, dtype="float64"))
+    textos.clear()
+    batimentos.clear()
+    return bloco
+
+
+def calorias_keytel(bpm, segundos, peso):
+    """Calorias (kcal) de cada intervalo pela FC (Keytel et al., 2005, equação masculina)."""
+    por_minuto = (-55.0969 + 0.6309 * bpm + 0.1988 * peso + 0.2017 * IDADE) / 4.184
+    return np.clip(por_minuto, 0, None) * segundos / 60
+
+
+@cronometrado("arquivo")
+def processar(arquivo, nome, peso=None):
+    """
+    Lê um arquivo do relógio e devolve (resumo, segundos, bpm). O resumo tem os campos do
+    formulário da aba 1 (data, tempo_total, calorias, bpm_medio, bpm_max e os minutos de
+    cada zona em CAMPOS_ZONAS); segundos (desde 1970) e bpm são a série completa.
+    Arquivos ilegíveis ou sem FC levantam ValueError.
+    """
+    formato = formato_do_arquivo(nome)
+    fluxo = gzip.GzipFile(fileobj=arquivo) if nome.lower().endswith(".gz") else arquivo
+    leitor = _ler_fit if formato == "fit" else _ler_xml
+    peso = peso or PESO_PADRAO
+
+    extras = {}
+    partes_segundos, partes_bpm = [], []
+    segundos_zona = np.zeros(5)
+    ativo = soma_bpm = calorias = 0.0
+    bpm_max = 0
+    anterior = None
+    try:
+        for segundos, bpm in leitor(fluxo, extras, TAMANHO_BLOCO):
+            # Tempo até a amostra anterior (a primeira do arquivo não conta), sem as pausas
+            intervalos = np.diff(segundos, prepend=segundos[0] if anterior is None else anterior)
+            intervalos = np.clip(intervalos, 0, LACUNA_MAXIMA).astype("float64")
+            anterior = segundos[-1]
+            segundos_zona += np.bincount(zonas_fc(bpm).astype("int64") - 1, weights=intervalos, minlength=5)
+            ativo += intervalos.sum()
+            soma_bpm += (bpm * intervalos).sum()
+            calorias += calorias_keytel(bpm, intervalos, peso).sum()
+            bpm_max = max(bpm_max, int(bpm.max()))
+            partes_segundos.append(segundos)
+            partes_bpm.append(np.clip(bpm, 0, 255).astype("uint8"))
+    except (ET.ParseError, OSError, EOFError) as erro:
+        # XML malformado ou .gz corrompido; os erros do FIT já chegam como ValueError
+        raise ValueError(f"Arquivo {formato.upper()} inválido: {erro}") from erro
+
+    if not partes_segundos:
+        raise ValueError("Nenhuma amostra de frequência cardíaca no arquivo.")
+    segundos = np.concatenate(partes_segundos)
+    bpm = np.concatenate(partes_bpm)
+    resumo = {
+        # Horário local do servidor, como as datas digitadas no formulário
+        "data": datetime.fromtimestamp(int(segundos[0])),
+        "tempo_total": round((segundos[-1] - segundos[0]) / 60),
+        # As calorias do próprio relógio (FIT/TCX), quando vêm no arquivo
+        "calorias": round(extras.get("calorias") or calorias),
+        "bpm_medio": round(soma_bpm / ativo) if ativo else round(float(bpm.mean())),
+        "bpm_max": bpm_max,
+        **{campo: round(minutos) for campo, minutos in zip(CAMPOS_ZONAS, segundos_zona / 60)},
+        "amostras": len(bpm),
+        "formato": formato,
+    }
+    return resumo, segundos, bpm
+
+
+# Resultado por conteúdo do arquivo: os reruns da aba 1 não leem o arquivo de novo
+@st.cache_data(max_entries=8, show_spinner=False)
+def ler_arquivo(conteudo, nome, peso=None):
+    return processar(io.BytesIO(conteudo), nome, peso)
+
+
+def _comprimir(valores, tipo):
+    return zlib.compress(np.diff(valores, prepend=0).astype(tipo).tobytes())
+
+
+def _descomprimir(dados, tipo):
+    return np.cumsum(np.frombuffer(zlib.decompress(dados), dtype=tipo), dtype="int64")
+
+
+@st.cache_resource(show_spinner=False)
+def criar_indice_series():
+    colecao(COLECAO_SERIES).create_index([("inicio", ASCENDING)])
+    return True
+
+
+def gravar_serie(treino_id, treino, segundos, bpm, sessao=None):
+    """Guarda a série de FC do arquivo junto do treino salvo (substitui a anterior, se houver)."""
+    criar_indice_series()
+    colecao(COLECAO_SERIES).replace_one({"_id": treino_id}, {
+        "inicio": datetime.fromtimestamp(int(segundos[0])),
+        "Data": treino["Data"],
+        "Tipo de Treino": treino["Tipo de Treino"],
+        "amostras": len(bpm),
+        "segundos": _comprimir(segundos - segundos[0], "<i4"),
+        "bpm": _comprimir(bpm.astype("int64"), "<i2"),
+    }, upsert=True, session=sessao)
+
+
+@st.cache_data(ttl=INTERVALO_SINCRONIZACAO, show_spinner=False)
+def _listar_series(data_inicio, data_fim, versao):
+    filtro = {}
+    if data_inicio and data_fim:
+        filtro["Data"] = {"$gte": para_datetime(data_inicio), "$lte": para_datetime(data_fim)}
+    projecao = {"inicio": 1, "Data": 1, "Tipo de Treino": 1, "amostras": 1}
+    try:
+        documentos = list(colecao(COLECAO_SERIES).find(filtro, projecao).sort("inicio", DESCENDING))
+    except (OperationFailure, ServerSelectionTimeoutError):
+        # As séries não entram nos snapshots: sem o MongoDB a página segue sem elas (None)
+        return None
+    return pd.DataFrame(documentos, columns=["_id", "inicio", "Data", "Tipo de Treino", "amostras"])
+
+
+@cronometrado("carregador")
+def listar_series(data_inicio=None, data_fim=None):
+    """Séries gravadas no período (sem os dados), mais recentes primeiro; None sem o MongoDB."""
+    # As séries são gravadas junto com o treino: a versão dos treinos também as acompanha
+    return _listar_series(data_inicio, data_fim, versao_escrita("treinos"))
+
+
+# Por chave em texto: o Streamlit não calcula o hash de um ObjectId
+@st.cache_data(max_entries=16, show_spinner=False)
+def _ler_serie(chave, _serie_id):
+    documento = colecao(COLECAO_SERIES).find_one({"_id": _serie_id})
+    if documento is None:
+        return None
+    segundos = _descomprimir(documento["segundos"], "<i4")
+    return pd.DataFrame({
+        "Tempo": pd.Timestamp(documento["inicio"]) + pd.to_timedelta(segundos, unit="s"),
+        "Batimento (bpm)": _descomprimir(documento["bpm"], "<i2").astype("int16"),
+    })
+
+
+@cronometrado("carregador")
+def ler_serie(serie_id):
+    """Série de um treino: "Tempo" (datetime) e "Batimento (bpm)"; None se não existe."""
+    return _ler_serie(str(serie_id), serie_id)
+
+
+def limites_zonas():
+    """FC (bpm) em que começa cada zona depois da Leve: 60%, 70%, 80% e 90% de FC_MAXIMA."""
+    return [FC_MAXIMA * fracao for fracao in (0.6, 0.7, 0.8, 0.9)]
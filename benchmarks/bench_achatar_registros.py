@@ -0,0 +1,82 @@
+"""
+Compara o desaninhamento de "Detalhes" antigo (iterrows + loop interno) com
+dados.achatar_registros em 10 mil e 100 mil registros sintéticos.
+
+Uso: python benchmarks/bench_achatar_registros.py
+"""
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from dados import achatar_registros  # noqa: E402
+
+TAMANHOS = [10_000, 100_000]
+EXERCICIOS_POR_TREINO = 6
+TREINOS = ["Posterior e Glúteos", "Quadriceps", "Superiores empurrar", "Superiores puxar", "Core e HIIT"]
+
+
+def gerar_exercicios():
+    return pd.DataFrame([
+        {"nome": f"{treino} {i}", "dia_do_treino": treino, "series": 3 + i % 2, "musculo": treino.split()[0]}
+        for treino in TREINOS
+        for i in range(EXERCICIOS_POR_TREINO)
+    ])
+
+
+def gerar_registros(quantidade, seed=42):
+    aleatorio = random.Random(seed)
+    inicio = datetime(2020, 1, 1)
+    registros = []
+    for i in range(quantidade):
+        treino = TREINOS[i % len(TREINOS)]
+        data = inicio + timedelta(days=i // 2)
+        registros.append({
+            "Treino": treino,
+            "Data do Registro": data.strftime("%Y-%m-%d"),
+            "Detalhes": [
+                {"Exercício": f"{treino} {j}", "Repetições": aleatorio.randint(6, 15),
+                 "Peso (kg)": round(aleatorio.uniform(2, 80), 1), "Data": data.strftime("%Y-%m-%d")}
+                for j in range(EXERCICIOS_POR_TREINO)
+            ],
+        })
+    return registros
+
+
+# Implementação anterior da aba 7, mantida aqui só para comparação
+def achatar_com_loop(registros, df_exercicios):
+    df_registros_exercicios = pd.DataFrame(registros)
+    registros_detalhes = []
+    for _, registro in df_registros_exercicios.iterrows():
+        if isinstance(registro["Detalhes"], list):
+            for detalhe in registro["Detalhes"]:
+                detalhe["Data"] = registro["Data do Registro"]
+                registros_detalhes.append(detalhe)
+    df_detalhes = pd.DataFrame(registros_detalhes)
+    df_detalhes["Peso (kg)"] = pd.to_numeric(df_detalhes["Peso (kg)"], errors="coerce")
+    df_detalhes["Repetições"] = pd.to_numeric(df_detalhes["Repetições"], errors="coerce")
+    df_detalhes["Data"] = pd.to_datetime(df_detalhes["Data"], format="%Y-%m-%d")
+    return pd.merge(df_detalhes, df_exercicios[["nome", "series", "musculo"]], left_on="Exercício", right_on="nome", how="inner")
+
+
+def cronometrar(funcao, *args):
+    inicio = time.perf_counter()
+    resultado = funcao(*args)
+    return time.perf_counter() - inicio, resultado
+
+
+if __name__ == "__main__":
+    df_exercicios = gerar_exercicios()
+    for tamanho in TAMANHOS:
+        tempo_loop, df_loop = cronometrar(achatar_com_loop, gerar_registros(tamanho), df_exercicios)
+        tempo_vetorizado, df_vetorizado = cronometrar(achatar_registros, gerar_registros(tamanho), df_exercicios)
+        assert len(df_loop) == len(df_vetorizado)
+        print(
+            f"{tamanho:>7} registros ({len(df_vetorizado)} linhas): "
+            f"loop {tempo_loop:.2f}s | vetorizado {tempo_vetorizado:.2f}s | "
+            f"{tempo_loop / tempo_vetorizado:.1f}x"
+        )
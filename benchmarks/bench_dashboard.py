@@ -0,0 +1,240 @@
+"""
+Suíte de benchmarks do dashboard em várias escalas de dados sintéticos (gerar_dados.py),
+sobre o armazenamento local em SQLite: não precisa de servidor MongoDB.
+
+Cada escala roda num processo novo, com banco e snapshots numa pasta temporária, e mede:
+- carregadores: cada conjunto de dados.CARREGADORES, frio (caches limpos) e com cache;
+- cálculos: snapshots, rollups e as agregações usadas pelas páginas, frios e com cache;
+- páginas: o app.py inteiro no AppTest do Streamlit, a primeira abertura de cada página
+  e os reruns seguintes (uma interação qualquer na página).
+
+Uso: python benchmarks/bench_dashboard.py [--escalas pequena media grande] [--repeticoes 3]
+     [--json saida.json] [--comparar anterior.json] [--tolerancia 0.25]
+Com --comparar, sai com código 1 se algum tempo passar do anterior em mais de --tolerancia
+(verificação de regressão entre commits).
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+# Escala -> (anos de histórico, atletas)
+ESCALAS = {
+    "pequena": (1, 1),
+    "media": (5, 1),
+    "grande": (5, 10),
+    "multiusuario": (5, 50),
+}
+ESCALAS_PADRAO = ["pequena", "media", "grande"]
+SEMENTE = 42
+# Diferenças abaixo disso (ms) são ruído e não contam como regressão
+MINIMO_REGRESSAO_MS = 5.0
+
+
+def medir(funcao, repeticoes=1, preparar=None):
+    """Mediana em ms de `repeticoes` chamadas; `preparar` roda antes de cada uma, fora da conta."""
+    tempos = []
+    for _ in range(repeticoes):
+        if preparar:
+            preparar()
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    return round(statistics.median(tempos), 2)
+
+
+def limpar_caches():
+    import streamlit as st
+
+    st.cache_data.clear()
+    st.cache_resource.clear()
+
+
+def _frio_e_cache(funcao, repeticoes):
+    return {"frio": medir(funcao, preparar=limpar_caches), "cache": medir(funcao, repeticoes)}
+
+
+def medir_escala(nome, repeticoes):
+    """Roda dentro do processo da escala, com ARMAZENAMENTO=local já no ambiente."""
+    from gerar_dados import gerar, popular
+
+    anos, atletas = ESCALAS[nome]
+    inicio = time.perf_counter()
+    documentos = gerar(anos, atletas, SEMENTE)
+    geracao_ms = (time.perf_counter() - inicio) * 1000
+    series = sum(
+        len(detalhe["Repetições"]) for registro in documentos["registros_exercicios"] for detalhe in registro["Detalhes"]
+    )
+
+    from conexao import banco
+
+    inicio = time.perf_counter()
+    contagens = popular(banco(), documentos, limpar=True)
+    gravacao_ms = (time.perf_counter() - inicio) * 1000
+    del documentos
+
+    import agregacoes
+    import carga_treino
+    import recordes
+    import rollups
+    import snapshots
+    from dados import CARREGADORES, criar_indices
+
+    criar_indices()
+    carregadores = {conjunto: _frio_e_cache(lambda: carregador(colunas=None), repeticoes)
+                    for conjunto, carregador in CARREGADORES.items()}
+
+    calculos = {
+        "snapshots (completo)": medir(lambda: [snapshots.atualizar(conjunto, completo=True) for conjunto in snapshots.CONJUNTOS]),
+        "rollups (reconstrução)": medir(rollups.reconstruir_rollups),
+        "rollups por mês": _frio_e_cache(lambda: rollups.ler_rollups("mes"), repeticoes),
+        "carga (reconstrução)": medir(carga_treino.reconstruir_carga),
+        "carga (ATL/CTL/TSB)": _frio_e_cache(carga_treino.ler_carga, repeticoes),
+        "recordes (reconstrução)": medir(recordes.reconstruir_recordes),
+        "recordes por exercício": _frio_e_cache(recordes.ler_recordes, repeticoes),
+        "estatisticas_treinos": _frio_e_cache(agregacoes.estatisticas_treinos, repeticoes),
+        "tempo_por_zona": _frio_e_cache(agregacoes.tempo_por_zona, repeticoes),
+        "frequencia_por_tipo": _frio_e_cache(agregacoes.frequencia_por_tipo, repeticoes),
+        "volume_por_musculo": _frio_e_cache(agregacoes.volume_por_musculo, repeticoes),
+    }
+
+    from streamlit.testing.v1 import AppTest
+
+    limpar_caches()
+    app = AppTest.from_file(os.path.join(RAIZ, "app.py"), default_timeout=600)
+    paginas = {"(inicial)": {"primeira": medir(app.run)}}
+    erros = [excecao.message for excecao in app.exception]
+    for pagina in app.sidebar.radio[0].options:
+        paginas[pagina] = {
+            "primeira": medir(lambda: app.sidebar.radio[0].set_value(pagina).run()),
+            "rerun": medir(app.run, repeticoes),
+        }
+        erros += [f"{pagina}: {excecao.message}" for excecao in app.exception]
+
+    return {
+        "anos": anos,
+        "atletas": atletas,
+        "documentos": contagens,
+        "series": series,
+        "geracao_ms": round(geracao_ms, 2),
+        "gravacao_ms": round(gravacao_ms, 2),
+        "carregadores_ms": carregadores,
+        "calculos_ms": calculos,
+        "paginas_ms": paginas,
+        "erros": erros,
+    }
+
+
+def rodar_escala(nome, repeticoes):
+    # Processo novo: sys.modules, caches do Streamlit e configuração (conexao.py) limpos
+    with tempfile.TemporaryDirectory() as pasta:
+        saida = os.path.join(pasta, "resultado.json")
+        ambiente = dict(
+            os.environ,
+            ARMAZENAMENTO="local",
+            ARMAZENAMENTO_ARQUIVO=os.path.join(pasta, "dados.sqlite3"),
+            SNAPSHOTS_DIR=os.path.join(pasta, "snapshots"),
+            RELATORIOS_DIR=os.path.join(pasta, "relatorios"),
+        )
+        subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--_escala", nome, "--repeticoes", str(repeticoes), "--_saida", saida],
+            cwd=RAIZ, env=ambiente, check=True,
+        )
+        with open(saida, encoding="utf-8") as arquivo:
+            return json.load(arquivo)
+
+
+def versao_do_codigo():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def tempos(resultado, prefixo=""):
+    """Achata os tempos (chaves *_ms e o que estiver abaixo delas) em {caminho: ms}."""
+    achatado = {}
+    for chave, valor in resultado.items():
+        caminho = f"{prefixo}/{chave}" if prefixo else chave
+        if isinstance(valor, dict):
+            achatado.update(tempos(valor, caminho))
+        elif isinstance(valor, (int, float)) and "_ms" in caminho:
+            achatado[caminho] = valor
+    return achatado
+
+
+def comparar(atual, anterior, tolerancia):
+    """Tempos que pioraram mais que a tolerância: [(caminho, antes, agora)]."""
+    antes = tempos(anterior["escalas"])
+    return [
+        (caminho, antes[caminho], agora)
+        for caminho, agora in tempos(atual["escalas"]).items()
+        if caminho in antes and agora - antes[caminho] > max(MINIMO_REGRESSAO_MS, antes[caminho] * tolerancia)
+    ]
+
+
+def imprimir(nome, resultado):
+    print(f"\n== {nome}: {resultado['anos']} ano(s), {resultado['atletas']} atleta(s), "
+          f"{resultado['documentos']['treinos']} treinos, {resultado['series']} séries")
+    for grupo in ["carregadores_ms", "calculos_ms", "paginas_ms"]:
+        print(f"  {grupo[:-3]}:")
+        for item, valor in resultado[grupo].items():
+            detalhes = " | ".join(f"{k} {v:8.1f} ms" for k, v in valor.items()) if isinstance(valor, dict) else f"{valor:8.1f} ms"
+            print(f"    {item:<40} {detalhes}")
+    for erro in resultado["erros"]:
+        print(f"  ERRO {erro}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks do dashboard em várias escalas de dados sintéticos.")
+    parser.add_argument("--escalas", nargs="+", choices=list(ESCALAS), default=ESCALAS_PADRAO)
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--json", help="grava o resultado neste arquivo (histórico entre commits)")
+    parser.add_argument("--comparar", help="resultado anterior (--json) para verificar regressões")
+    parser.add_argument("--tolerancia", type=float, default=0.25, help="piora relativa aceita (padrão 25%%)")
+    parser.add_argument("--_escala", help=argparse.SUPPRESS)
+    parser.add_argument("--_saida", help=argparse.SUPPRESS)
+    argumentos = parser.parse_args()
+
+    if argumentos._escala:
+        from streamlit.logger import set_log_level
+
+        # Fora do `streamlit run` os caches avisam a cada chamada que não há runtime
+        set_log_level("error")
+        sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+        with open(argumentos._saida, "w", encoding="utf-8") as arquivo:
+            json.dump(medir_escala(argumentos._escala, argumentos.repeticoes), arquivo, ensure_ascii=False)
+        sys.exit(0)
+
+    resultado = {
+        "commit": versao_do_codigo(),
+        "data": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "repeticoes": argumentos.repeticoes,
+        "escalas": {},
+    }
+    for nome in argumentos.escalas:
+        resultado["escalas"][nome] = rodar_escala(nome, argumentos.repeticoes)
+        imprimir(nome, resultado["escalas"][nome])
+    if argumentos.json:
+        with open(argumentos.json, "w", encoding="utf-8") as arquivo:
+            json.dump(resultado, arquivo, indent=2, ensure_ascii=False)
+
+    if argumentos.comparar:
+        with open(argumentos.comparar, encoding="utf-8") as arquivo:
+            regressoes = comparar(resultado, json.load(arquivo), argumentos.tolerancia)
+        for caminho, antes, agora in regressoes:
+            print(f"Regressão: {caminho}: {antes:.1f} -> {agora:.1f} ms")
+        if regressoes:
+            sys.exit(1)
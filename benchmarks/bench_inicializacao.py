@@ -0,0 +1,84 @@
+"""
+Tempo de inicialização do app.py: importa, num interpretador novo e com
+`python -X importtime`, os mesmos módulos que o app.py importa no topo do arquivo
+e compara o total com o orçamento de cold start. Imports feitos dentro das abas
+(ex.: ocr, importar_treinos) não entram na conta, que é justamente o objetivo.
+
+Uso: python benchmarks/bench_inicializacao.py [--orcamento-ms 1500] [--repeticoes 5] [--json saida.json]
+Sai com código 1 se a mediana passar do orçamento (verificação de regressão).
+"""
+import argparse
+import ast
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP = os.path.join(RAIZ, "app.py")
+# Orçamento de cold start dos imports do app.py (ms); acompanhar a cada versão
+ORCAMENTO_MS = float(os.getenv("INICIALIZACAO_ORCAMENTO_MS", "1500"))
+MAIS_LENTOS = 10
+
+
+def imports_do_topo(caminho=APP):
+    """Código com os imports de nível de módulo do arquivo, na ordem em que aparecem."""
+    with open(caminho, encoding="utf-8") as arquivo:
+        arvore = ast.parse(arquivo.read())
+    return "\n".join(ast.unparse(no) for no in arvore.body if isinstance(no, (ast.Import, ast.ImportFrom)))
+
+
+def medir_uma_vez(codigo):
+    # Processo novo a cada medição: nada vem de sys.modules de uma rodada anterior
+    saida = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", codigo],
+        cwd=RAIZ, capture_output=True, text=True, check=True,
+    ).stderr
+    pacotes = {}
+    for linha in saida.splitlines():
+        if not linha.startswith("import time:") or "|" not in linha:
+            continue
+        _, acumulado, modulo = linha.split("|")
+        if not acumulado.strip().isdigit():
+            continue  # cabeçalho
+        # Só os imports de primeiro nível; os aninhados já estão no acumulado deles
+        if not modulo.startswith("  "):
+            pacotes[modulo.strip()] = int(acumulado) / 1000
+    return pacotes
+
+
+def medir(repeticoes=5, codigo=None):
+    codigo = codigo or imports_do_topo()
+    rodadas = [medir_uma_vez(codigo) for _ in range(repeticoes)]
+    totais = [sum(rodada.values()) for rodada in rodadas]
+    modulos = {modulo: statistics.median(rodada.get(modulo, 0) for rodada in rodadas) for modulo in rodadas[0]}
+    return {
+        "total_ms": statistics.median(totais),
+        "minimo_ms": min(totais),
+        "maximo_ms": max(totais),
+        "repeticoes": repeticoes,
+        "modulos_ms": dict(sorted(modulos.items(), key=lambda item: item[1], reverse=True)),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mede o tempo de import do app.py (cold start).")
+    parser.add_argument("--orcamento-ms", type=float, default=ORCAMENTO_MS)
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--json", help="grava o resultado neste arquivo (histórico entre versões)")
+    argumentos = parser.parse_args()
+
+    resultado = medir(argumentos.repeticoes)
+    resultado["orcamento_ms"] = argumentos.orcamento_ms
+    print(f"Imports do app.py: {resultado['total_ms']:.0f} ms (mediana de {argumentos.repeticoes}, "
+          f"mín {resultado['minimo_ms']:.0f} / máx {resultado['maximo_ms']:.0f}) | orçamento {argumentos.orcamento_ms:.0f} ms")
+    for modulo, tempo in list(resultado["modulos_ms"].items())[:MAIS_LENTOS]:
+        print(f"  {tempo:8.1f} ms  {modulo}")
+    if argumentos.json:
+        with open(argumentos.json, "w", encoding="utf-8") as arquivo:
+            json.dump(resultado, arquivo, indent=2, ensure_ascii=False)
+
+    if resultado["total_ms"] > argumentos.orcamento_ms:
+        print(f"Acima do orçamento em {resultado['total_ms'] - argumentos.orcamento_ms:.0f} ms")
+        sys.exit(1)
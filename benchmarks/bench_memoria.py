@@ -0,0 +1,108 @@
+"""
+Memória ocupada pelos DataFrames carregados, antes e depois da projeção de colunas e dos
+tipos compactos de dados.compactar, em treinos, medidas e detalhes de exercícios sintéticos.
+
+Antes: todos os campos do documento, com os tipos que o pandas infere (object para textos).
+Compactado: todos os campos, com dados.compactar.
+Projetado: só as colunas usadas pelos gráficos (ex.: página Indicadores), com dados.compactar.
+
+Uso: python benchmarks/bench_memoria.py [quantidade de treinos, padrão 100000]
+"""
+import os
+import random
+import sys
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from dados import achatar_registros, compactar, converter_datas  # noqa: E402
+
+TIPOS = ["Posterior, Glúteos e Adutores", "Quadríceps, Glúteos e Panturrilhas", "Peito, Ombro e Tríceps",
+         "Costas e Bíceps", "Core + HIIT", "Aeróbico"]
+EXERCICIOS = [f"Exercício {i}" for i in range(30)]
+MUSCULOS = ["Quadríceps", "Posterior", "Peito", "Costas", "Ombro", "Core"]
+
+
+def gerar_treinos(quantidade, aleatorio):
+    inicio = datetime(2020, 1, 1)
+    return [{
+        "Data": inicio + timedelta(hours=12 * i),
+        "Tipo de Treino": aleatorio.choice(TIPOS),
+        "Tempo Total (min)": aleatorio.randint(20, 120),
+        "Calorias Queimadas": aleatorio.randint(150, 900),
+        "Batimento Médio (bpm)": aleatorio.randint(90, 160),
+        "Batimento Máximo (bpm)": aleatorio.randint(150, 195),
+        "Zona Leve (min)": aleatorio.randint(0, 40),
+        "Zona Intensa (min)": aleatorio.randint(0, 40),
+        "Zona Aeróbica (min)": aleatorio.randint(0, 40),
+        "Zona Anaeróbica (min)": aleatorio.randint(0, 20),
+        "Zona Max. VO2 (min)": aleatorio.randint(0, 10),
+        "Mobilidade (min)": aleatorio.randint(0, 15),
+        "Aeróbico (min)": aleatorio.randint(0, 30),
+        "Comentários": aleatorio.choice(["", "Treino pesado, pouca energia no fim.", "Ótimo treino, carga aumentou."]),
+    } for i in range(quantidade)]
+
+
+def gerar_medidas(quantidade, aleatorio):
+    inicio = datetime(2020, 1, 1)
+    campos = ["Peso (kg)", "Tórax (cm)", "Cintura (cm)", "Abdômen (cm)", "Quadril (cm)", "Braço Direito (cm)",
+              "Braço Esquerdo (cm)", "Coxa Direita (cm)", "Coxa Esquerda (cm)", "Panturrilha Direita (cm)",
+              "Panturrilha Esquerda (cm)"]
+    return [{"Data": inicio + timedelta(days=i), **{campo: round(aleatorio.uniform(30, 100), 1) for campo in campos},
+             "Observações": aleatorio.choice(["", "Medido pela manhã, em jejum."])} for i in range(quantidade)]
+
+
+def gerar_registros(quantidade, aleatorio):
+    inicio = datetime(2020, 1, 1)
+    return [{
+        "Treino": aleatorio.choice(TIPOS),
+        "Data do Registro": inicio + timedelta(days=i),
+        "Detalhes": [{"Exercício": exercicio, "Repetições": aleatorio.randint(6, 15), "Peso (kg)": aleatorio.randint(5, 120)}
+                     for exercicio in aleatorio.sample(EXERCICIOS, 6)],
+    } for i in range(quantidade)]
+
+
+def megabytes(frame):
+    return frame.memory_usage(deep=True).sum() / 2 ** 20
+
+
+def sem_compactar(documentos, campo_data="Data"):
+    frame = pd.DataFrame(documentos)
+    frame[campo_data] = converter_datas(frame[campo_data])
+    return frame
+
+
+def relatorio(nome, antes, compactado, projetado):
+    print(f"{nome:>20}: {megabytes(antes):8.2f} MB antes | {megabytes(compactado):8.2f} MB compactado "
+          f"| {megabytes(projetado):8.2f} MB projetado ({megabytes(antes) / megabytes(projetado):.1f}x menor)")
+
+
+if __name__ == "__main__":
+    quantidade = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    aleatorio = random.Random(3)
+
+    treinos = gerar_treinos(quantidade, aleatorio)
+    colunas = ["Data", "Calorias Queimadas", "Tempo Total (min)", "Tipo de Treino"]
+    relatorio(
+        "treinos",
+        sem_compactar(treinos),
+        compactar(sem_compactar(treinos)),
+        compactar(sem_compactar([{coluna: doc[coluna] for coluna in colunas} for doc in treinos])),
+    )
+
+    medidas = gerar_medidas(quantidade // 10, aleatorio)
+    colunas = ["Data", "Peso (kg)", "Tórax (cm)", "Cintura (cm)", "Abdômen (cm)", "Quadril (cm)"]
+    relatorio(
+        "medidas",
+        sem_compactar(medidas),
+        compactar(sem_compactar(medidas)),
+        compactar(sem_compactar([{coluna: doc[coluna] for coluna in colunas} for doc in medidas])),
+    )
+
+    catalogo = pd.DataFrame({"nome": EXERCICIOS, "series": [3 + i % 2 for i in range(len(EXERCICIOS))],
+                             "musculo": [MUSCULOS[i % len(MUSCULOS)] for i in range(len(EXERCICIOS))]})
+    detalhes = achatar_registros(gerar_registros(quantidade // 2, aleatorio), catalogo)
+    antes = detalhes.astype({coluna: object for coluna in ["Treino", "Exercício", "musculo"]}).astype(
+        {"Repetições": "int64", "series": "float64", "Peso (kg)": "float64"})
+    relatorio("detalhes_exercicios", antes, detalhes, detalhes[["Data", "Exercício", "Peso (kg)"]])
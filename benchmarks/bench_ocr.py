@@ -0,0 +1,63 @@
+"""
+Compara o OCR antigo (tesseract na imagem inteira, em resolução original) com
+ocr.processar_imagem (pré-processamento + recortes por região) nas imagens de
+benchmarks/fixtures/ocr: tempo por imagem e campos lidos corretamente.
+
+Uso: TESSERACT_CMD=/usr/bin/tesseract python benchmarks/bench_ocr.py
+(requer o binário do tesseract com o idioma "por")
+As imagens podem ser regeneradas com benchmarks/gerar_fixtures_ocr.py.
+"""
+import json
+import os
+import sys
+import time
+
+import pytesseract
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import ocr  # noqa: E402
+
+PASTA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "ocr")
+
+
+# Implementação anterior de processar_imagem, mantida aqui só para comparação
+def ocr_pagina_inteira(imagem):
+    texto = pytesseract.image_to_string(imagem, lang="por")
+    dados = dict.fromkeys(ocr.ROTULOS)
+    for linha in texto.splitlines():
+        try:
+            if "Média de frequência cardíaca" in linha:
+                dados["bpm_medio"] = int(linha.split()[0])
+            elif "BPM máximo" in linha:
+                dados["bpm_max"] = int(linha.split()[0])
+            elif "Queimou" in linha:
+                dados["calorias"] = int(linha.split()[0])
+            elif "Tempo total" in linha:
+                tempo = linha.split()[0].split(":")
+                dados["tempo_total"] = int(tempo[0]) * 60 + int(tempo[1])
+        except (ValueError, IndexError):
+            continue
+    return dados
+
+
+def medir(funcao, imagens, esperado):
+    tempos, acertos, campos = [], 0, 0
+    for nome, imagem in imagens.items():
+        inicio = time.perf_counter()
+        dados = funcao(imagem)
+        tempos.append(time.perf_counter() - inicio)
+        for campo, valor in esperado[nome].items():
+            campos += 1
+            acertos += int(dados.get(campo) == valor)
+    return sum(tempos) / len(tempos), acertos, campos
+
+
+if __name__ == "__main__":
+    with open(os.path.join(PASTA, "esperado.json"), encoding="utf-8") as arquivo:
+        esperado = json.load(arquivo)
+    imagens = {nome: Image.open(os.path.join(PASTA, nome)).copy() for nome in esperado}
+
+    for rotulo, funcao in [("página inteira", ocr_pagina_inteira), ("recortes", ocr.processar_imagem)]:
+        media, acertos, campos = medir(funcao, imagens, esperado)
+        print(f"{rotulo:>15}: {media * 1000:7.0f} ms/imagem | {acertos}/{campos} campos corretos")
@@ -0,0 +1,231 @@
+"""
+Gerador de dados sintéticos (com semente) nos mesmos esquemas que o app.py grava:
+treinos, medidas, condicoes_treino, exercicios e registros_exercicios.
+
+Os treinos seguem uma semana de musculação com dias de aeróbico e descanso; a duração
+se divide entre as zonas conforme o tipo de treino, o batimento médio sai das zonas e
+as calorias da fórmula de Keytel. As condições (ATL/CTL/TSB) são médias exponenciais
+da carga diária (TRIMP), as medidas semanais andam devagar em torno de uma tendência e
+as cargas dos registros de exercícios sobem com o tempo.
+
+O app guarda um único atleta; com --atletas N os históricos de N atletas vão para as
+mesmas coleções, multiplicando o volume (ex.: 50 atletas x 5 anos ~ 300 mil exercícios registrados).
+
+Uso: python benchmarks/gerar_dados.py [--anos 5] [--atletas 1] [--semente 42] [--arquivo dados.sqlite3] [--limpar]
+Sem --arquivo, grava em conexao.banco() (MONGO_URL ou ARMAZENAMENTO=local).
+"""
+import argparse
+import math
+import os
+import random
+import sys
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+COLECOES = ["treinos", "medidas", "condicoes_treino", "exercicios", "registros_exercicios"]
+
+# Tipo de treino (formulário "Adicionar Treino") -> dia_do_treino do catálogo de exercícios
+DIAS_DO_TREINO = {
+    "Posterior, Glúteos e Adutores": "Posterior e Glúteos",
+    "Quadríceps, Glúteos e Panturrilhas": "Quadriceps",
+    "Peito, Ombro e Tríceps": "Superiores empurrar",
+    "Costas e Bíceps": "Superiores puxar",
+    "Core + HIIT": "Core e HIIT",
+}
+# Semana típica (segunda a domingo); None é descanso
+SEMANA = [
+    "Quadríceps, Glúteos e Panturrilhas", "Peito, Ombro e Tríceps", "Aeróbico", "Posterior, Glúteos e Adutores",
+    "Costas e Bíceps", "Core + HIIT", None,
+]
+# Duração (min) e peso relativo de cada zona por tipo de treino
+DURACOES = {"Aeróbico": (35, 70), "Core + HIIT": (30, 50)}
+DURACAO_MUSCULACAO = (50, 95)
+# Da mais leve à mais intensa, na ordem de agregacoes.COLUNAS_ZONAS (a dos pesos do TRIMP)
+ZONAS = ["Zona Leve (min)", "Zona Intensa (min)", "Zona Aeróbica (min)", "Zona Anaeróbica (min)", "Zona Max. VO2 (min)"]
+BPM_ZONAS = [105, 128, 148, 165, 180]
+PESOS_ZONAS = {"Aeróbico": [2, 6, 3, 0.6, 0.2], "Core + HIIT": [2, 2, 3, 2, 1]}
+PESOS_MUSCULACAO = [6, 3, 1, 0.3, 0.05]
+
+CATALOGO = {
+    "Posterior e Glúteos": [("Stiff", "Posterior", 4, 40), ("Mesa flexora", "Posterior", 3, 35),
+                            ("Elevação pélvica", "Glúteos", 4, 60), ("Cadeira abdutora", "Glúteos", 3, 45),
+                            ("Cadeira adutora", "Adutores", 3, 40)],
+    "Quadriceps": [("Agachamento livre", "Quadríceps", 4, 50), ("Leg press", "Quadríceps", 4, 120),
+                   ("Cadeira extensora", "Quadríceps", 3, 40), ("Afundo", "Glúteos", 3, 20),
+                   ("Panturrilha em pé", "Panturrilhas", 4, 50)],
+    "Superiores empurrar": [("Supino reto", "Peito", 4, 40), ("Supino inclinado com halteres", "Peito", 3, 14),
+                            ("Desenvolvimento", "Ombro", 3, 12), ("Elevação lateral", "Ombro", 3, 6),
+                            ("Tríceps corda", "Tríceps", 3, 20)],
+    "Superiores puxar": [("Puxada frontal", "Costas", 4, 45), ("Remada baixa", "Costas", 3, 45),
+                         ("Remada unilateral", "Costas", 3, 16), ("Rosca direta", "Bíceps", 3, 10),
+                         ("Rosca martelo", "Bíceps", 3, 8)],
+    "Core e HIIT": [("Prancha com carga", "Core", 3, 5), ("Abdominal na polia", "Core", 3, 25),
+                    ("Kettlebell swing", "Posterior", 4, 12)],
+}
+COMENTARIOS = ["", "", "", "Treino pesado, pouca energia no fim.", "Ótimo treino, carga aumentou.",
+               "Dormi mal, reduzi o volume.", "Sem dor no joelho hoje."]
+MEDIDAS_BASE = {
+    "Peso (kg)": 68.0, "Tórax (cm)": 92.0, "Cintura (cm)": 72.0, "Abdômen (cm)": 78.0, "Quadril (cm)": 98.0,
+    "Braço Direito (cm)": 30.0, "Braço Esquerdo (cm)": 29.6, "Coxa Direita (cm)": 56.0, "Coxa Esquerda (cm)": 55.5,
+    "Panturrilha Direita (cm)": 36.0, "Panturrilha Esquerda (cm)": 35.8,
+}
+
+
+def gerar_exercicios():
+    return [{"nome": nome, "dia_do_treino": dia, "series": series, "musculo": musculo}
+            for dia, exercicios in CATALOGO.items() for nome, musculo, series, _ in exercicios]
+
+
+def _dividir(total, pesos, aleatorio):
+    # Proporções com ruído (gama) e soma exata igual ao total
+    partes = [aleatorio.gammavariate(peso * 4, 1) if peso else 0 for peso in pesos]
+    soma = sum(partes) or 1
+    minutos = [int(total * parte / soma) for parte in partes]
+    minutos[max(range(len(pesos)), key=lambda i: pesos[i])] += total - sum(minutos)
+    return minutos
+
+
+def _treino(data, tipo, aleatorio, peso_corporal):
+    duracao = aleatorio.randint(*DURACOES.get(tipo, DURACAO_MUSCULACAO))
+    mobilidade = aleatorio.choice([0, 5, 10, 15]) if tipo != "Aeróbico" else 0
+    aerobico = duracao if tipo == "Aeróbico" else aleatorio.choice([0, 0, 10, 15, 20])
+    zonas = _dividir(duracao, PESOS_ZONAS.get(tipo, PESOS_MUSCULACAO), aleatorio)
+    bpm_medio = round(sum(m * b for m, b in zip(zonas, BPM_ZONAS)) / duracao + aleatorio.gauss(0, 3))
+    bpm_max = min(200, max(b for m, b in zip(zonas, BPM_ZONAS) if m) + aleatorio.randint(0, 12))
+    # Keytel et al. (2005), homem de 30 anos: kcal/min pelo batimento e peso
+    por_minuto = (-55.0969 + 0.6309 * bpm_medio + 0.1988 * peso_corporal + 0.2017 * 30) / 4.184
+    return {
+        "Data": data,
+        "Tipo de Treino": tipo,
+        "Tempo Total (min)": duracao,
+        "Calorias Queimadas": max(50, round(por_minuto * duracao)),
+        "Batimento Médio (bpm)": bpm_medio,
+        "Batimento Máximo (bpm)": bpm_max,
+        **dict(zip(ZONAS, zonas)),
+        "Mobilidade (min)": mobilidade,
+        "Aeróbico (min)": aerobico,
+        "Comentários": aleatorio.choice(COMENTARIOS),
+    }
+
+
+def _trimp(treino):
+    # Carga do treino (TRIMP de Edwards): minutos em cada zona x peso da zona
+    return sum(peso * treino[zona] for peso, zona in enumerate(ZONAS, start=1))
+
+
+def _series(carga, series, progresso, aleatorio):
+    # Séries com o mesmo peso; as repetições caem um pouco com o cansaço
+    repeticoes = aleatorio.choice([6, 8, 10, 12, 15])
+    peso = round(carga * progresso * aleatorio.uniform(0.95, 1.05) * 2) / 2
+    return (
+        [max(1, repeticoes - aleatorio.randint(0, numero)) for numero in range(series)],
+        [peso] * series,
+    )
+
+
+def _registro(data, tipo, semana, aleatorio):
+    dia = DIAS_DO_TREINO[tipo]
+    # Progressão de carga: ~0,4% por semana com ruído, e semanas de deload a cada 8
+    progresso = (1 + 0.004 * semana) * (0.85 if semana % 8 == 7 else 1.0)
+    detalhes = []
+    for nome, _, series, carga in CATALOGO[dia]:
+        # Como a aba 2 grava: listas paralelas com repetições e peso de cada série
+        repeticoes, pesos = _series(carga, series, progresso, aleatorio)
+        detalhes.append({"Exercício": nome, "Repetições": repeticoes, "Peso (kg)": pesos, "Data": data})
+    return {"Treino": dia, "Data do Registro": data, "Detalhes": detalhes}
+
+
+def gerar_atleta(fim, anos, aleatorio, deslocamento=timedelta(0)):
+    """
+    Documentos de um atleta nos `anos` anteriores a `fim`: {coleção: [documentos]}. O
+    `deslocamento` soma-se às datas de treinos e medidas, para que vários atletas no mesmo
+    banco não repitam as chaves naturais (dados.CHAVES_NATURAIS).
+    """
+    inicio = fim - timedelta(days=round(365.25 * anos))
+    documentos = {nome: [] for nome in COLECOES if nome != "exercicios"}
+    alvos = {campo: valor * aleatorio.uniform(0.9, 1.1) for campo, valor in MEDIDAS_BASE.items()}
+    medidas = dict(alvos)
+    tendencia = aleatorio.uniform(-0.02, 0.01)  # kg por semana
+    atl = ctl = 0.0
+    dia = inicio
+    while dia <= fim:
+        semana = (dia - inicio).days // 7
+        tipo = SEMANA[dia.weekday()]
+        carga = 0.0
+        # Faltas (viagem, doença) e treinos em dias de descanso
+        if tipo is not None and aleatorio.random() < 0.12:
+            tipo = None
+        elif tipo is None and aleatorio.random() < 0.2:
+            tipo = "Aeróbico"
+        if tipo is not None:
+            horario = dia + deslocamento + timedelta(hours=aleatorio.choice([6, 7, 12, 18, 19]), minutes=aleatorio.randrange(0, 60, 5))
+            treino = _treino(horario, tipo, aleatorio, medidas["Peso (kg)"])
+            documentos["treinos"].append(treino)
+            carga = _trimp(treino)
+            if tipo in DIAS_DO_TREINO and aleatorio.random() < 0.9:
+                documentos["registros_exercicios"].append(_registro(dia, tipo, semana, aleatorio))
+        # ATL e CTL: médias exponenciais de 7 e 42 dias da carga; TSB é a diferença
+        atl += (carga - atl) * (1 - math.exp(-1 / 7))
+        ctl += (carga - ctl) * (1 - math.exp(-1 / 42))
+        documentos["condicoes_treino"].append(
+            {"Data": dia, "TSB": round(ctl - atl, 1), "Fadiga (ATL)": round(atl, 1), "Condição Física (CTL)": round(ctl, 1)})
+        if dia.weekday() == 0:
+            # Ruído semanal puxado de volta para um alvo que segue a tendência
+            for campo in medidas:
+                alvos[campo] += tendencia if campo == "Peso (kg)" else tendencia * 0.3
+                medidas[campo] += 0.2 * (alvos[campo] - medidas[campo]) + aleatorio.gauss(0, 0.2)
+            documentos["medidas"].append({
+                "Data": dia + deslocamento,
+                **{campo: round(valor, 1) for campo, valor in medidas.items()},
+                "Observações": aleatorio.choice(["", "", "Medido pela manhã, em jejum."]),
+            })
+        dia += timedelta(days=1)
+    return documentos
+
+
+def gerar(anos=5, atletas=1, semente=42, fim=None):
+    """Documentos de todos os atletas por coleção, reproduzíveis pela semente."""
+    fim = (fim or datetime.now()).replace(hour=0, minute=0, second=0, microsecond=0)
+    aleatorio = random.Random(semente)
+    documentos = {nome: [] for nome in COLECOES}
+    documentos["exercicios"] = gerar_exercicios()
+    for atleta in range(atletas):
+        for nome, lista in gerar_atleta(fim, anos, aleatorio, timedelta(seconds=atleta)).items():
+            documentos[nome].extend(lista)
+    for nome in ["treinos", "medidas", "condicoes_treino"]:
+        documentos[nome].sort(key=lambda doc: doc["Data"])
+    documentos["registros_exercicios"].sort(key=lambda doc: doc["Data do Registro"])
+    return documentos
+
+
+def popular(banco, documentos, limpar=False, lote=5000):
+    """Grava os documentos gerados no banco (pymongo ou armazenamento_local) e devolve as contagens."""
+    for nome, lista in documentos.items():
+        if limpar:
+            banco[nome].drop()
+        for inicio in range(0, len(lista), lote):
+            banco[nome].insert_many(lista[inicio:inicio + lote], ordered=False)
+    return {nome: len(lista) for nome, lista in documentos.items()}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gera dados sintéticos de treinos no banco do app.")
+    parser.add_argument("--anos", type=float, default=5)
+    parser.add_argument("--atletas", type=int, default=1)
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--arquivo", help="arquivo SQLite do armazenamento local (padrão: conexao.banco())")
+    parser.add_argument("--limpar", action="store_true", help="apaga as coleções antes de gravar")
+    argumentos = parser.parse_args()
+
+    if argumentos.arquivo:
+        from armazenamento_local import BancoLocal
+
+        banco = BancoLocal(argumentos.arquivo)
+    else:
+        from conexao import banco as banco_configurado
+
+        banco = banco_configurado()
+    contagens = popular(banco, gerar(argumentos.anos, argumentos.atletas, argumentos.semente), argumentos.limpar)
+    for nome, quantidade in contagens.items():
+        print(f"{nome}: {quantidade} documentos")
@@ -0,0 +1,74 @@
+"""
+Gera as imagens de benchmarks/fixtures/ocr: relatórios de treino sintéticos no
+formato lido por ocr.processar_imagem (tema escuro, valor no início da linha do
+rótulo), em duas resoluções de celular, e o esperado.json com os valores corretos.
+
+Uso: python benchmarks/gerar_fixtures_ocr.py
+"""
+import json
+import os
+import random
+
+import matplotlib
+from PIL import Image, ImageDraw, ImageFont
+
+PASTA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "ocr")
+RESOLUCOES = [(1080, 2340), (1440, 3200)]
+IMAGENS_POR_RESOLUCAO = 3
+# Fonte com acentos distribuída com o matplotlib (já nas dependências do projeto)
+FONTE = os.path.join(matplotlib.get_data_path(), "fonts", "ttf", "DejaVuSans.ttf")
+
+
+def desenhar_relatorio(largura, altura, valores, aleatorio):
+    imagem = Image.new("RGB", (largura, altura), (18, 18, 20))
+    desenho = ImageDraw.Draw(imagem)
+    escala = largura / 1080
+    titulo = ImageFont.truetype(FONTE, size=round(64 * escala))
+    fonte = ImageFont.truetype(FONTE, size=round(44 * escala))
+    pequena = ImageFont.truetype(FONTE, size=round(32 * escala))
+    margem, y = round(60 * escala), round(160 * escala)
+
+    desenho.text((margem, y), "Treino de força", font=titulo, fill=(255, 255, 255))
+    y += round(110 * escala)
+    desenho.text((margem, y), f"{aleatorio.randint(1, 28)} de janeiro, 07:{aleatorio.randint(10, 59)}", font=pequena, fill=(150, 150, 155))
+    y += round(140 * escala)
+
+    horas, minutos = divmod(valores["tempo_total"], 60)
+    linhas = [
+        f"{horas}:{minutos:02d}:{aleatorio.randint(0, 59):02d} Tempo total",
+        f"{valores['calorias']} kcal Queimou",
+        f"{valores['bpm_medio']} bpm Média de frequência cardíaca",
+        f"{valores['bpm_max']} bpm BPM máximo",
+    ]
+    for linha in linhas:
+        desenho.text((margem, y), linha, font=fonte, fill=(240, 240, 240))
+        y += round(150 * escala)
+        desenho.line((margem, y - round(40 * escala), largura - margem, y - round(40 * escala)), fill=(60, 60, 64), width=2)
+
+    # Zonas de esforço, que não devem ser confundidas com os valores acima
+    y += round(60 * escala)
+    for zona in ["Leve", "Intensa", "Aeróbica", "Anaeróbica", "Max. VO2"]:
+        desenho.text((margem, y), f"Zona {zona}", font=pequena, fill=(170, 170, 175))
+        desenho.text((largura - margem - round(140 * escala), y), f"{aleatorio.randint(0, 40)} min", font=pequena, fill=(170, 170, 175))
+        y += round(80 * escala)
+    return imagem
+
+
+if __name__ == "__main__":
+    aleatorio = random.Random(7)
+    os.makedirs(PASTA, exist_ok=True)
+    esperado = {}
+    for largura, altura in RESOLUCOES:
+        for i in range(IMAGENS_POR_RESOLUCAO):
+            valores = {
+                "bpm_medio": aleatorio.randint(95, 150),
+                "bpm_max": aleatorio.randint(155, 195),
+                "calorias": aleatorio.randint(180, 900),
+                "tempo_total": aleatorio.randint(25, 130),
+            }
+            nome = f"relatorio_{largura}x{altura}_{i + 1}.png"
+            desenhar_relatorio(largura, altura, valores, aleatorio).save(os.path.join(PASTA, nome), optimize=True)
+            esperado[nome] = valores
+    with open(os.path.join(PASTA, "esperado.json"), "w", encoding="utf-8") as arquivo:
+        json.dump(esperado, arquivo, indent=2, ensure_ascii=False)
+    print(f"{len(esperado)} imagens geradas em {PASTA}")
@@ -0,0 +1,259 @@
+"""
+Carga de treino (ATL/CTL/TSB) calculada a partir dos treinos, sem digitação manual.
+
+A carga de cada treino é o TRIMP de Edwards: minutos em cada zona de FC x peso da zona
+(1 a 5). Treinos sem os minutos por zona usam a duração x o peso da zona em que cai a FC
+média (em relação a FC_MAXIMA). Sobre o calendário diário denso (dias sem treino têm carga
+zero), ATL e CTL são médias exponenciais de DIAS_ATL e DIAS_CTL dias e TSB = CTL - ATL.
+
+A série fica na coleção "carga_treino", um documento por dia (_id "AAAA-MM-DD"), e a aba de
+indicadores só lê as linhas do período. Cada treino salvo atualiza a série a partir do
+último estado gravado (registrar_carga): como as médias são lineares na carga, um treino
+numa data já calculada só soma a sua parcela, que decai, aos dias seguintes; um treino
+substituído no lugar (corrigir_carga) soma do mesmo jeito a diferença de carga.
+"""
+import math
+import os
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+from pymongo import ASCENDING, DESCENDING, UpdateOne
+from pymongo.errors import PyMongoError
+
+from agregacoes import COLUNAS_ZONAS
+from conexao import colecao
+from dados import INTERVALO_SINCRONIZACAO, converter_datas, para_datetime, projecao, versao_escrita
+from instrumentacao import cronometrado
+from snapshots import consultar
+
+COLECAO_CARGA = "carga_treino"
+DIAS_ATL = 7
+DIAS_CTL = 42
+# Fração da carga do dia que entra em cada média (a mesma do gerar_dados.py)
+K_ATL = 1 - math.exp(-1 / DIAS_ATL)
+K_CTL = 1 - math.exp(-1 / DIAS_CTL)
+# Depois disso (dias) a parcela de um treino na CTL já caiu abaixo de um milionésimo
+HORIZONTE = math.ceil(DIAS_CTL * math.log(1e6))
+
+# Peso de cada zona no TRIMP, da mais leve à mais intensa (na ordem de COLUNAS_ZONAS)
+PESOS_ZONAS = {coluna: peso for peso, coluna in enumerate(COLUNAS_ZONAS.values(), start=1)}
+# Idade do atleta (Keytel, em arquivos_relogio.py) e FC máxima das zonas: padrão 220 - idade, como na aba 7
+DATA_NASCIMENTO = datetime(1990, 7, 27)
+IDADE = (datetime.now() - DATA_NASCIMENTO).days // 365
+FC_MAXIMA = float(os.getenv("FC_MAXIMA") or 220 - IDADE)
+
+COLUNAS = ["Data", "sessoes", "carga", "atl", "ctl", "tsb"]
+# Campos dos treinos que entram no cálculo
+COLUNAS_TREINOS = ["Data", "Tempo Total (min)", "Batimento Médio (bpm)", *PESOS_ZONAS]
+
+
+def zonas_fc(bpm):
+    """
+    Zona de cada FC na ordem de COLUNAS_ZONAS: 1 = Leve (<60% de FC_MAXIMA), 2 = Intensa (60-70%),
+    3 = Aeróbica (70-80%), 4 = Anaeróbica (80-90%) e 5 = VO2 Máximo (>=90%).
+    """
+    return np.clip(np.floor(np.asarray(bpm, dtype="float64") / FC_MAXIMA * 10) - 4, 1, 5)
+
+
+def cargas_sessoes(df):
+    """Carga (TRIMP) de cada treino de `df`, alinhada ao índice."""
+    valores = df.reindex(columns=[*PESOS_ZONAS, "Tempo Total (min)", "Batimento Médio (bpm)"])
+    valores = valores.apply(pd.to_numeric, errors="coerce")
+    trimp = valores[list(PESOS_ZONAS)].fillna(0).to_numpy() @ np.array(list(PESOS_ZONAS.values()), dtype="float64")
+    # Sem minutos por zona: duração x peso da zona da FC média
+    peso = pd.Series(zonas_fc(valores["Batimento Médio (bpm)"]), index=valores.index).fillna(1)
+    estimada = valores["Tempo Total (min)"].fillna(0) * peso
+    return pd.Series(np.where(trimp > 0, trimp, estimada), index=df.index)
+
+
+def carga_sessao(treino):
+    return float(cargas_sessoes(pd.DataFrame([treino])).iloc[0])
+
+
+def _evoluir(cargas, atl=0.0, ctl=0.0):
+    # Médias exponenciais dia a dia partindo do estado (atl, ctl) da véspera do primeiro dia
+    atls = pd.Series([atl, *cargas], dtype="float64").ewm(alpha=K_ATL, adjust=False).mean().to_numpy()[1:]
+    ctls = pd.Series([ctl, *cargas], dtype="float64").ewm(alpha=K_CTL, adjust=False).mean().to_numpy()[1:]
+    return atls, ctls
+
+
+def _serie(dias, sessoes, cargas, atl=0.0, ctl=0.0):
+    atls, ctls = _evoluir(cargas, atl, ctl)
+    return pd.DataFrame({"Data": dias, "sessoes": sessoes, "carga": cargas, "atl": atls, "ctl": ctls, "tsb": ctls - atls})
+
+
+def _documentos(serie):
+    return [
+        {"_id": linha["Data"].strftime("%Y-%m-%d"), **linha, "Data": linha["Data"].to_pydatetime(), "sessoes": int(linha["sessoes"])}
+        for linha in serie.to_dict("records")
+    ]
+
+
+@cronometrado("calculo")
+def calcular_carga(df):
+    """Série diária completa (COLUNAS) dos treinos em `df`, do primeiro ao último dia."""
+    if df.empty:
+        return pd.DataFrame(columns=COLUNAS)
+    por_dia = (
+        pd.DataFrame({"Data": converter_datas(df["Data"]).dt.normalize(), "carga": cargas_sessoes(df)})
+        .dropna(subset=["Data"])
+        .groupby("Data")
+        .agg(sessoes=("carga", "size"), carga=("carga", "sum"))
+    )
+    if por_dia.empty:
+        return pd.DataFrame(columns=COLUNAS)
+    calendario = pd.date_range(por_dia.index.min(), por_dia.index.max(), freq="D")
+    por_dia = por_dia.reindex(calendario, fill_value=0)
+    return _serie(calendario, por_dia["sessoes"].to_numpy(), por_dia["carga"].to_numpy("float64"))
+
+
+@st.cache_resource(show_spinner=False)
+def criar_indice_carga():
+    colecao(COLECAO_CARGA).create_index([("Data", ASCENDING)])
+    return True
+
+
+def _propagar(serie, dia, carga, a_partir, sessao, sessoes=1):
+    # A parcela do treino em cada dia seguinte: carga x K x (1 - K) ^ (dias desde o treino)
+    operacoes = []
+    janela = {"Data": {"$gte": a_partir, "$lte": dia + timedelta(days=HORIZONTE)}}
+    for documento in serie.find(janela, {"Data": 1}, session=sessao):
+        dias = (documento["Data"] - dia).days
+        atl = carga * K_ATL * (1 - K_ATL) ** dias
+        ctl = carga * K_CTL * (1 - K_CTL) ** dias
+        incrementos = {"atl": atl, "ctl": ctl, "tsb": ctl - atl}
+        if dias == 0:
+            incrementos.update(carga=carga, sessoes=sessoes)
+        operacoes.append(UpdateOne({"_id": documento["_id"]}, {"$inc": incrementos}))
+    if operacoes:
+        serie.bulk_write(operacoes, ordered=False, session=sessao)
+
+
+def registrar_carga(treino, sessao=None):
+    """Soma um treino recém-inserido à série diária, sem recalcular o histórico (na transação de `sessao`)."""
+    dia = para_datetime(treino["Data"]).replace(hour=0, minute=0, second=0, microsecond=0)
+    carga = carga_sessao(treino)
+    serie = colecao(COLECAO_CARGA)
+    ultimo = serie.find_one({}, sort=[("Data", DESCENDING)], session=sessao)
+
+    if ultimo is None or dia > ultimo["Data"]:
+        # Estende o calendário até o treino a partir do último estado gravado
+        inicio = dia if ultimo is None else ultimo["Data"] + timedelta(days=1)
+        dias = pd.date_range(inicio, dia, freq="D")
+        sessoes, cargas = np.zeros(len(dias), dtype="int64"), np.zeros(len(dias))
+        sessoes[-1], cargas[-1] = 1, carga
+        estado = (0.0, 0.0) if ultimo is None else (ultimo["atl"], ultimo["ctl"])
+        serie.insert_many(_documentos(_serie(dias, sessoes, cargas, *estado)), ordered=False, session=sessao)
+        return
+
+    primeiro = serie.find_one({}, sort=[("Data", ASCENDING)], session=sessao)
+    if dia < primeiro["Data"]:
+        # Treino anterior a toda a série: os dias até ela partem do zero
+        dias = pd.date_range(dia, primeiro["Data"] - timedelta(days=1), freq="D")
+        sessoes, cargas = np.zeros(len(dias), dtype="int64"), np.zeros(len(dias))
+        sessoes[0], cargas[0] = 1, carga
+        serie.insert_many(_documentos(_serie(dias, sessoes, cargas)), ordered=False, session=sessao)
+        _propagar(serie, dia, carga, primeiro["Data"], sessao)
+    else:
+        _propagar(serie, dia, carga, dia, sessao)
+
+
+def corrigir_carga(anterior, treino, sessao=None):
+    """Troca na série a carga de um treino substituído no lugar (mesma data) pela nova (na transação de `sessao`)."""
+    diferenca = carga_sessao(treino) - carga_sessao(anterior)
+    if diferenca:
+        dia = para_datetime(treino["Data"]).replace(hour=0, minute=0, second=0, microsecond=0)
+        _propagar(colecao(COLECAO_CARGA), dia, diferenca, dia, sessao, sessoes=0)
+
+
+def reconstruir_carga():
+    """Recalcula a série inteira a partir da coleção de treinos (uso pontual)."""
+    df = pd.DataFrame(list(colecao("treinos").find({}, projecao(COLUNAS_TREINOS))), columns=COLUNAS_TREINOS)
+    documentos = _documentos(calcular_carga(df))
+
+    serie = colecao(COLECAO_CARGA)
+    serie.delete_many({})
+    if documentos:
+        serie.insert_many(documentos, ordered=False)
+    criar_indice_carga()
+    return len(documentos)
+
+
+def _cargas_divergentes(dias=28):
+    # Carga gravada nos últimos `dias` da série x recalculada dos treinos (ex.: pesos das zonas mudaram)
+    serie = colecao(COLECAO_CARGA)
+    ultimo = serie.find_one({}, sort=[("Data", DESCENDING)])
+    if ultimo is None:
+        return False
+    inicio = ultimo["Data"] - timedelta(days=dias - 1)
+    gravadas = pd.Series({documento["Data"]: documento["carga"] for documento in serie.find({"Data": {"$gte": inicio}}, {"Data": 1, "carga": 1})})
+    treinos = pd.DataFrame(list(colecao("treinos").find({"Data": {"$gte": inicio}}, projecao(COLUNAS_TREINOS))), columns=COLUNAS_TREINOS)
+    recalculadas = cargas_sessoes(treinos).groupby(converter_datas(treinos["Data"]).dt.normalize()).sum()
+    recalculadas = recalculadas.reindex(pd.to_datetime(gravadas.index), fill_value=0.0)
+    return not np.allclose(gravadas.to_numpy("float64"), recalculadas.to_numpy("float64"))
+
+
+# Reconstrói a série uma vez por processo se estiver vazia ou fora de sincronia com a
+# coleção de treinos (ex.: treinos inseridos por fora do app, ou cargas calculadas com
+# outros pesos de zona)
+@st.cache_resource(show_spinner=False)
+def garantir_carga():
+    criar_indice_carga()
+    totais = list(colecao(COLECAO_CARGA).aggregate([{"$group": {"_id": None, "sessoes": {"$sum": "$sessoes"}}}]))
+    if (totais[0]["sessoes"] if totais else 0) != colecao("treinos").count_documents({}) or _cargas_divergentes():
+        reconstruir_carga()
+    return True
+
+
+def _estender(df, ultimo, data_inicio, data_fim):
+    # Dias depois do último treino até data_fim: sem carga, as médias só decaem
+    if ultimo is None or data_fim <= ultimo["Data"]:
+        return df
+    dias = pd.date_range(max(ultimo["Data"] + timedelta(days=1), data_inicio or datetime.min), data_fim, freq="D")
+    passados = (dias - pd.Timestamp(ultimo["Data"])).days.to_numpy()
+    atls = ultimo["atl"] * (1 - K_ATL) ** passados
+    ctls = ultimo["ctl"] * (1 - K_CTL) ** passados
+    extensao = pd.DataFrame({"Data": dias, "sessoes": 0, "carga": 0.0, "atl": atls, "ctl": ctls, "tsb": ctls - atls})
+    return pd.concat([df, extensao], ignore_index=True) if not df.empty else extensao
+
+
+@st.cache_data(ttl=INTERVALO_SINCRONIZACAO, show_spinner=False)
+def _ler_carga(data_inicio, data_fim, versao):
+    filtro = {"Data": {"$lte": data_fim}}
+    if data_inicio:
+        filtro["Data"]["$gte"] = data_inicio
+    try:
+        serie = colecao(COLECAO_CARGA)
+        df = pd.DataFrame(list(serie.find(filtro, {"_id": 0}).sort("Data", ASCENDING)), columns=COLUNAS)
+        ultimo = serie.find_one({}, {"_id": 0}, sort=[("Data", DESCENDING)])
+    except PyMongoError:
+        # Mesma série calculada sobre o snapshot Parquet dos treinos (MongoDB indisponível)
+        selecao = ", ".join(f'"{coluna}"' for coluna in COLUNAS_TREINOS)
+        treinos = consultar(f"SELECT {selecao} FROM {{treinos}}")
+        if treinos is None:
+            raise
+        completa = calcular_carga(treinos)
+        ultimo = None if completa.empty else {**completa.iloc[-1].to_dict(), "Data": completa["Data"].iloc[-1].to_pydatetime()}
+        df = completa[completa["Data"] <= data_fim]
+        if data_inicio:
+            df = df[df["Data"] >= data_inicio]
+    df = _estender(df.reset_index(drop=True), ultimo, data_inicio, data_fim)
+    df["Data"] = converter_datas(df["Data"])
+    return df
+
+
+@cronometrado("agregacao")
+def ler_carga(data_inicio=None, data_fim=None):
+    """
+    Série diária de carga, ATL, CTL e TSB (COLUNAS) entre as datas, ordenada por "Data".
+    Sem data_fim, vai até hoje: depois do último treino as médias continuam decaindo.
+    """
+    data_inicio = para_datetime(data_inicio) if data_inicio else None
+    data_fim = para_datetime(data_fim or date.today())
+    return _ler_carga(data_inicio, data_fim, versao_escrita("treinos"))
+
+
+if __name__ == "__main__":
+    print(f"{reconstruir_carga()} dias recalculados em '{COLECAO_CARGA}'.")
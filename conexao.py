@@ -0,0 +1,185 @@
+import os
+import threading
+
+import streamlit as st
+from pymongo import MongoClient, monitoring
+
+from instrumentacao import registrar_comando
+
+# Onde ficam os dados: "mongo" (padrão) ou "local", um arquivo SQLite embutido com a mesma
+# interface de coleções (armazenamento_local.py), para desenvolvimento, CI ou contingência
+ARMAZENAMENTO = os.getenv("ARMAZENAMENTO", "mongo")
+ARQUIVO_LOCAL = os.getenv("ARMAZENAMENTO_ARQUIVO", "dashboard_treinos.sqlite3")
+
+# Conexão com o MongoDB
+# Um único cliente por processo, criado na primeira consulta e compartilhado por todas
+# as sessões e reruns. Os parâmetros do pool podem ser ajustados por variável de ambiente.
+mongo_url = os.getenv("MONGO_URL")  # Para o Deploy
+NOME_BANCO = os.getenv("MONGO_DB", "dashboard_db")
+OPCOES_CLIENTE = {
+    "maxPoolSize": int(os.getenv("MONGO_MAX_POOL", "50")),
+    "minPoolSize": int(os.getenv("MONGO_MIN_POOL", "0")),
+    "maxIdleTimeMS": int(os.getenv("MONGO_MAX_IDLE_MS", "300000")),
+    "waitQueueTimeoutMS": int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", "5000")),
+    "serverSelectionTimeoutMS": int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000")),
+    "connectTimeoutMS": int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "5000")),
+    "socketTimeoutMS": int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", "30000")),
+    "retryReads": True,
+    "retryWrites": True,
+    "appname": "dashboard_treinos",
+}
+
+
+class EstatisticasPool(monitoring.ConnectionPoolListener):
+    """Contadores do pool de conexões, alimentados pelos eventos do pymongo."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.em_uso = 0
+        self.abertas = 0
+        self.retiradas = 0
+        self.falhas = 0
+        self.espera_total = 0.0
+        self.espera_maxima = 0.0
+
+    def _registrar_espera(self, duracao):
+        if duracao is not None:
+            self.espera_total += duracao
+            self.espera_maxima = max(self.espera_maxima, duracao)
+
+    def connection_checked_out(self, event):
+        with self.lock:
+            self.em_uso += 1
+            self.retiradas += 1
+            self._registrar_espera(event.duration)
+
+    def connection_check_out_failed(self, event):
+        with self.lock:
+            self.falhas += 1
+            self._registrar_espera(event.duration)
+
+    def connection_checked_in(self, event):
+        with self.lock:
+            self.em_uso -= 1
+
+    def connection_created(self, event):
+        with self.lock:
+            self.abertas += 1
+
+    def connection_closed(self, event):
+        with self.lock:
+            self.abertas -= 1
+
+    # Eventos sem contador associado
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def resumo(self):
+        with self.lock:
+            return {
+                "conexoes_em_uso": self.em_uso,
+                "conexoes_abertas": self.abertas,
+                "tamanho_maximo": OPCOES_CLIENTE["maxPoolSize"],
+                "retiradas": self.retiradas,
+                "falhas_de_retirada": self.falhas,
+                "espera_media_ms": 1000 * self.espera_total / self.retiradas if self.retiradas else 0.0,
+                "espera_maxima_ms": 1000 * self.espera_maxima,
+            }
+
+
+estatisticas = EstatisticasPool()
+
+
+class MonitorComandos(monitoring.CommandListener):
+    """Tempo de cada comando enviado ao MongoDB, por comando e coleção (ver instrumentacao.py)."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        # request_id -> coleção do comando em andamento
+        self.colecoes = {}
+
+    def started(self, event):
+        alvo = event.command.get(event.command_name)
+        if not isinstance(alvo, str):
+            # getMore traz o id do cursor; a coleção vem à parte
+            alvo = event.command.get("collection", "")
+        with self.lock:
+            self.colecoes[event.request_id] = alvo
+
+    def _concluir(self, event, falhou):
+        with self.lock:
+            alvo = self.colecoes.pop(event.request_id, "")
+        registrar_comando(event.command_name, alvo, event.duration_micros / 1e6, falhou)
+
+    def succeeded(self, event):
+        self._concluir(event, False)
+
+    def failed(self, event):
+        self._concluir(event, True)
+
+
+monitor_comandos = MonitorComandos()
+
+
+@st.cache_resource(show_spinner=False)
+def cliente():
+    return MongoClient(mongo_url, event_listeners=[estatisticas, monitor_comandos], **OPCOES_CLIENTE)
+
+
+@st.cache_resource(show_spinner=False)
+def banco_local():
+    from armazenamento_local import BancoLocal
+
+    return BancoLocal(ARQUIVO_LOCAL)
+
+
+def banco():
+    if ARMAZENAMENTO == "local":
+        return banco_local()
+    return cliente()[NOME_BANCO]
+
+
+def colecao(nome):
+    return banco()[nome]
+
+
+# Transações só existem em replica sets e clusters shardados (Atlas é sempre replica set)
+@st.cache_resource(show_spinner=False)
+def suporta_transacoes():
+    if ARMAZENAMENTO == "local":
+        return False
+    hello = cliente().admin.command("hello")
+    return "setName" in hello or hello.get("msg") == "isdbgrid"
+
+
+def em_transacao(gravar):
+    """
+    Executa gravar(sessao) numa transação: as gravações em várias coleções valem todas ou
+    nenhuma, e erros transitórios repetem a função inteira (with_transaction do pymongo).
+    Sem suporte a transações (standalone ou armazenamento local) roda gravar(None), com
+    cada gravação valendo por si; session=None é aceito por todas as operações.
+    """
+    if not suporta_transacoes():
+        return gravar(None)
+    with cliente().start_session() as sessao:
+        return sessao.with_transaction(gravar)
+
+
+def estatisticas_pool():
+    """Conexões em uso/abertas e tempo de espera para retirar uma conexão do pool."""
+    return estatisticas.resumo()
@@ -0,0 +1,602 @@
+import copy
+import os
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime
+
+import pandas as pd
+import streamlit as st
+from pymongo import ASCENDING, DESCENDING, ReplaceOne
+from pymongo.errors import OperationFailure, PyMongoError
+
+from conexao import colecao
+from instrumentacao import cronometrado
+
+# Intervalo (s) mínimo entre duas sincronizações da mesma coleção
+INTERVALO_SINCRONIZACAO = float(os.getenv("SINCRONIZACAO_INTERVALO_SEGUNDOS", "5"))
+# Intervalo (s) entre reconciliações completas quando não há change stream disponível
+INTERVALO_RECONCILIACAO = float(os.getenv("SINCRONIZACAO_RECONCILIACAO_SEGUNDOS", "600"))
+
+# Campo de data de cada coleção (gravado como data nativa do BSON)
+CAMPOS_DATA = {
+    "treinos": "Data",
+    "medidas": "Data",
+    "condicoes_treino": "Data",
+    "registros_exercicios": "Data do Registro",
+}
+# Formatos de texto usados antes da migração para datas nativas (migrar_datas.py)
+FORMATOS_DATA_LEGADOS = ["%d/%m/%Y", "%Y-%m-%d"]
+# Chave natural de cada coleção gravada por upsert (ver repositorios.py): um documento por
+# chave, garantido por índice único
+CHAVES_NATURAIS = {
+    "treinos": ["Data", "Tipo de Treino"],
+    "medidas": ["Data"],
+}
+
+# Tipos compactos das colunas conhecidas (ver compactar); as demais ficam como vêm do banco
+COLUNAS_CATEGORIA = ["Tipo de Treino", "Treino", "Exercício", "musculo", "dia_do_treino"]
+COLUNAS_INTEIRAS = [
+    "Tempo Total (min)",
+    "Calorias Queimadas",
+    "Batimento Médio (bpm)",
+    "Batimento Máximo (bpm)",
+    "Zona Leve (min)",
+    "Zona Intensa (min)",
+    "Zona Aeróbica (min)",
+    "Zona Anaeróbica (min)",
+    "Zona Max. VO2 (min)",
+    "Mobilidade (min)",
+    "Aeróbico (min)",
+    "Repetições",
+    "series",
+]
+COLUNAS_DECIMAIS = [
+    "Peso (kg)",
+    "Tórax (cm)",
+    "Cintura (cm)",
+    "Abdômen (cm)",
+    "Quadril (cm)",
+    "Braço Direito (cm)",
+    "Braço Esquerdo (cm)",
+    "Coxa Direita (cm)",
+    "Coxa Esquerda (cm)",
+    "Panturrilha Direita (cm)",
+    "Panturrilha Esquerda (cm)",
+    "TSB",
+    "Fadiga (ATL)",
+    "Condição Física (CTL)",
+]
+INT16 = (-2 ** 15, 2 ** 15 - 1)
+
+
+def para_datetime(data):
+    """Converte um date (ex.: retorno de st.date_input) no datetime gravado no MongoDB."""
+    if isinstance(data, datetime):
+        return data
+    return datetime.combine(data, datetime.min.time())
+
+
+@cronometrado("transformacao")
+def converter_datas(serie):
+    """Converte uma coluna de datas (nativas ou ainda em texto legado) para datetime64."""
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        return serie
+    # Valores datetime passam direto por qualquer formato; só o texto legado é interpretado
+    convertida = pd.to_datetime(serie, format=FORMATOS_DATA_LEGADOS[0], errors="coerce")
+    for formato in FORMATOS_DATA_LEGADOS[1:]:
+        faltantes = convertida.isna() & serie.notna()
+        if not faltantes.any():
+            break
+        convertida[faltantes] = pd.to_datetime(serie[faltantes], format=formato, errors="coerce")
+    return convertida
+
+
+@cronometrado("transformacao")
+def compactar(frame):
+    """
+    Converte as colunas conhecidas para tipos compactos: category para os textos repetidos,
+    int16 para minutos/BPM/calorias (float32 quando há lacunas ou valores fora da faixa)
+    e float32 para pesos, medidas e condições. Altera e devolve o próprio frame.
+    """
+    for coluna in frame.columns.intersection(COLUNAS_CATEGORIA):
+        frame[coluna] = frame[coluna].astype("category")
+    for coluna in frame.columns.intersection(COLUNAS_INTEIRAS):
+        valores = pd.to_numeric(frame[coluna], errors="coerce")
+        inteiros = valores.notna().all() and (valores % 1 == 0).all() and valores.between(*INT16).all()
+        frame[coluna] = valores.astype("int16" if inteiros else "float32")
+    for coluna in frame.columns.intersection(COLUNAS_DECIMAIS):
+        frame[coluna] = pd.to_numeric(frame[coluna], errors="coerce").astype("float32")
+    return frame
+
+
+def _frame(nome, documentos, colunas=None):
+    frame = pd.DataFrame(documentos, columns=colunas)
+    campo = CAMPOS_DATA.get(nome)
+    if campo in frame.columns:
+        frame[campo] = converter_datas(frame[campo])
+    return compactar(frame)
+
+
+def projecao(colunas):
+    """
+    Projeção do find para `colunas` (None = todas), sem o _id. Um campo com ponto (ex.:
+    "Zona Max. VO2 (min)") seria lido como caminho aninhado e viria vazio: com ele o
+    documento vem inteiro, e o DataFrame montado com columns=colunas descarta o resto.
+    """
+    if colunas is None or any("." in coluna for coluna in colunas):
+        return {"_id": 0}
+    return {coluna: 1 for coluna in colunas} | {"_id": 0}
+
+
+def remover_duplicados(nome, chaves):
+    """
+    Deixa um documento por chave natural, o primeiro gravado (menor _id), e move os demais
+    para a coleção "<nome>_duplicados", onde podem ser conferidos. Devolve quantos saíram.
+    """
+    vistos, duplicados = set(), []
+    projecao = {campo: 1 for campo in chaves}
+    for documento in colecao(nome).find({}, projecao).sort("_id", ASCENDING):
+        chave = tuple(documento.get(campo) for campo in chaves)
+        if chave in vistos:
+            duplicados.append(documento["_id"])
+        vistos.add(chave)
+    return mover_duplicados(nome, duplicados)
+
+
+def mover_duplicados(nome, ids):
+    """Move os documentos de `ids` para "<nome>_duplicados"; devolve quantos foram movidos."""
+    if not ids:
+        return 0
+    destino = colecao(nome)
+    # ReplaceOne pelo _id: rodar de novo depois de uma falha não duplica a cópia
+    copias = [ReplaceOne({"_id": doc["_id"]}, doc, upsert=True) for doc in destino.find({"_id": {"$in": ids}})]
+    colecao(f"{nome}_duplicados").bulk_write(copias, ordered=False)
+    return destino.delete_many({"_id": {"$in": ids}}).deleted_count
+
+
+def _criar_indice_unico(nome, chaves):
+    # Um índice comum com as mesmas chaves (de antes das gravações por upsert) dá lugar ao
+    # único, criado depois de removidos os duplicados que o impediriam
+    destino = colecao(nome)
+    indice = [(campo, ASCENDING) for campo in chaves]
+    existentes = {
+        nome_indice: informacao
+        for nome_indice, informacao in destino.index_information().items()
+        if [tuple(chave) for chave in informacao["key"]] == indice
+    }
+    if any(informacao.get("unique") for informacao in existentes.values()):
+        return
+    remover_duplicados(nome, chaves)
+    for nome_indice in existentes:
+        destino.drop_index(nome_indice)
+    destino.create_index(indice, unique=True)
+
+
+# Índices das consultas por período e das chaves naturais; roda uma vez por processo
+@st.cache_resource(show_spinner=False)
+def criar_indices():
+    colecao("treinos").create_index([("Data", ASCENDING)])
+    for nome, chaves in CHAVES_NATURAIS.items():
+        _criar_indice_unico(nome, chaves)
+    colecao("condicoes_treino").create_index([("Data", ASCENDING)])
+    colecao("registros_exercicios").create_index([("Treino", ASCENDING), ("Data do Registro", ASCENDING)])
+    return True
+
+
+class CopiaLocal:
+    """
+    Cópia em memória de uma coleção, mantida em dia de forma incremental.
+
+    A primeira leitura traz a coleção inteira; as seguintes trazem apenas os documentos
+    com _id maior que o último visto. Atualizações e remoções chegam pelo change stream
+    quando o servidor oferece um (replica set / Atlas); sem ele, a contagem de documentos
+    é comparada a cada sincronização e a coleção é relida por completo a cada
+    INTERVALO_RECONCILIACAO segundos.
+    """
+
+    def __init__(self, nome):
+        self.nome = nome
+        self.documentos = {}
+        self.ultimo_id = None
+        self.frame = pd.DataFrame()
+        self.fluxo = None
+        self.ultima_sincronizacao = 0.0
+        self.ultima_reconciliacao = 0.0
+        self.pendente = True
+        self.carregada = False
+        # Incrementada a cada mudança no conteúdo; serve de chave para caches derivados
+        self.geracao = 0
+        self.lock = threading.Lock()
+
+    def _abrir_fluxo(self):
+        # O cursor anterior ocupa recursos no servidor até ser fechado
+        if self.fluxo is not None:
+            try:
+                self.fluxo.close()
+            except PyMongoError:
+                pass
+            self.fluxo = None
+        try:
+            self.fluxo = colecao(self.nome).watch(full_document="updateLookup")
+        except OperationFailure:
+            # Servidor standalone não suporta change streams
+            self.fluxo = None
+
+    def _recarregar(self):
+        self._abrir_fluxo()
+        self.documentos = {doc["_id"]: doc for doc in colecao(self.nome).find({}).sort("_id", ASCENDING)}
+        self.ultimo_id = next(reversed(self.documentos), None)
+        self.frame = _frame(self.nome, list(self.documentos.values()))
+        self.geracao += 1
+        self.ultima_reconciliacao = time.monotonic()
+        self.carregada = True
+
+    def _acrescentar(self, novos):
+        for doc in novos:
+            self.documentos[doc["_id"]] = doc
+            if self.ultimo_id is None or doc["_id"] > self.ultimo_id:
+                self.ultimo_id = doc["_id"]
+        # Categorias diferentes nos dois lados viram object no concat: compacta de novo
+        self.frame = compactar(pd.concat([self.frame, _frame(self.nome, novos)], ignore_index=True))
+        self.geracao += 1
+
+    def _aplicar_fluxo(self):
+        # Consome os eventos pendentes sem bloquear; devolve False se o fluxo caiu
+        novos, alterado = [], False
+        try:
+            while (evento := self.fluxo.try_next()) is not None:
+                operacao = evento["operationType"]
+                chave = evento.get("documentKey", {}).get("_id")
+                if operacao == "insert" and chave not in self.documentos:
+                    novos.append(evento["fullDocument"])
+                elif operacao in ("update", "replace") and evento.get("fullDocument"):
+                    self.documentos[chave] = evento["fullDocument"]
+                    alterado = True
+                elif operacao == "delete":
+                    alterado = self.documentos.pop(chave, None) is not None or alterado
+                elif operacao in ("drop", "rename", "invalidate"):
+                    return False
+        except PyMongoError:
+            return False
+        if alterado:
+            self.documentos.update({doc["_id"]: doc for doc in novos})
+            self.frame = _frame(self.nome, list(self.documentos.values()))
+            self.geracao += 1
+        elif novos:
+            self._acrescentar(novos)
+        return True
+
+    def _buscar_novos(self):
+        filtro = {"_id": {"$gt": self.ultimo_id}} if self.ultimo_id is not None else {}
+        novos = list(colecao(self.nome).find(filtro).sort("_id", ASCENDING))
+        if novos:
+            self._acrescentar(novos)
+        # Remoções/atualizações: a contagem denuncia remoções, o tempo limita a defasagem
+        vencida = time.monotonic() - self.ultima_reconciliacao > INTERVALO_RECONCILIACAO
+        if vencida or colecao(self.nome).count_documents({}) != len(self.documentos):
+            self._recarregar()
+
+    def sincronizar(self):
+        with self.lock:
+            agora = time.monotonic()
+            if not self.pendente and agora - self.ultima_sincronizacao < INTERVALO_SINCRONIZACAO:
+                return
+            if not self.carregada:
+                self._recarregar()
+            elif self.fluxo is not None:
+                if not self._aplicar_fluxo():
+                    self._recarregar()
+            else:
+                self._buscar_novos()
+            self.ultima_sincronizacao = agora
+            self.pendente = False
+
+
+# Contador de escritas feitas pelo app em cada coleção, usado como chave de cache
+_versoes = {}
+
+
+def versao_escrita(nome):
+    return _versoes.get(nome, 0)
+
+
+# Uma cópia local por coleção, compartilhada por todas as sessões do processo
+@st.cache_resource(show_spinner=False)
+def copia_local(nome):
+    return CopiaLocal(nome)
+
+
+def versao_dados(*nomes):
+    """
+    Estado atual das coleções (escritas do app e mudanças trazidas pela cópia local),
+    para chaves de cache de resultados derivados, como as figuras de graficos.py.
+    """
+    return tuple((versao_escrita(nome), copia_local(nome).geracao) for nome in nomes)
+
+
+def invalidar(nome=None, completo=False):
+    """
+    Força a próxima leitura a sincronizar com o banco (uma coleção ou todas).
+    Deve ser chamada logo após qualquer escrita feita pelo próprio app. Com completo=True
+    (documentos substituídos no lugar, com o mesmo _id e a mesma contagem, que a busca
+    incremental não percebe) a cópia local é relida inteira e o próximo snapshot é completo.
+    """
+    nomes = [nome] if nome else ["treinos", "medidas", "exercicios", "registros_exercicios", "condicoes_treino"]
+    for n in nomes:
+        _versoes[n] = _versoes.get(n, 0) + 1
+        copia = copia_local(n)
+        if completo:
+            copia.carregada = False
+        copia.pendente = True
+    if completo:
+        from snapshots import marcar_reconstrucao
+
+        for n in nomes:
+            marcar_reconstrucao(n)
+
+
+def _carregar(nome, incluir_id=False, colunas=None):
+    copia = copia_local(nome)
+    try:
+        copia.sincronizar()
+    except PyMongoError:
+        # MongoDB fora do ar: segue com a cópia já carregada ou com o último snapshot
+        if not copia.carregada:
+            frame = _ler_snapshot(nome, colunas)
+            if frame is None:
+                raise
+            return frame
+    frame = copia.frame
+    if colunas is not None:
+        # Colunas ausentes no banco (coleção vazia, campo nunca gravado) vêm vazias
+        frame = frame.reindex(columns=[*(["_id"] if incluir_id else []), *colunas])
+    frame = frame.copy()
+    if not incluir_id and "_id" in frame.columns:
+        frame = frame.drop(columns="_id")
+    return frame
+
+
+# Consulta por período no índice de data, sem passar pela cópia completa.
+# colunas vira a projeção da consulta: só esses campos saem do banco.
+@st.cache_data(ttl=INTERVALO_SINCRONIZACAO, show_spinner=False)
+def _ler_periodo(nome, data_inicio, data_fim, colunas, versao):
+    campo = CAMPOS_DATA[nome]
+    filtro = {campo: {"$gte": para_datetime(data_inicio), "$lte": para_datetime(data_fim)}}
+    try:
+        documentos = list(colecao(nome).find(filtro, projecao(colunas)).sort(campo, ASCENDING))
+    except PyMongoError:
+        frame = _ler_snapshot(nome, colunas, data_inicio, data_fim)
+        if frame is None:
+            raise
+        return frame
+    return _frame(nome, documentos, list(colunas) if colunas is not None else None)
+
+
+@cronometrado("carregador")
+def carregar_periodo(nome, data_inicio, data_fim, colunas=None):
+    colunas = tuple(colunas) if colunas is not None else None
+    return _ler_periodo(nome, data_inicio, data_fim, colunas, versao_escrita(nome))
+
+
+# Primeira e última data da coleção (duas buscas pelo índice)
+@st.cache_data(ttl=INTERVALO_SINCRONIZACAO, show_spinner=False)
+def _ler_limites(nome, versao):
+    campo = CAMPOS_DATA[nome]
+    limites = []
+    try:
+        for ordem in (ASCENDING, DESCENDING):
+            doc = colecao(nome).find_one({campo: {"$type": "date"}}, {campo: 1, "_id": 0}, sort=[(campo, ordem)])
+            limites.append(doc[campo] if doc else None)
+    except PyMongoError:
+        from snapshots import consultar
+
+        frame = consultar(f'SELECT min("Data") AS inicio, max("Data") AS fim FROM {{{nome}}}')
+        if frame is None:
+            raise
+        limites = [None if pd.isna(valor) else valor.to_pydatetime() for valor in frame.iloc[0]]
+    return tuple(limites)
+
+
+@cronometrado("carregador")
+def limites_datas(nome):
+    return _ler_limites(nome, versao_escrita(nome))
+
+
+# Funções para carregar dados; colunas limita os campos devolvidos (padrão: todos)
+@cronometrado("carregador")
+def carregar_treinos(data_inicio=None, data_fim=None, colunas=None):
+    if data_inicio and data_fim:
+        return carregar_periodo("treinos", data_inicio, data_fim, colunas)
+    return _carregar("treinos", colunas=colunas)
+
+
+@cronometrado("carregador")
+def carregar_medidas(colunas=None):
+    return _carregar("medidas", colunas=colunas)
+
+
+@cronometrado("carregador")
+def carregar_exercicios(colunas=None):
+    return _carregar("exercicios", incluir_id=True, colunas=colunas)
+
+
+# Séries por exercício quando o catálogo não informa
+SERIES_PADRAO = 3
+# por_dia: dia_do_treino -> DataFrame com os exercícios do dia; por_nome: nome -> dict do exercício
+IndiceCatalogo = namedtuple("IndiceCatalogo", ["por_dia", "por_nome"])
+
+
+# Um índice por geração do catálogo, compartilhado entre sessões (não é copiado a cada leitura)
+@st.cache_resource(max_entries=2, show_spinner=False)
+def _indice_catalogo(geracao):
+    frame = copia_local("exercicios").frame.drop(columns="_id", errors="ignore")
+    if frame.empty or not {"nome", "dia_do_treino"}.issubset(frame.columns):
+        return IndiceCatalogo({}, {})
+    por_dia = {
+        str(dia): parte.reset_index(drop=True)
+        for dia, parte in frame.groupby("dia_do_treino", observed=True, sort=False)
+    }
+    por_nome = {linha["nome"]: linha for linha in frame.drop_duplicates(subset="nome").to_dict("records")}
+    return IndiceCatalogo(por_dia, por_nome)
+
+
+@cronometrado("carregador")
+def indice_catalogo():
+    """
+    Catálogo de exercícios indexado por dia do treino e por nome, refeito só quando o
+    catálogo muda. O índice é compartilhado: quem o usa não deve alterá-lo.
+    """
+    copia = copia_local("exercicios")
+    try:
+        copia.sincronizar()
+    except PyMongoError:
+        # MongoDB fora do ar: o catálogo já carregado continua valendo
+        if not copia.carregada:
+            raise
+    return _indice_catalogo(copia.geracao)
+
+
+def series_do_exercicio(exercicio):
+    """Número de séries do exercício no catálogo (SERIES_PADRAO se não informado)."""
+    series = pd.to_numeric(exercicio.get("series"), errors="coerce")
+    return int(series) if pd.notna(series) and series > 0 else SERIES_PADRAO
+
+
+@cronometrado("carregador")
+def carregar_condicoes(colunas=None):
+    return _carregar("condicoes_treino", incluir_id=True, colunas=colunas)
+
+
+@cronometrado("carregador")
+def carregar_registros_exercicios():
+    """
+    Carrega os registros de exercícios da coleção 'registros_exercicios' no MongoDB.
+    """
+    copia = copia_local("registros_exercicios")
+    copia.sincronizar()
+    with copia.lock:
+        documentos = list(copia.documentos.values())
+    # Cópia profunda: quem consome altera os dicionários de "Detalhes"
+    return [{k: v for k, v in copy.deepcopy(doc).items() if k != "_id"} for doc in documentos]
+
+
+COLUNAS_DETALHES = ["Treino", "Data", "Exercício", "Repetições", "Peso (kg)", "series", "musculo", "volume"]
+
+
+def _resumir_series(repeticoes, pesos):
+    # Uma linha por série (listas paralelas de repetições e pesos) e, por exercício, o total
+    # de repetições, a série mais pesada, quantas séries foram feitas e o volume exato
+    series = pd.DataFrame({"Repetições": repeticoes, "Peso (kg)": pesos}).explode(["Repetições", "Peso (kg)"])
+    series = series.apply(pd.to_numeric, errors="coerce")
+    series["volume"] = series["Repetições"] * series["Peso (kg)"]
+    return series.groupby(level=0).agg(
+        repeticoes=("Repetições", "sum"),
+        peso=("Peso (kg)", "max"),
+        series=("Repetições", "count"),
+        volume=("volume", "sum"),
+    )
+
+
+@cronometrado("transformacao")
+def achatar_registros(registros, df_exercicios):
+    """
+    Desaninha os "Detalhes" dos registros de exercícios em um DataFrame colunar com uma
+    linha por exercício registrado, já com "musculo" vindo do catálogo.
+
+    Registros por série ("Repetições" e "Peso (kg)" como listas, uma posição por série)
+    viram o total de repetições, o maior peso, as séries feitas e o volume exato. Nos
+    registros antigos, com uma leitura só por exercício, "series" vem do catálogo e o
+    volume é estimado como peso x repetições x séries. Não altera os dicionários recebidos.
+    """
+    df = pd.DataFrame(registros, columns=["Treino", "Data do Registro", "Detalhes"])
+    df = df[df["Detalhes"].map(lambda detalhes: isinstance(detalhes, list)).astype(bool)].copy()
+    # Converte as datas antes de desaninhar: uma conversão por registro, não por exercício
+    df["Data do Registro"] = converter_datas(df["Data do Registro"])
+    df = df.explode("Detalhes", ignore_index=True).dropna(subset=["Detalhes"])
+    if df.empty:
+        return pd.DataFrame(columns=COLUNAS_DETALHES)
+
+    detalhes = pd.DataFrame(df["Detalhes"].tolist(), columns=["Exercício", "Repetições", "Peso (kg)"])
+    detalhes["Treino"] = df["Treino"].to_numpy()
+    detalhes["Data"] = df["Data do Registro"].to_numpy()
+    # Tamanho das listas (-1 para os valores avulsos dos registros antigos)
+    tamanhos = {
+        coluna: pd.Series([len(valor) if isinstance(valor, list) else -1 for valor in detalhes[coluna].tolist()])
+        for coluna in ("Repetições", "Peso (kg)")
+    }
+    por_serie = (tamanhos["Repetições"] >= 0) & (tamanhos["Repetições"] == tamanhos["Peso (kg)"])
+    resumo = None
+    if por_serie.any():
+        resumo = _resumir_series(detalhes.loc[por_serie, "Repetições"], detalhes.loc[por_serie, "Peso (kg)"])
+    for coluna in ("Repetições", "Peso (kg)"):
+        # Listas ficam sem valor aqui: as por série voltam pelo resumo, as malformadas não
+        detalhes[coluna] = pd.to_numeric(detalhes[coluna].mask(tamanhos[coluna] >= 0), errors="coerce")
+
+    if not df_exercicios.empty and {"nome", "series", "musculo"}.issubset(df_exercicios.columns):
+        catalogo = df_exercicios[["nome", "series", "musculo"]].drop_duplicates(subset="nome")
+        detalhes = detalhes.merge(catalogo, left_on="Exercício", right_on="nome", how="left").drop(columns="nome")
+        detalhes["series"] = pd.to_numeric(detalhes["series"], errors="coerce")
+    else:
+        detalhes["series"] = float("nan")
+        detalhes["musculo"] = None
+    detalhes["volume"] = detalhes["Peso (kg)"] * detalhes["Repetições"] * detalhes["series"]
+    if resumo is not None:
+        # O merge preserva a ordem das linhas: o índice do resumo continua valendo
+        detalhes.loc[resumo.index, ["Repetições", "Peso (kg)", "series", "volume"]] = (
+            resumo[["repeticoes", "peso", "series", "volume"]].to_numpy(dtype="float64")
+        )
+    return compactar(detalhes[COLUNAS_DETALHES].copy())
+
+
+@st.cache_data(ttl=INTERVALO_RECONCILIACAO, max_entries=4, show_spinner=False)
+def _ler_detalhes(geracao_registros, geracao_exercicios):
+    registros = copia_local("registros_exercicios")
+    with registros.lock:
+        documentos = list(registros.documentos.values())
+    return achatar_registros(documentos, copia_local("exercicios").frame)
+
+
+@cronometrado("carregador")
+def carregar_detalhes_exercicios(colunas=None):
+    """
+    Detalhes dos registros de exercícios já desaninhados (ver achatar_registros).
+    O desaninhamento roda só quando registros ou catálogo mudam.
+    """
+    registros, exercicios = copia_local("registros_exercicios"), copia_local("exercicios")
+    try:
+        registros.sincronizar()
+        exercicios.sincronizar()
+    except PyMongoError:
+        if not (registros.carregada and exercicios.carregada):
+            detalhes = _ler_snapshot("detalhes_exercicios", colunas)
+            if detalhes is None:
+                raise
+            return detalhes
+    detalhes = _ler_detalhes(registros.geracao, exercicios.geracao)
+    return detalhes if colunas is None else detalhes[list(colunas)]
+
+
+def _ler_snapshot(nome, colunas=None, data_inicio=None, data_fim=None):
+    # Importado aqui: snapshots.py usa as funções deste módulo
+    from snapshots import ler_snapshot
+
+    return ler_snapshot(nome, colunas, data_inicio, data_fim)
+
+
+# Conjuntos de dados que uma página pode declarar (ver PAGINAS em app.py)
+CARREGADORES = {
+    "treinos": carregar_treinos,
+    "medidas": carregar_medidas,
+    "exercicios": carregar_exercicios,
+    "condicoes_treino": carregar_condicoes,
+    "detalhes_exercicios": carregar_detalhes_exercicios,
+}
+
+
+def carregar_dados(pedidos):
+    """
+    Carrega só os conjuntos pedidos pela página exibida; os demais nem são sincronizados.
+    pedidos: {conjunto: lista de colunas, ou None para todas}.
+    """
+    return {nome: CARREGADORES[nome](colunas=colunas) for nome, colunas in pedidos.items()}
@@ -0,0 +1,39 @@
+import os
+from datetime import timedelta
+from functools import lru_cache
+
+import numpy as np
+
+from instrumentacao import cronometrado
+
+# Subdivisão (UF) cujos feriados estaduais entram na conta; pode ser trocada por chamada
+SUBDIVISAO_PADRAO = os.getenv("FERIADOS_SUBDIV", "SP")
+# As 27 UFs (mesma lista de holidays.BR.subdivisions), sem importar o holidays no início:
+# o pacote carrega o módulo de todos os países
+SUBDIVISOES = [
+    "AC", "AL", "AM", "AP", "BA", "CE", "DF", "ES", "GO", "MA", "MG", "MS", "MT", "PA",
+    "PB", "PE", "PI", "PR", "RJ", "RN", "RO", "RR", "RS", "SC", "SE", "SP", "TO",
+]
+
+
+# Feriados de um ano/UF, calculados uma única vez por processo
+@lru_cache(maxsize=None)
+def feriados_ano(ano, subdiv=SUBDIVISAO_PADRAO):
+    import holidays
+
+    return tuple(sorted(holidays.BR(years=ano, subdiv=subdiv).keys()))
+
+
+# Calendário de dias úteis (seg-sex menos feriados) para um intervalo de anos
+@lru_cache(maxsize=256)
+def calendario(ano_inicial, ano_final, subdiv=SUBDIVISAO_PADRAO):
+    feriados = [dia for ano in range(ano_inicial, ano_final + 1) for dia in feriados_ano(ano, subdiv)]
+    return np.busdaycalendar(holidays=np.array(feriados, dtype="datetime64[D]"))
+
+
+# Função para calcular dias úteis (incluindo as duas pontas do intervalo)
+@cronometrado("agregacao")
+def calcular_dias_uteis(data_inicial, data_final, subdiv=SUBDIVISAO_PADRAO):
+    inicio = np.datetime64(data_inicial.strftime("%Y-%m-%d"), "D")
+    fim = np.datetime64((data_final + timedelta(days=1)).strftime("%Y-%m-%d"), "D")
+    return int(np.busday_count(inicio, fim, busdaycal=calendario(data_inicial.year, data_final.year, subdiv)))
@@ -0,0 +1,112 @@
+"""
+Figuras plotly das séries longas, reduzidas no servidor e guardadas já serializadas.
+
+Com anos de dados, mandar todos os pontos (e um rótulo de texto em cada um) gera figuras
+de vários MB e deixa o navegador lento. Aqui:
+- periodo_para escolhe dia, semana ou mês para os totais em barras conforme o intervalo;
+- reduzir aplica o LTTB (Largest-Triangle-Three-Buckets) em cada série das linhas,
+  mantendo a forma da curva com no máximo PONTOS_POR_SERIE pontos;
+- rotular só escreve o valor em cada ponto/barra quando eles cabem na tela;
+- exibir monta a figura uma vez por versão dos dados e filtros e reaproveita o JSON
+  nos reruns e nas outras sessões.
+"""
+import json
+import os
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+import plotly.io as pio
+import streamlit as st
+
+from dados import INTERVALO_RECONCILIACAO, para_datetime
+from instrumentacao import medir
+
+PONTOS_POR_SERIE = int(os.getenv("GRAFICOS_PONTOS_POR_SERIE", "400"))
+# Acima disso (pontos na figura inteira) os valores saem do texto e ficam só no hover
+ROTULOS_MAXIMOS = int(os.getenv("GRAFICOS_ROTULOS_MAXIMOS", "40"))
+# Barras por gráfico de totais: o período mais fino que não passa disso
+BARRAS_MAXIMAS = int(os.getenv("GRAFICOS_BARRAS_MAXIMAS", "120"))
+
+
+def periodo_para(data_inicio, data_fim):
+    """
+    Período dos totais ("dia", "semana" ou "mes") para o intervalo e o início do primeiro
+    período, para que a primeira barra não saia cortada pelo filtro.
+    """
+    inicio = para_datetime(data_inicio)
+    dias = (para_datetime(data_fim) - inicio).days + 1
+    if dias <= BARRAS_MAXIMAS:
+        return "dia", inicio
+    if dias / 7 <= BARRAS_MAXIMAS:
+        # Semana ISO, que começa na segunda (como em rollups._periodos)
+        return "semana", inicio - timedelta(days=inicio.weekday())
+    return "mes", inicio.replace(day=1)
+
+
+def lttb(x, y, limite):
+    """Índices dos pontos mantidos pelo LTTB (x crescente, sem NaN); todos se já cabem."""
+    n = len(x)
+    if limite >= n or limite < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype="float64")
+    y = np.asarray(y, dtype="float64")
+    indices = np.empty(limite, dtype=np.int64)
+    indices[0], indices[-1] = 0, n - 1
+    # Primeiro e último pontos ficam sempre; o resto se divide em limite - 2 baldes
+    bordas = np.linspace(1, n - 1, limite - 1).astype(np.int64)
+    anterior = 0
+    for balde in range(limite - 2):
+        inicio, fim = bordas[balde], bordas[balde + 1]
+        proximo_fim = bordas[balde + 2] if balde + 2 < len(bordas) else n
+        media_x, media_y = x[fim:proximo_fim].mean(), y[fim:proximo_fim].mean()
+        # Ponto do balde que forma o maior triângulo com o escolhido antes e a média do seguinte
+        areas = np.abs((x[anterior] - media_x) * (y[inicio:fim] - y[anterior])
+                       - (x[anterior] - x[inicio:fim]) * (media_y - y[anterior]))
+        anterior = inicio + int(areas.argmax())
+        indices[balde + 1] = anterior
+    return indices
+
+
+def reduzir(frame, x, y, grupo=None, limite=None):
+    """Linhas de `frame` com no máximo `limite` pontos por série (uma série por valor de `grupo`)."""
+    limite = limite or PONTOS_POR_SERIE
+    partes = [frame] if grupo is None else [parte for _, parte in frame.groupby(grupo, observed=True, sort=False)]
+    reduzidas = []
+    for parte in partes:
+        parte = parte.dropna(subset=[x, y]).sort_values(x)
+        eixo = parte[x].to_numpy()
+        if np.issubdtype(eixo.dtype, np.datetime64):
+            eixo = eixo.astype("datetime64[ns]").astype("int64")
+        reduzidas.append(parte.iloc[lttb(eixo, parte[y].to_numpy(), limite)])
+    return pd.concat(reduzidas) if reduzidas else frame.iloc[0:0]
+
+
+def rotular(figura, pontos, formato="%{y:.1f}", barras=False):
+    """Valor escrito em cada ponto/barra só se a figura tem até ROTULOS_MAXIMOS pontos."""
+    if barras:
+        if pontos <= ROTULOS_MAXIMOS:
+            figura.update_traces(texttemplate=formato, textposition="outside")
+        return figura
+    if pontos <= ROTULOS_MAXIMOS:
+        figura.update_traces(mode="lines+markers+text", textposition="top center", texttemplate=formato)
+    else:
+        # Marcadores só enquanto dá para distinguir os pontos
+        figura.update_traces(mode="lines+markers" if pontos <= PONTOS_POR_SERIE else "lines")
+    return figura
+
+
+# Figura serializada (JSON) por gráfico, versão dos dados e filtros; o TTL só limita a
+# defasagem de dados alterados por fora do app que a versão não acompanha
+@st.cache_data(ttl=INTERVALO_RECONCILIACAO, max_entries=64, show_spinner=False)
+def _figura(nome, versao, parametros, _construir):
+    return pio.to_json(_construir(), validate=False)
+
+
+def exibir(nome, versao, parametros, construir):
+    """
+    Exibe a figura devolvida por construir(), montada só quando muda a versão dos dados
+    (ver dados.versao_dados) ou os parâmetros do gráfico (filtros, seleções).
+    """
+    with medir(f"gráfico {nome}", "grafico"):
+        st.plotly_chart(json.loads(_figura(nome, versao, parametros, construir)), use_container_width=True)
@@ -0,0 +1,156 @@
+"""
+Importação em lote do histórico de treinos (exportações do relógio em CSV, Parquet ou JSON).
+
+Os arquivos são lidos em blocos, as colunas são mapeadas para as chaves do formulário
+da aba 1 (novo_treino), validadas de forma vetorizada e gravadas pelo repositório de
+treinos na chave natural Data + Tipo de Treino: reimportar o mesmo arquivo não duplica
+treinos, e cada treino novo ou corrigido atualiza os totais e a carga só com a sua
+diferença, como no formulário. Linhas repetidas na mesma chave valem pela última.
+
+Uso: MONGO_URL=... python importar_treinos.py historico.csv [outro.parquet ...]
+"""
+import argparse
+import os
+
+import pandas as pd
+
+from dados import CHAVES_NATURAIS
+from repositorios import ATUALIZADO, INSERIDO, treinos as repositorio_treinos
+
+TAMANHO_LOTE = 5000
+
+# Campos numéricos do treino (mesmas chaves de novo_treino na aba 1)
+CAMPOS_NUMERICOS = [
+    "Tempo Total (min)",
+    "Calorias Queimadas",
+    "Batimento Médio (bpm)",
+    "Batimento Máximo (bpm)",
+    "Zona Leve (min)",
+    "Zona Intensa (min)",
+    "Zona Aeróbica (min)",
+    "Zona Anaeróbica (min)",
+    "Zona Max. VO2 (min)",
+    "Mobilidade (min)",
+    "Aeróbico (min)",
+]
+CAMPOS_TREINO = ["Data", "Tipo de Treino", *CAMPOS_NUMERICOS, "Comentários"]
+
+# Nomes de coluna comuns nas exportações -> chave do treino (comparação sem maiúsculas)
+SINONIMOS = {
+    "date": "Data",
+    "data": "Data",
+    "type": "Tipo de Treino",
+    "activity": "Tipo de Treino",
+    "tipo": "Tipo de Treino",
+    "duration_min": "Tempo Total (min)",
+    "duracao": "Tempo Total (min)",
+    "calories": "Calorias Queimadas",
+    "calorias": "Calorias Queimadas",
+    "avg_hr": "Batimento Médio (bpm)",
+    "bpm_medio": "Batimento Médio (bpm)",
+    "max_hr": "Batimento Máximo (bpm)",
+    "bpm_max": "Batimento Máximo (bpm)",
+    "zone_light_min": "Zona Leve (min)",
+    "zone_intensive_min": "Zona Intensa (min)",
+    "zone_aerobic_min": "Zona Aeróbica (min)",
+    "zone_anaerobic_min": "Zona Anaeróbica (min)",
+    "zone_vo2max_min": "Zona Max. VO2 (min)",
+    "notes": "Comentários",
+    "comentarios": "Comentários",
+}
+
+
+def ler_em_blocos(arquivo, formato=None, tamanho_lote=TAMANHO_LOTE):
+    """Gera DataFrames de até tamanho_lote linhas; arquivo pode ser caminho ou arquivo aberto."""
+    nome = arquivo if isinstance(arquivo, str) else getattr(arquivo, "name", "")
+    formato = formato or os.path.splitext(nome)[1].lstrip(".").lower()
+    if formato == "csv":
+        yield from pd.read_csv(arquivo, chunksize=tamanho_lote)
+    elif formato == "parquet":
+        import pyarrow.parquet as pq
+
+        for lote in pq.ParquetFile(arquivo).iter_batches(batch_size=tamanho_lote):
+            yield lote.to_pandas()
+    elif formato in ("jsonl", "ndjson"):
+        yield from pd.read_json(arquivo, lines=True, chunksize=tamanho_lote)
+    elif formato == "json":
+        # JSON comum (lista de objetos) não permite leitura em blocos
+        df = pd.read_json(arquivo)
+        for inicio in range(0, len(df), tamanho_lote):
+            yield df.iloc[inicio:inicio + tamanho_lote]
+    else:
+        raise ValueError(f"Formato não suportado: {formato or nome}")
+
+
+def mapear_colunas(df):
+    renomear = {}
+    for coluna in df.columns:
+        destino = coluna if coluna in CAMPOS_TREINO else SINONIMOS.get(str(coluna).strip().lower())
+        if destino and destino not in renomear.values():
+            renomear[coluna] = destino
+    return df[list(renomear)].rename(columns=renomear)
+
+
+def validar(df):
+    """Converte tipos e separa as linhas válidas das inválidas (sem Data, sem tipo ou com valores negativos)."""
+    df = mapear_colunas(df)
+    for campo in CAMPOS_TREINO:
+        if campo not in df.columns:
+            df[campo] = 0 if campo in CAMPOS_NUMERICOS else None
+    df["Data"] = pd.to_datetime(df["Data"], errors="coerce", dayfirst=True, format="mixed").dt.normalize()
+    df[CAMPOS_NUMERICOS] = df[CAMPOS_NUMERICOS].apply(pd.to_numeric, errors="coerce").fillna(0).round().astype("int64")
+    df["Comentários"] = df["Comentários"].fillna("").astype(str)
+    df["Tipo de Treino"] = df["Tipo de Treino"].astype("string").str.strip()
+
+    validas = df["Data"].notna() & df["Tipo de Treino"].fillna("").ne("") & (df[CAMPOS_NUMERICOS] >= 0).all(axis=1)
+    return df.loc[validas, CAMPOS_TREINO], int((~validas).sum())
+
+
+def deduplicar(df):
+    """Mantém a última linha de cada Data + Tipo de Treino e devolve (df, repetidas descartadas)."""
+    unicos = df.drop_duplicates(subset=CHAVES_NATURAIS["treinos"], keep="last")
+    return unicos, len(df) - len(unicos)
+
+
+def gravar(df):
+    if df.empty:
+        return 0, 0
+    treinos = df.astype(object).to_dict("records")
+    for treino in treinos:
+        treino["Data"] = treino["Data"].to_pydatetime()
+    situacoes = [gravacao.situacao for gravacao in repositorio_treinos.salvar_varios(treinos)]
+    return situacoes.count(INSERIDO), situacoes.count(ATUALIZADO)
+
+
+def importar(arquivo, formato=None, tamanho_lote=TAMANHO_LOTE, ao_concluir_lote=None):
+    """
+    Importa um arquivo inteiro e devolve {"inseridos", "atualizados", "invalidos", "duplicados"}
+    (duplicados: linhas do mesmo bloco com Data e Tipo de Treino repetidos, substituídas pela
+    última). ao_concluir_lote(totais) é chamada após cada bloco gravado (ex.: progresso na tela).
+    """
+    totais = {"inseridos": 0, "atualizados": 0, "invalidos": 0, "duplicados": 0}
+    for bloco in ler_em_blocos(arquivo, formato, tamanho_lote):
+        validos, invalidos = validar(bloco)
+        validos, duplicados = deduplicar(validos)
+        inseridos, atualizados = gravar(validos)
+        totais["inseridos"] += inseridos
+        totais["atualizados"] += atualizados
+        totais["invalidos"] += invalidos
+        totais["duplicados"] += duplicados
+        if ao_concluir_lote:
+            ao_concluir_lote(totais)
+    return totais
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Importa o histórico de treinos para o MongoDB.")
+    parser.add_argument("arquivos", nargs="+", help="arquivos CSV, Parquet, JSON ou JSONL")
+    parser.add_argument("--formato", choices=["csv", "parquet", "json", "jsonl"], help="força o formato (padrão: extensão)")
+    parser.add_argument("--tamanho-lote", type=int, default=TAMANHO_LOTE)
+    argumentos = parser.parse_args()
+    for caminho in argumentos.arquivos:
+        totais = importar(caminho, argumentos.formato, argumentos.tamanho_lote)
+        print(
+            f"{caminho}: {totais['inseridos']} inseridos, {totais['atualizados']} atualizados, "
+            f"{totais['invalidos']} inválidos, {totais['duplicados']} repetidos"
+        )
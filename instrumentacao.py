@@ -0,0 +1,247 @@
+"""
+Instrumentação dos caminhos quentes do app: quanto tempo cada rerun gasta em carregadores,
+transformações, agregações, gráficos, OCR e comandos do MongoDB.
+
+- medir(etapa, categoria) / @cronometrado(categoria): cronometram um trecho ou função;
+- registrar_comando(...): chamado pelo MonitorComandos (conexao.py) a cada comando do MongoDB;
+- iniciar_rerun() / finalizar_rerun(pagina): delimitam um rerun do app.py. Entre os dois, as
+  medições da thread do script vão para o detalhamento daquele rerun (painel "Performance").
+
+Tudo também soma em contadores do processo, exportados no formato de texto do Prometheus
+(exportar_prometheus, ou GET /metrics na porta METRICAS_PORTA) e, com DESEMPENHO_LOG=1,
+em uma linha JSON por rerun no logger "dashboard.desempenho".
+"""
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+LOG_DESEMPENHO = os.getenv("DESEMPENHO_LOG", "0") == "1"
+# Porta do endpoint /metrics (Prometheus); vazio = desligado
+METRICAS_PORTA = os.getenv("METRICAS_PORTA")
+
+logger = logging.getLogger("dashboard.desempenho")
+
+_lock = threading.Lock()
+# (categoria, etapa) -> [execuções, segundos, máximo]
+_etapas = {}
+# (comando, coleção) -> [comandos, segundos, falhas]
+_comandos = {}
+# página -> [reruns, segundos]
+_reruns = {}
+# Rerun em andamento na thread do script (as sessões do Streamlit rodam em threads próprias)
+_atual = threading.local()
+_servidor = None
+
+
+class Rerun:
+    """Detalhamento de um rerun: etapas e comandos do MongoDB na ordem em que apareceram."""
+
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.total = None
+        self.pagina = None
+        self.nivel = 0
+        # etapa -> {"categoria", "nivel", "ms", "chamadas"}
+        self.etapas = {}
+        # (comando, coleção) -> {"ms", "comandos", "falhas"}
+        self.comandos = {}
+
+    def resumo(self):
+        medido = sum(etapa["ms"] for etapa in self.etapas.values() if etapa["nivel"] == 0)
+        return {
+            "pagina": self.pagina,
+            "total_ms": self.total,
+            "nao_medido_ms": max(0.0, self.total - medido) if self.total is not None else None,
+            "etapas": [{"etapa": nome, **valores} for nome, valores in self.etapas.items()],
+            "mongo": [{"comando": comando, "colecao": colecao, **valores}
+                      for (comando, colecao), valores in self.comandos.items()],
+        }
+
+
+def _rerun():
+    return getattr(_atual, "rerun", None)
+
+
+def iniciar_rerun():
+    _atual.rerun = Rerun()
+    return _atual.rerun
+
+
+def finalizar_rerun(pagina):
+    """Fecha o rerun da thread atual, soma nos contadores e devolve o resumo (None se não havia)."""
+    rerun = _rerun()
+    if rerun is None:
+        return None
+    rerun.total = (time.perf_counter() - rerun.inicio) * 1000
+    rerun.pagina = pagina
+    with _lock:
+        contador = _reruns.setdefault(pagina, [0, 0.0])
+        contador[0] += 1
+        contador[1] += rerun.total / 1000
+    _atual.rerun = None
+    resumo = rerun.resumo()
+    if LOG_DESEMPENHO:
+        logger.info(json.dumps(resumo, ensure_ascii=False))
+    return resumo
+
+
+@contextmanager
+def medir(etapa, categoria="outros"):
+    """Cronometra o bloco como `etapa`; chamadas repetidas no mesmo rerun se somam."""
+    rerun = _rerun()
+    if rerun is not None:
+        # Registrada na entrada: no detalhamento, cada etapa vem antes das que roda por dentro
+        detalhe = rerun.etapas.setdefault(etapa, {"categoria": categoria, "nivel": rerun.nivel, "ms": 0.0, "chamadas": 0})
+        rerun.nivel += 1
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        duracao = time.perf_counter() - inicio
+        with _lock:
+            contador = _etapas.setdefault((categoria, etapa), [0, 0.0, 0.0])
+            contador[0] += 1
+            contador[1] += duracao
+            contador[2] = max(contador[2], duracao)
+        if rerun is not None:
+            rerun.nivel -= 1
+            detalhe["ms"] += duracao * 1000
+            detalhe["chamadas"] += 1
+
+
+def cronometrado(categoria, etapa=None):
+    """Decorador: cada chamada da função é medida como `etapa` (padrão: nome da função)."""
+    def decorador(funcao):
+        nome = etapa or funcao.__name__
+
+        @functools.wraps(funcao)
+        def envolvida(*args, **kwargs):
+            with medir(nome, categoria):
+                return funcao(*args, **kwargs)
+
+        return envolvida
+
+    return decorador
+
+
+def registrar_comando(comando, colecao, duracao, falhou=False):
+    """Um comando do MongoDB concluído (duracao em segundos)."""
+    with _lock:
+        contador = _comandos.setdefault((comando, colecao), [0, 0.0, 0])
+        contador[0] += 1
+        contador[1] += duracao
+        contador[2] += int(falhou)
+    rerun = _rerun()
+    if rerun is not None:
+        detalhe = rerun.comandos.setdefault((comando, colecao), {"ms": 0.0, "comandos": 0, "falhas": 0})
+        detalhe["ms"] += duracao * 1000
+        detalhe["comandos"] += 1
+        detalhe["falhas"] += int(falhou)
+
+
+def acumulado():
+    """Contadores do processo desde o início, para tabelas (uma lista de dicts por grupo)."""
+    with _lock:
+        return {
+            "etapas": [
+                {"categoria": categoria, "etapa": etapa, "chamadas": n, "total_ms": 1000 * total,
+                 "media_ms": 1000 * total / n, "maximo_ms": 1000 * maximo}
+                for (categoria, etapa), (n, total, maximo) in _etapas.items()
+            ],
+            "mongo": [
+                {"comando": comando, "colecao": colecao, "comandos": n, "total_ms": 1000 * total,
+                 "media_ms": 1000 * total / n, "falhas": falhas}
+                for (comando, colecao), (n, total, falhas) in _comandos.items()
+            ],
+            "reruns": [
+                {"pagina": pagina, "reruns": n, "total_ms": 1000 * total, "media_ms": 1000 * total / n}
+                for pagina, (n, total) in _reruns.items()
+            ],
+        }
+
+
+def _escapar(valor):
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _rotulos(**rotulos):
+    return "{" + ",".join(f'{nome}="{_escapar(valor)}"' for nome, valor in rotulos.items()) + "}"
+
+
+def exportar_prometheus(medidores=None):
+    """
+    Contadores no formato de texto do Prometheus. `medidores` ({nome: valor}) entra como
+    gauges dashboard_<nome> (ex.: o resumo do pool de conexões).
+    """
+    with _lock:
+        etapas = {chave: list(valor) for chave, valor in _etapas.items()}
+        comandos = {chave: list(valor) for chave, valor in _comandos.items()}
+        reruns = {chave: list(valor) for chave, valor in _reruns.items()}
+    linhas = []
+
+    def metrica(nome, tipo, ajuda, amostras):
+        linhas.extend([f"# HELP {nome} {ajuda}", f"# TYPE {nome} {tipo}"])
+        linhas.extend(f"{nome}{rotulos} {valor}" for rotulos, valor in amostras)
+
+    metrica("dashboard_etapa_execucoes_total", "counter", "Execuções de cada etapa instrumentada.",
+            [(_rotulos(categoria=c, etapa=e), v[0]) for (c, e), v in etapas.items()])
+    metrica("dashboard_etapa_segundos_total", "counter", "Tempo acumulado em cada etapa instrumentada.",
+            [(_rotulos(categoria=c, etapa=e), f"{v[1]:.6f}") for (c, e), v in etapas.items()])
+    metrica("dashboard_etapa_maximo_segundos", "gauge", "Execução mais lenta de cada etapa.",
+            [(_rotulos(categoria=c, etapa=e), f"{v[2]:.6f}") for (c, e), v in etapas.items()])
+    metrica("dashboard_mongo_comandos_total", "counter", "Comandos enviados ao MongoDB.",
+            [(_rotulos(comando=c, colecao=col), v[0]) for (c, col), v in comandos.items()])
+    metrica("dashboard_mongo_comando_segundos_total", "counter", "Tempo acumulado dos comandos no MongoDB.",
+            [(_rotulos(comando=c, colecao=col), f"{v[1]:.6f}") for (c, col), v in comandos.items()])
+    metrica("dashboard_mongo_comando_falhas_total", "counter", "Comandos do MongoDB que falharam.",
+            [(_rotulos(comando=c, colecao=col), v[2]) for (c, col), v in comandos.items()])
+    metrica("dashboard_reruns_total", "counter", "Reruns do app por página.",
+            [(_rotulos(pagina=p), v[0]) for p, v in reruns.items()])
+    metrica("dashboard_rerun_segundos_total", "counter", "Tempo acumulado dos reruns por página.",
+            [(_rotulos(pagina=p), f"{v[1]:.6f}") for p, v in reruns.items()])
+    for nome, valor in (medidores or {}).items():
+        metrica(f"dashboard_{nome}", "gauge", nome.replace("_", " ").capitalize() + ".", [("", valor)])
+    return "\n".join(linhas) + "\n"
+
+
+def iniciar_servidor_metricas(porta, medidores=None):
+    """
+    Serve GET /metrics numa thread do processo (uma vez só). `medidores` é uma função
+    chamada a cada coleta, que devolve os gauges extras de exportar_prometheus.
+    """
+    global _servidor
+    with _lock:
+        if _servidor is not None:
+            return _servidor
+
+        class Metricas(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                corpo = exportar_prometheus(medidores() if medidores else None).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(corpo)))
+                self.end_headers()
+                self.wfile.write(corpo)
+
+            def log_message(self, formato, *args):
+                pass
+
+        _servidor = ThreadingHTTPServer(("", int(porta)), Metricas)
+        threading.Thread(target=_servidor.serve_forever, name="metricas", daemon=True).start()
+        return _servidor
+
+
+if LOG_DESEMPENHO and not logger.handlers:
+    _saida = logging.StreamHandler()
+    _saida.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(_saida)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
@@ -0,0 +1,73 @@
+"""
+Migração única: converte as datas gravadas como texto ("%d/%m/%Y" na aba 1 e
+"%Y-%m-%d" nas abas 2 e 3) em datas nativas do BSON e cria os índices usados
+pelas consultas por período.
+
+Uso: MONGO_URL=... python migrar_datas.py
+Pode ser executada mais de uma vez: documentos já migrados são ignorados. Um documento
+que, com a data convertida, repetiria a chave natural de outro já migrado (índice único,
+ver dados.CHAVES_NATURAIS) vai para "<coleção>_duplicados".
+"""
+from datetime import datetime
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from conexao import colecao
+from dados import CAMPOS_DATA, FORMATOS_DATA_LEGADOS, criar_indices, mover_duplicados
+
+TAMANHO_LOTE = 1000
+
+
+def texto_para_datetime(valor):
+    for formato in FORMATOS_DATA_LEGADOS:
+        try:
+            return datetime.strptime(valor, formato)
+        except ValueError:
+            continue
+    return None
+
+
+def _gravar_lote(destino, operacoes, ids, duplicados):
+    try:
+        return destino.bulk_write(operacoes, ordered=False).modified_count
+    except BulkWriteError as erro:
+        # Só as conversões que bateram no índice único falham; as demais já foram gravadas
+        falhas = erro.details["writeErrors"]
+        if any(falha["code"] != 11000 for falha in falhas):
+            raise
+        duplicados.extend(ids[falha["index"]] for falha in falhas)
+        return erro.details["nModified"]
+
+
+def migrar_colecao(nome, campo):
+    destino = colecao(nome)
+    operacoes, ids, duplicados, convertidos, invalidos = [], [], [], 0, 0
+    for doc in destino.find({campo: {"$type": "string"}}, {campo: 1, "Detalhes": 1}):
+        nova_data = texto_para_datetime(doc[campo])
+        if nova_data is None:
+            invalidos += 1
+            continue
+        alteracoes = {campo: nova_data}
+        # Os detalhes de registros_exercicios repetem a data do registro
+        if isinstance(doc.get("Detalhes"), list):
+            alteracoes["Detalhes"] = [
+                {**detalhe, "Data": nova_data} if isinstance(detalhe.get("Data"), str) else detalhe
+                for detalhe in doc["Detalhes"]
+            ]
+        operacoes.append(UpdateOne({"_id": doc["_id"]}, {"$set": alteracoes}))
+        ids.append(doc["_id"])
+        if len(operacoes) >= TAMANHO_LOTE:
+            convertidos += _gravar_lote(destino, operacoes, ids, duplicados)
+            operacoes, ids = [], []
+    if operacoes:
+        convertidos += _gravar_lote(destino, operacoes, ids, duplicados)
+    return convertidos, invalidos, mover_duplicados(nome, duplicados)
+
+
+if __name__ == "__main__":
+    for nome, campo in CAMPOS_DATA.items():
+        convertidos, invalidos, duplicados = migrar_colecao(nome, campo)
+        print(f"{nome}: {convertidos} documentos convertidos, {invalidos} com data inválida, {duplicados} duplicados")
+    criar_indices()
+    print("Índices criados.")
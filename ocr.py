@@ -0,0 +1,266 @@
+import hashlib
+import io
+import multiprocessing
+import os
+import threading
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+import pytesseract
+import streamlit as st
+from PIL import Image, ImageOps
+
+# Configuração do pytesseract (repetida em cada processo do pool ao importar o módulo)
+# TESSERACT_CMD aponta para outra instalação (ex.: /usr/bin/tesseract no servidor)
+if os.getenv("TESSERACT_CMD"):
+    pytesseract.pytesseract.tesseract_cmd = os.environ["TESSERACT_CMD"]
+else:
+    pytesseract.pytesseract.tesseract_cmd = r"C:\\Program Files\\Tesseract-OCR\\tesseract.exe"
+    os.environ["TESSDATA_PREFIX"] = r"C:\Program Files\Tesseract-OCR"
+
+# Processos dedicados ao tesseract e quantos resultados guardar em memória
+PROCESSOS_OCR = int(os.getenv("OCR_PROCESSOS", str(min(4, os.cpu_count() or 1))))
+MAX_RESULTADOS_OCR = int(os.getenv("OCR_MAX_RESULTADOS", "256"))
+
+
+# Rótulos do relatório do relógio; o valor é a primeira palavra da mesma linha
+ROTULOS = {
+    "bpm_medio": "Média de frequência cardíaca",
+    "bpm_max": "BPM máximo",
+    "calorias": "Queimou",
+    "tempo_total": "Tempo total",
+}
+# Largura (px) para a qual o print do celular é reduzido antes do OCR
+LARGURA_OCR = int(os.getenv("OCR_LARGURA", "720"))
+# Altura mínima (px) do recorte de um valor; recortes menores são ampliados
+ALTURA_MINIMA_RECORTE = 40
+# Um valor por linha, apenas dígitos e ":" (tempo total)
+CONFIG_VALOR = "--psm 7 -c tessedit_char_whitelist=0123456789:"
+# Faixa plausível de cada campo; um valor lido no recorte fora dela refaz a leitura completa
+FAIXAS = {
+    "bpm_medio": (30, 230),
+    "bpm_max": (40, 250),
+    "calorias": (1, 10000),
+    "tempo_total": (1, 24 * 60),
+}
+
+# Fração máxima dos pixels do rótulo que pode mudar entre duas imagens do mesmo layout
+# (bordas das letras que a binarização arredonda para outro lado)
+DIFERENCA_MAXIMA_ROTULO = 0.05
+
+# Região do valor de um campo e a do resto da linha (unidade e rótulo), com os pixels que
+# o rótulo tinha na leitura completa: se não batem, o layout mudou e a região não vale
+Regiao = namedtuple("Regiao", ["valor", "rotulo", "pixels"])
+
+# Regiões dos valores por tamanho de imagem: o layout do relatório é fixo para uma
+# mesma resolução de tela, então só a primeira imagem de cada tamanho é lida inteira
+_regioes_por_tamanho = {}
+
+
+def _limiar_otsu(cinza):
+    histograma = np.bincount(np.asarray(cinza).ravel(), minlength=256).astype(float)
+    probabilidades = histograma / histograma.sum()
+    acumulada = np.cumsum(probabilidades)
+    media_acumulada = np.cumsum(probabilidades * np.arange(256))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        variancia = (media_acumulada[-1] * acumulada - media_acumulada) ** 2 / (acumulada * (1 - acumulada))
+    return int(np.nanargmax(variancia))
+
+
+def preprocessar(imagem):
+    """Reduz, converte para tons de cinza e binariza (texto escuro sobre fundo claro)."""
+    imagem = ImageOps.exif_transpose(imagem)
+    if imagem.width > LARGURA_OCR:
+        imagem = imagem.resize((LARGURA_OCR, round(imagem.height * LARGURA_OCR / imagem.width)), Image.LANCZOS)
+    cinza = ImageOps.grayscale(imagem)
+    # Relatórios em tema escuro: inverte para o tesseract receber texto escuro
+    if np.asarray(cinza).mean() < 128:
+        cinza = ImageOps.invert(cinza)
+    limiar = _limiar_otsu(cinza)
+    return cinza.point(lambda p: 255 if p > limiar else 0)
+
+
+def _interpretar(campo, texto):
+    valor = texto.strip().split()[0] if texto.strip() else ""
+    try:
+        if campo == "tempo_total":
+            tempo = valor.split(":")
+            return int(tempo[0]) * 60 + int(tempo[1])
+        return int(valor)
+    except (ValueError, IndexError):
+        return None
+
+
+def _ler_pagina(imagem):
+    # Leitura completa (imagem já reduzida): extrai os valores e onde cada um está
+    palavras = pytesseract.image_to_data(imagem, lang="por", output_type=pytesseract.Output.DICT)
+    linhas = {}
+    for i, texto in enumerate(palavras["text"]):
+        if texto.strip():
+            chave = (palavras["block_num"][i], palavras["par_num"][i], palavras["line_num"][i])
+            linhas.setdefault(chave, []).append(i)
+
+    dados, regioes = dict.fromkeys(ROTULOS), {}
+    for indices in linhas.values():
+        texto_linha = " ".join(palavras["text"][i] for i in indices)
+        for campo, rotulo in ROTULOS.items():
+            if rotulo in texto_linha:
+                dados[campo] = _interpretar(campo, texto_linha)
+                primeira = indices[0]
+                esquerda, topo = palavras["left"][primeira], palavras["top"][primeira]
+                largura, altura = palavras["width"][primeira], palavras["height"][primeira]
+                # Margem para valores com mais dígitos, até a palavra seguinte (unidade ou
+                # rótulo): um valor mais largo que o recorte encosta na borda (ver _cortado)
+                direita = esquerda + largura + 2 * altura
+                if len(indices) > 1:
+                    direita = min(direita, palavras["left"][indices[1]] - 1)
+                valor = (
+                    max(0, esquerda - altura),
+                    max(0, topo - altura // 2),
+                    min(imagem.width, direita),
+                    min(imagem.height, topo + altura + altura // 2),
+                )
+                # O rótulo está na linha: há pelo menos uma palavra depois do valor
+                resto = indices[1:]
+                rotulo = (
+                    min(palavras["left"][i] for i in resto),
+                    min(palavras["top"][i] for i in resto),
+                    max(palavras["left"][i] + palavras["width"][i] for i in resto),
+                    max(palavras["top"][i] + palavras["height"][i] for i in resto),
+                )
+                regioes[campo] = Regiao(valor, rotulo, np.asarray(imagem.crop(rotulo)))
+    return dados, regioes
+
+
+def _cortado(recorte):
+    # Texto (preto, depois de preprocessar) na primeira ou na última coluna: o valor passa do recorte
+    pixels = np.asarray(recorte)
+    return bool((pixels[:, 0] == 0).any() or (pixels[:, -1] == 0).any())
+
+
+def _rotulo_confere(imagem, regiao):
+    # Mesmo rótulo no mesmo lugar: a linha do campo não mudou de posição nem de texto
+    pixels = np.asarray(imagem.crop(regiao.rotulo))
+    return pixels.shape == regiao.pixels.shape and (pixels != regiao.pixels).mean() <= DIFERENCA_MAXIMA_ROTULO
+
+
+def _ler_recorte(imagem, campo, regiao):
+    """
+    Valor do campo lido só na Regiao guardada; None se o rótulo ao lado não é o da leitura
+    completa, se o texto passa da região ou se o valor não é plausível.
+    """
+    if not _rotulo_confere(imagem, regiao) or _cortado(imagem.crop(regiao.valor)):
+        return None
+    valor = _interpretar(campo, ler_valor(imagem, regiao.valor))
+    minimo, maximo = FAIXAS[campo]
+    return valor if valor is not None and minimo <= valor <= maximo else None
+
+
+def ler_valor(imagem, regiao):
+    recorte = imagem.crop(regiao)
+    if recorte.height < ALTURA_MINIMA_RECORTE:
+        escala = ALTURA_MINIMA_RECORTE / recorte.height
+        recorte = recorte.resize((round(recorte.width * escala), ALTURA_MINIMA_RECORTE), Image.LANCZOS)
+    return pytesseract.image_to_string(recorte, config=CONFIG_VALOR)
+
+
+# Função para processar imagem
+def processar_imagem(imagem):
+    imagem = preprocessar(imagem)
+    regioes = _regioes_por_tamanho.get(imagem.size)
+    if regioes:
+        dados = {}
+        for campo, regiao in regioes.items():
+            dados[campo] = _ler_recorte(imagem, campo, regiao)
+            if dados[campo] is None:
+                break
+        else:
+            return dados
+
+    # Primeira imagem deste tamanho (ou layout diferente, recorte cortado ou valor implausível): leitura completa
+    dados, regioes = _ler_pagina(imagem)
+    if len(regioes) == len(ROTULOS):
+        _regioes_por_tamanho[imagem.size] = regioes
+    return dados
+
+
+# Executada nos processos do pool: recebe os bytes do arquivo enviado
+def _processar_bytes(conteudo):
+    try:
+        return processar_imagem(Image.open(io.BytesIO(conteudo)))
+    except Exception as erro:
+        # Algumas exceções do pytesseract não são serializáveis e derrubariam o pool
+        raise RuntimeError(f"{type(erro).__name__}: {erro}") from None
+
+
+def hash_conteudo(conteudo):
+    return hashlib.sha256(conteudo).hexdigest()
+
+
+class FilaOCR:
+    """
+    Pool de processos para o tesseract, com os resultados guardados pelo hash do
+    conteúdo da imagem. Reenviar a mesma imagem (ex.: a cada rerun enquanto o arquivo
+    continua no file_uploader) devolve o mesmo Future, já concluído.
+    """
+
+    def __init__(self, processos=PROCESSOS_OCR, max_resultados=MAX_RESULTADOS_OCR):
+        self.processos = processos
+        self.executor = self._novo_executor()
+        self.max_resultados = max_resultados
+        self.resultados = OrderedDict()
+        self.lock = threading.Lock()
+
+    def _novo_executor(self):
+        # "spawn" evita herdar as threads do servidor do Streamlit num fork
+        return ProcessPoolExecutor(max_workers=self.processos, mp_context=multiprocessing.get_context("spawn"))
+
+    def _submeter(self, conteudo):
+        try:
+            return self.executor.submit(_processar_bytes, conteudo)
+        except BrokenProcessPool:
+            # Um processo morreu (ex.: falta de memória): recria o pool e tenta de novo
+            self.executor = self._novo_executor()
+            return self.executor.submit(_processar_bytes, conteudo)
+
+    def enviar(self, conteudo):
+        chave = hash_conteudo(conteudo)
+        with self.lock:
+            futuro = self.resultados.get(chave)
+            # Resultados com erro não ficam em cache: a próxima tentativa roda de novo
+            if futuro is None or (futuro.done() and futuro.exception() is not None):
+                futuro = self._submeter(conteudo)
+                self.resultados[chave] = futuro
+            self.resultados.move_to_end(chave)
+            while len(self.resultados) > self.max_resultados:
+                self.resultados.popitem(last=False)
+        return futuro
+
+    def processar_lote(self, conteudos, ao_concluir=None):
+        """
+        Processa várias imagens em paralelo e devolve os resultados na ordem recebida.
+        ao_concluir(concluidas, total) é chamada a cada imagem terminada (ex.: barra de progresso).
+        """
+        # Imagens repetidas no lote compartilham o mesmo Future
+        posicoes = {}
+        for i, conteudo in enumerate(conteudos):
+            posicoes.setdefault(self.enviar(conteudo), []).append(i)
+        resultados = [None] * len(conteudos)
+        for concluidas, futuro in enumerate(as_completed(posicoes), start=1):
+            try:
+                resultado = futuro.result()
+            except Exception as erro:
+                resultado = erro
+            for i in posicoes[futuro]:
+                resultados[i] = resultado
+            if ao_concluir:
+                ao_concluir(concluidas, len(posicoes))
+        return resultados
+
+
+# Um pool por processo do servidor, compartilhado entre sessões
+@st.cache_resource(show_spinner=False)
+def fila_ocr():
+    return FilaOCR()
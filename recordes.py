@@ -0,0 +1,363 @@
+"""
+Recordes pessoais por exercício, atualizados a cada registro salvo na aba 2.
+
+Cada exercício tem um documento em "recordes_exercicios" (_id = nome do exercício) com os
+recordes correntes: maior peso, mais repetições em cada peso, 1RM estimado pelas fórmulas
+de Epley e Brzycki e maior volume (peso x repetições das séries) numa sessão. O histórico
+de cada métrica guarda só as vezes em que o recorde foi batido: a progressão e os selos
+de "novo recorde" da aba 7 leem algumas dezenas de linhas, e não todas as séries.
+
+registrar_recordes compara o registro novo com os documentos dos seus exercícios ($max
+nos recordes, $push no histórico quando um é batido). Um registro com data anterior à
+última sessão de um exercício mudaria o "anterior" e a ordem dos recordes seguintes: o
+documento desse exercício é refeito com todos os registros dele, como em
+reconstruir_recordes, que refaz tudo a partir de registros_exercicios.
+"""
+import numpy as np
+import pandas as pd
+import streamlit as st
+from pymongo import ReplaceOne, UpdateOne
+from pymongo.errors import OperationFailure, PyMongoError
+
+from conexao import colecao
+from dados import INTERVALO_SINCRONIZACAO, converter_datas, copia_local, series_do_exercicio, versao_escrita
+from instrumentacao import cronometrado
+
+COLECAO_RECORDES = "recordes_exercicios"
+# Métricas com recorde e histórico -> rótulo
+METRICAS = {
+    "peso_max": "Peso máximo (kg)",
+    "e1rm_epley": "1RM estimado, Epley (kg)",
+    "e1rm_brzycki": "1RM estimado, Brzycki (kg)",
+    "melhor_volume": "Volume numa sessão (kg)",
+}
+# Acima disso as fórmulas de 1RM perdem a precisão: a série não entra na estimativa
+REPETICOES_MAXIMAS_1RM = 12
+# Janela dos selos de "novo recorde" da aba 7
+DIAS_RECORDES_RECENTES = 30
+
+COLUNAS = ["Exercício", *METRICAS, "repeticoes_no_peso_max", "sessoes", "ultima_sessao"]
+
+
+def epley(peso, repeticoes):
+    """1RM estimado (Epley): peso x (1 + repetições / 30); uma repetição é o próprio peso."""
+    return np.where(repeticoes > 1, peso * (1 + repeticoes / 30), peso)
+
+
+def brzycki(peso, repeticoes):
+    """1RM estimado (Brzycki): peso x 36 / (37 - repetições)."""
+    return peso * 36 / (37 - repeticoes)
+
+
+def chave_peso(peso):
+    # Peso como nome de campo do MongoDB, que não aceita ponto: 52.5 -> "52,5"
+    return f"{float(peso):g}".replace(".", ",")
+
+
+def _detalhes(registros, series_catalogo=None):
+    # Uma linha por exercício registrado, com as listas de repetições e pesos das séries.
+    # Registros antigos (uma leitura por exercício) viram as séries do catálogo com a mesma leitura.
+    df = pd.DataFrame(registros, columns=["Data do Registro", "Detalhes"])
+    df = df[df["Detalhes"].map(lambda detalhes: isinstance(detalhes, list)).astype(bool)]
+    df = df.assign(Data=converter_datas(df["Data do Registro"])).dropna(subset=["Data"])
+    df = df.explode("Detalhes").dropna(subset=["Detalhes"])
+    detalhes = pd.DataFrame(df["Detalhes"].tolist(), columns=["Exercício", "Repetições", "Peso (kg)"])
+    detalhes.insert(0, "registro", df.index.to_numpy())
+    detalhes.insert(1, "Data", df["Data"].to_numpy())
+    detalhes = detalhes.dropna(subset=["Exercício"])
+
+    series_catalogo = series_catalogo or {}
+    repeticoes, pesos = [], []
+    for nome, reps, peso in zip(detalhes["Exercício"], detalhes["Repetições"], detalhes["Peso (kg)"]):
+        if isinstance(reps, list) and isinstance(peso, list) and len(reps) == len(peso):
+            repeticoes.append(reps)
+            pesos.append(peso)
+        elif isinstance(reps, list) or isinstance(peso, list):
+            # Listas de tamanhos diferentes: nenhuma série aproveitável
+            repeticoes.append([])
+            pesos.append([])
+        else:
+            series = series_do_exercicio({"series": series_catalogo.get(nome)})
+            repeticoes.append([reps] * series)
+            pesos.append([peso] * series)
+    detalhes["Repetições"] = repeticoes
+    detalhes["Peso (kg)"] = pesos
+    return detalhes.reset_index(drop=True)
+
+
+def _series(detalhes):
+    # Uma linha por série feita: repetições > 0 e peso informado
+    series = detalhes.explode(["Repetições", "Peso (kg)"])
+    series[["Repetições", "Peso (kg)"]] = series[["Repetições", "Peso (kg)"]].apply(pd.to_numeric, errors="coerce")
+    series = series[(series["Repetições"] > 0) & (series["Peso (kg)"] >= 0)]
+    validas = series["Repetições"] <= REPETICOES_MAXIMAS_1RM
+    return series.assign(
+        volume=series["Repetições"] * series["Peso (kg)"],
+        e1rm_epley=np.where(validas, epley(series["Peso (kg)"], series["Repetições"]), np.nan),
+        e1rm_brzycki=np.where(validas, brzycki(series["Peso (kg)"], series["Repetições"]), np.nan),
+    )
+
+
+def _sessoes(series):
+    # Melhor marca de cada métrica por exercício em cada registro
+    sessoes = series.groupby(["registro", "Exercício"], sort=False).agg(
+        Data=("Data", "first"),
+        peso_max=("Peso (kg)", "max"),
+        e1rm_epley=("e1rm_epley", "max"),
+        e1rm_brzycki=("e1rm_brzycki", "max"),
+        melhor_volume=("volume", "sum"),
+    )
+    return sessoes.round(2).reset_index()
+
+
+def _por_peso(series):
+    # Mais repetições numa série de cada peso, por exercício em cada registro
+    return (
+        series.groupby(["registro", "Exercício", "Peso (kg)"], sort=False)
+        .agg(Data=("Data", "first"), repeticoes=("Repetições", "max"))
+        .reset_index()
+    )
+
+
+def _batidos(frame, chaves, coluna):
+    # Linhas em que `coluna` supera o maior valor anterior do mesmo grupo (a primeira de cada grupo entra
+    # com anterior NaN); empates não contam
+    frame = frame.dropna(subset=[coluna]).sort_values(["Data", "registro"], kind="stable")
+    grupos = [frame[chave] for chave in chaves]
+    anterior = frame.groupby(grupos, sort=False)[coluna].cummax().groupby(grupos, sort=False).shift()
+    batido = anterior.isna() | (frame[coluna] > anterior)
+    return frame[batido].assign(anterior=anterior[batido])
+
+
+def _evento(data, valor, anterior, **extras):
+    return {
+        "Data": pd.Timestamp(data).to_pydatetime(),
+        "valor": float(valor),
+        "anterior": None if anterior is None or pd.isna(anterior) else float(anterior),
+        **extras,
+    }
+
+
+@cronometrado("calculo")
+def calcular_recordes(registros, series_catalogo=None):
+    """Documentos de recordes (um por exercício) a partir de todos os `registros` de exercícios."""
+    detalhes = _detalhes(registros, series_catalogo)
+    series = _series(detalhes)
+    sessoes, por_peso = _sessoes(series), _por_peso(series)
+
+    documentos = {
+        nome: {
+            "_id": nome,
+            "sessoes": int(linha["sessoes"]),
+            "ultima_sessao": linha["ultima_sessao"].to_pydatetime(),
+            "repeticoes_por_peso": {},
+            "historico": {metrica: [] for metrica in [*METRICAS, "repeticoes"]},
+        }
+        for nome, linha in detalhes.groupby("Exercício", sort=False)
+        .agg(sessoes=("registro", "size"), ultima_sessao=("Data", "max"))
+        .iterrows()
+    }
+    for nome, maximos in sessoes.groupby("Exercício", sort=False)[list(METRICAS)].max().iterrows():
+        documentos[nome].update({metrica: float(valor) for metrica, valor in maximos.items() if pd.notna(valor)})
+    for metrica in METRICAS:
+        for linha in _batidos(sessoes, ["Exercício"], metrica).to_dict("records"):
+            documentos[linha["Exercício"]]["historico"][metrica].append(
+                _evento(linha["Data"], linha[metrica], linha["anterior"])
+            )
+
+    for (nome, peso), repeticoes in por_peso.groupby(["Exercício", "Peso (kg)"], sort=False)["repeticoes"].max().items():
+        documentos[nome]["repeticoes_por_peso"][chave_peso(peso)] = int(repeticoes)
+    # Nas repetições, só conta como recorde superar uma marca anterior no mesmo peso
+    for linha in _batidos(por_peso, ["Exercício", "Peso (kg)"], "repeticoes").dropna(subset=["anterior"]).to_dict("records"):
+        documentos[linha["Exercício"]]["historico"]["repeticoes"].append(
+            _evento(linha["Data"], linha["repeticoes"], linha["anterior"], peso=float(linha["Peso (kg)"]))
+        )
+    return list(documentos.values())
+
+
+def _series_catalogo(sessao=None):
+    exercicios = colecao("exercicios").find({}, {"nome": 1, "series": 1, "_id": 0}, session=sessao)
+    return {doc["nome"]: doc.get("series") for doc in exercicios if "nome" in doc}
+
+
+def _refazer(nomes, sessao=None):
+    # Documentos dos exercícios recalculados com todos os registros em que aparecem
+    registros = colecao("registros_exercicios").find(
+        {"Detalhes.Exercício": {"$in": nomes}}, {"Data do Registro": 1, "Detalhes": 1, "_id": 0}, session=sessao
+    )
+    documentos = calcular_recordes(list(registros), _series_catalogo(sessao))
+    return [ReplaceOne({"_id": doc["_id"]}, doc, upsert=True) for doc in documentos if doc["_id"] in nomes]
+
+
+def registrar_recordes(registro, sessao=None):
+    """
+    Atualiza os recordes com um registro já inserido (na transação de `sessao`), sem reler o
+    histórico; só os exercícios com sessão posterior à data do registro são refeitos.
+    """
+    avulsos = any(not isinstance(detalhe.get("Repetições"), list) for detalhe in registro.get("Detalhes") or [])
+    detalhes = _detalhes([registro], _series_catalogo(sessao) if avulsos else None)
+    if detalhes.empty:
+        return
+    series = _series(detalhes)
+    sessoes = {linha["Exercício"]: linha for linha in _sessoes(series).to_dict("records")}
+    por_peso = _por_peso(series)
+    data = detalhes["Data"].iloc[0].to_pydatetime()
+
+    recordes = colecao(COLECAO_RECORDES)
+    nomes = detalhes["Exercício"].unique().tolist()
+    atuais = {doc["_id"]: doc for doc in recordes.find({"_id": {"$in": nomes}}, {"historico": 0}, session=sessao)}
+    # Registro com data anterior: os recordes "até aquela data" não são os atuais
+    atrasados = [nome for nome in nomes if nome in atuais and data < atuais[nome].get("ultima_sessao", data)]
+    operacoes = _refazer(atrasados, sessao) if atrasados else []
+    for nome, quantidade in detalhes["Exercício"].value_counts(sort=False).items():
+        if nome in atrasados:
+            continue
+        atual = atuais.get(nome, {})
+        maximos, eventos = {"ultima_sessao": data}, {}
+        for metrica in METRICAS:
+            valor = sessoes.get(nome, {}).get(metrica)
+            if valor is None or pd.isna(valor):
+                continue
+            maximos[metrica] = float(valor)
+            if atual.get(metrica) is None or valor > atual[metrica]:
+                eventos[f"historico.{metrica}"] = [_evento(data, valor, atual.get(metrica))]
+        for linha in por_peso[por_peso["Exercício"] == nome].to_dict("records"):
+            chave = chave_peso(linha["Peso (kg)"])
+            maximos[f"repeticoes_por_peso.{chave}"] = int(linha["repeticoes"])
+            anterior = atual.get("repeticoes_por_peso", {}).get(chave)
+            if anterior is not None and linha["repeticoes"] > anterior:
+                eventos.setdefault("historico.repeticoes", []).append(
+                    _evento(data, linha["repeticoes"], anterior, peso=float(linha["Peso (kg)"]))
+                )
+        atualizacao = {"$inc": {"sessoes": int(quantidade)}, "$max": maximos}
+        if eventos:
+            atualizacao["$push"] = {campo: {"$each": lista} for campo, lista in eventos.items()}
+        operacoes.append(UpdateOne({"_id": nome}, atualizacao, upsert=True))
+    recordes.bulk_write(operacoes, ordered=False, session=sessao)
+
+
+def reconstruir_recordes():
+    """Recalcula todos os recordes a partir da coleção de registros (uso pontual)."""
+    registros = list(colecao("registros_exercicios").find({}, {"Data do Registro": 1, "Detalhes": 1, "_id": 0}))
+    documentos = calcular_recordes(registros, _series_catalogo())
+
+    recordes = colecao(COLECAO_RECORDES)
+    recordes.delete_many({})
+    if documentos:
+        recordes.insert_many(documentos, ordered=False)
+    return len(documentos)
+
+
+def _exercicios_registrados():
+    # Total de exercícios nos "Detalhes" de todos os registros (a soma de "sessoes" dos recordes)
+    registros = colecao("registros_exercicios")
+    try:
+        totais = list(registros.aggregate([
+            {"$group": {"_id": None, "exercicios": {"$sum": {"$size": {"$ifNull": ["$Detalhes", []]}}}}},
+        ]))
+        return totais[0]["exercicios"] if totais else 0
+    except OperationFailure:
+        # "Detalhes" que não é lista em algum registro: conta aqui
+        documentos = registros.find({}, {"Detalhes": 1, "_id": 0})
+        return sum(len(doc["Detalhes"]) for doc in documentos if isinstance(doc.get("Detalhes"), list))
+
+
+# Reconstrói os recordes uma vez por processo se estiverem vazios ou fora de sincronia
+# com os registros (ex.: registros inseridos por fora do app)
+@st.cache_resource(show_spinner=False)
+def garantir_recordes():
+    totais = list(colecao(COLECAO_RECORDES).aggregate([{"$group": {"_id": None, "sessoes": {"$sum": "$sessoes"}}}]))
+    if (totais[0]["sessoes"] if totais else 0) != _exercicios_registrados():
+        reconstruir_recordes()
+    return True
+
+
+# Um índice (nome -> documento) por versão dos registros, compartilhado entre sessões
+@st.cache_resource(ttl=INTERVALO_SINCRONIZACAO, max_entries=2, show_spinner=False)
+def _indice_recordes(versao):
+    try:
+        documentos = list(colecao(COLECAO_RECORDES).find({}))
+    except PyMongoError:
+        # MongoDB indisponível: os mesmos recordes calculados da cópia local dos registros, se já carregada
+        registros, exercicios = copia_local("registros_exercicios"), copia_local("exercicios")
+        if not registros.carregada:
+            return {}
+        with registros.lock:
+            documentos_registros = list(registros.documentos.values())
+        catalogo = exercicios.frame
+        series_catalogo = dict(zip(catalogo["nome"], catalogo["series"])) if {"nome", "series"}.issubset(catalogo.columns) else None
+        documentos = calcular_recordes(documentos_registros, series_catalogo)
+    return {documento["_id"]: documento for documento in documentos}
+
+
+def recorde(exercicio):
+    """Documento de recordes do exercício (None se nunca registrado). Compartilhado: não altere."""
+    return _indice_recordes(versao_escrita("registros_exercicios")).get(exercicio)
+
+
+def repeticoes_no_peso(exercicio, peso):
+    """Mais repetições já feitas numa série do exercício com esse peso (None se nunca)."""
+    return ((recorde(exercicio) or {}).get("repeticoes_por_peso") or {}).get(chave_peso(peso))
+
+
+@cronometrado("agregacao")
+def ler_recordes():
+    """Recordes correntes (COLUNAS), um por exercício, do mais registrado ao menos."""
+    linhas = []
+    for nome, documento in _indice_recordes(versao_escrita("registros_exercicios")).items():
+        peso_max = documento.get("peso_max")
+        linhas.append({
+            "Exercício": nome,
+            **{metrica: documento.get(metrica) for metrica in METRICAS},
+            "repeticoes_no_peso_max": None if peso_max is None else repeticoes_no_peso(nome, peso_max),
+            "sessoes": documento.get("sessoes", 0),
+            "ultima_sessao": documento.get("ultima_sessao"),
+        })
+    return pd.DataFrame(linhas, columns=COLUNAS).sort_values(["sessoes", "Exercício"], ascending=[False, True], ignore_index=True)
+
+
+@cronometrado("agregacao")
+def progressao_recordes(exercicios, metrica):
+    """
+    Recorde de `metrica` ao longo do tempo (Data, Exercício, valor): um ponto por vez em que
+    foi batido e um na última sessão, para a linha em degraus chegar até ela.
+    """
+    linhas = []
+    for nome in exercicios:
+        documento = recorde(nome) or {}
+        eventos = documento.get("historico", {}).get(metrica, [])
+        linhas.extend({"Data": evento["Data"], "Exercício": nome, "valor": evento["valor"]} for evento in eventos)
+        if eventos and documento.get("ultima_sessao"):
+            linhas.append({"Data": documento["ultima_sessao"], "Exercício": nome, "valor": documento.get(metrica)})
+    frame = pd.DataFrame(linhas, columns=["Data", "Exercício", "valor"]).sort_values("Data", kind="stable", ignore_index=True)
+    # Registros com data anterior chegam fora de ordem: em cada data vale o maior até ali
+    frame["valor"] = frame.groupby("Exercício", sort=False)["valor"].cummax()
+    return frame
+
+
+@cronometrado("agregacao")
+def recordes_recentes(data_inicio, data_fim=None):
+    """Recordes batidos entre as datas (inclusive), mais recentes primeiro; cada um com descricao."""
+    eventos = []
+    for nome, documento in _indice_recordes(versao_escrita("registros_exercicios")).items():
+        for metrica, historico in (documento.get("historico") or {}).items():
+            eventos.extend(
+                {"Exercício": nome, "metrica": metrica, **evento}
+                for evento in historico
+                if evento.get("anterior") is not None
+                and evento["Data"] >= data_inicio
+                and (data_fim is None or evento["Data"] <= data_fim)
+            )
+    eventos.sort(key=lambda evento: evento["Data"], reverse=True)
+    return [{**evento, "descricao": descrever(evento)} for evento in eventos]
+
+
+def descrever(evento):
+    """Texto curto de um recorde batido, ex.: "Agachamento: Peso máximo (kg) 80 → 85"."""
+    if evento["metrica"] == "repeticoes":
+        return f"{evento['Exercício']}: {evento['valor']:g} repetições com {evento['peso']:g} kg (antes {evento['anterior']:g})"
+    return f"{evento['Exercício']}: {METRICAS[evento['metrica']]} {evento['anterior']:g} → {evento['valor']:g}"
+
+
+if __name__ == "__main__":
+    print(f"{reconstruir_recordes()} exercícios recalculados em '{COLECAO_RECORDES}'.")
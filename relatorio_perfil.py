@@ -0,0 +1,119 @@
+"""
+Relatório de perfil (sweetviz) dos treinos, gerado num processo à parte e guardado em disco.
+
+O sweetviz leva vários segundos, e a página nunca espera por ele: pedir() devolve o último
+relatório pronto e, se chegaram treinos novos, dispara a geração em segundo plano. Cada
+relatório é um HTML em RELATORIOS_DIR com a versão dos dados no nome; sobrevive a reinícios
+do servidor e só é refeito quando a versão muda.
+"""
+import contextlib
+import glob
+import multiprocessing
+import os
+import threading
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import streamlit as st
+
+PASTA_RELATORIOS = os.getenv("RELATORIOS_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "relatorios"))
+
+# caminho: HTML mais recente já pronto (ou None); gerando: há uma versão mais nova a caminho;
+# erro: exceção da última geração, que não é repetida sozinha
+Estado = namedtuple("Estado", ["caminho", "gerando", "erro"])
+
+
+def versao_treinos(frame):
+    """Quantidade de treinos e data do mais recente: muda quando chegam treinos novos."""
+    if frame.empty:
+        return "vazio"
+    return f"{len(frame)}-{frame['Data'].max():%Y%m%d%H%M%S}"
+
+
+def _caminho(versao):
+    return os.path.join(PASTA_RELATORIOS, f"treinos-{versao}.html")
+
+
+def _mais_recente():
+    relatorios = glob.glob(os.path.join(PASTA_RELATORIOS, "treinos-*.html"))
+    return max(relatorios, key=os.path.getmtime) if relatorios else None
+
+
+def _gerar_html(frame, caminho):
+    # Roda no processo do pool
+    import numpy as np
+
+    # O sweetviz 2.3 ainda usa np.VisibleDeprecationWarning, que o NumPy 2 moveu para np.exceptions
+    if not hasattr(np, "VisibleDeprecationWarning"):
+        np.VisibleDeprecationWarning = np.exceptions.VisibleDeprecationWarning
+    import sweetviz
+
+    os.makedirs(PASTA_RELATORIOS, exist_ok=True)
+    temporario = f"{caminho}.{os.getpid()}.tmp"
+    # Barras de progresso e avisos do sweetviz não vão para o log do servidor; erros sobem pelo futuro
+    with open(os.devnull, "w") as nulo, contextlib.redirect_stdout(nulo), contextlib.redirect_stderr(nulo):
+        sweetviz.analyze(frame).show_html(temporario, open_browser=False, layout="vertical")
+    # Troca de uma vez (quem lê nunca vê o arquivo pela metade) e apaga as versões antigas
+    os.replace(temporario, caminho)
+    for antigo in glob.glob(os.path.join(PASTA_RELATORIOS, "treinos-*.html")):
+        if antigo != caminho:
+            os.remove(antigo)
+    return caminho
+
+
+class GeradorRelatorio:
+    """Um processo dedicado ao sweetviz; uma geração por vez, sempre da versão mais nova pedida."""
+
+    def __init__(self):
+        self.executor = self._novo_executor()
+        self.lock = threading.Lock()
+        self.futuro = None
+        self.versao = None
+
+    def _novo_executor(self):
+        # "spawn" evita herdar as threads do servidor do Streamlit num fork
+        return ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn"))
+
+    def _submeter(self, frame, caminho):
+        try:
+            return self.executor.submit(_gerar_html, frame, caminho)
+        except BrokenProcessPool:
+            self.executor = self._novo_executor()
+            return self.executor.submit(_gerar_html, frame, caminho)
+
+    def gerando(self):
+        with self.lock:
+            return self.futuro is not None and not self.futuro.done()
+
+    def pedir(self, frame, refazer=False):
+        """
+        Estado do relatório dos treinos em `frame`, sem bloquear. Se a versão dos dados não
+        tem relatório, a geração começa (ou fica para quando a atual terminar). Uma geração
+        que falhou só é repetida com refazer=True.
+        """
+        versao = versao_treinos(frame)
+        caminho = _caminho(versao)
+        if os.path.exists(caminho):
+            return Estado(caminho, False, None)
+        with self.lock:
+            gerando = self.futuro is not None and not self.futuro.done()
+            if not gerando and (self.versao != versao or refazer):
+                self.futuro = self._submeter(frame, caminho)
+                self.versao = versao
+                gerando = True
+            erro = None if gerando or self.futuro is None else self.futuro.exception()
+        return Estado(_mais_recente(), gerando, erro)
+
+
+# Um gerador por processo do servidor, compartilhado entre sessões
+@st.cache_resource(show_spinner=False)
+def gerador_relatorio():
+    return GeradorRelatorio()
+
+
+# O HTML (~1 MB) lido uma vez por versão; o nome do arquivo já identifica os dados
+@st.cache_data(max_entries=2, show_spinner=False)
+def ler_html(caminho):
+    with open(caminho, encoding="utf-8") as arquivo:
+        return arquivo.read()
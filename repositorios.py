@@ -0,0 +1,180 @@
+"""
+Repositórios das coleções usadas pelas páginas do app.
+
+Cada repositório reúne as leituras (pelos carregadores de dados.py, com cache e cópia
+local) e as escritas de uma coleção, já com o que cada gravação exige em seguida:
+invalidar os caches e, nos treinos, somar os totais de treinos_rollups e a carga de
+treino (carga_treino.py); nos registros de exercícios, atualizar os recordes pessoais
+(recordes.py). O armazenamento por trás é o de conexao.banco(): o MongoDB ou o arquivo
+local (ARMAZENAMENTO=local).
+
+Treinos e medidas são gravados por upsert na chave natural (dados.CHAVES_NATURAIS, com
+índice único): enviar o mesmo formulário duas vezes não cria um segundo documento, e as
+leituras não precisam descartar repetidos.
+"""
+from collections import namedtuple
+
+from pymongo import ReturnDocument
+
+from carga_treino import corrigir_carga, registrar_carga
+from conexao import colecao, em_transacao
+from dados import (
+    CHAVES_NATURAIS,
+    carregar_condicoes,
+    carregar_detalhes_exercicios,
+    carregar_exercicios,
+    carregar_medidas,
+    carregar_registros_exercicios,
+    carregar_treinos,
+    indice_catalogo,
+    invalidar,
+)
+from recordes import registrar_recordes
+from rollups import corrigir_treino, registrar_treino
+
+# Resultado de salvar(): _id do documento e o que a gravação fez com ele
+INSERIDO, ATUALIZADO, INALTERADO = "inserido", "atualizado", "inalterado"
+Gravacao = namedtuple("Gravacao", ["id", "situacao"])
+
+
+class Repositorio:
+    nome = None
+    # Campos da chave natural (dados.CHAVES_NATURAIS); sem ela, salvar() só insere
+    chave_natural = None
+
+    @property
+    def colecao(self):
+        return colecao(self.nome)
+
+    def _gravar(self, documento, sessao=None):
+        # Devolve a Gravacao e o documento substituído (None se inserido).
+        if self.chave_natural is None:
+            return Gravacao(self.colecao.insert_one(documento, session=sessao).inserted_id, INSERIDO), None
+        # Substituição e não $set: "Zona Max. VO2 (min)" tem ponto e seria lido como caminho aninhado
+        campos = {campo: valor for campo, valor in documento.items() if campo != "_id"}
+        filtro = {campo: campos[campo] for campo in self.chave_natural}
+        anterior = self.colecao.find_one_and_replace(
+            filtro, campos, upsert=True, return_document=ReturnDocument.BEFORE, session=sessao
+        )
+        if anterior is None:
+            _id = self.colecao.find_one(filtro, {"_id": 1}, session=sessao)["_id"]
+            return Gravacao(_id, INSERIDO), None
+        _id = anterior.pop("_id")
+        return Gravacao(_id, INALTERADO if anterior == campos else ATUALIZADO), anterior
+
+    def salvar(self, documento):
+        """
+        Grava o documento pela chave natural: insere se a chave é nova, senão substitui o
+        que havia (coleções sem chave natural sempre inserem). Devolve a Gravacao; as
+        leituras seguintes já veem o documento.
+        """
+        gravacao, _ = self._gravar(documento)
+        # Substituído no lugar (mesmo _id e contagem): a cópia local e o snapshot são refeitos
+        invalidar(self.nome, completo=gravacao.situacao == ATUALIZADO)
+        return gravacao
+
+
+class RepositorioTreinos(Repositorio):
+    nome = "treinos"
+    chave_natural = CHAVES_NATURAIS["treinos"]
+
+    def listar(self, colunas=None, data_inicio=None, data_fim=None):
+        return carregar_treinos(data_inicio, data_fim, colunas)
+
+    def _salvar(self, documento, serie_fc, sessao):
+        gravacao, anterior = self._gravar(documento, sessao)
+        if gravacao.situacao == INSERIDO:
+            registrar_treino(documento, sessao)
+            registrar_carga(documento, sessao)
+        elif gravacao.situacao == ATUALIZADO:
+            corrigir_treino(anterior, documento, sessao)
+            corrigir_carga(anterior, documento, sessao)
+        if serie_fc is not None:
+            from arquivos_relogio import gravar_serie
+
+            gravar_serie(gravacao.id, documento, *serie_fc, sessao=sessao)
+        return gravacao
+
+    def salvar(self, documento, serie_fc=None):
+        """
+        Grava o treino pela chave natural (Data e Tipo de Treino) na mesma transação que os
+        totais de treinos_rollups, a carga de treino e a série de FC do arquivo do relógio
+        (serie_fc = (segundos, bpm)), quando há. Um treino reenviado igual não soma nada;
+        um treino corrigido troca nos totais e na carga os valores antigos pelos novos.
+        """
+        gravacao = em_transacao(lambda sessao: self._salvar(documento, serie_fc, sessao))
+        invalidar(self.nome, completo=gravacao.situacao == ATUALIZADO)
+        return gravacao
+
+    def salvar_varios(self, documentos):
+        """
+        Grava vários treinos como salvar(), cada um na sua transação (um lote grande não
+        cabe no limite de tempo de uma só), e invalida os caches uma vez no fim. Devolve a
+        Gravacao de cada documento, na ordem recebida.
+        """
+        gravacoes = [
+            em_transacao(lambda sessao, documento=documento: self._salvar(documento, None, sessao))
+            for documento in documentos
+        ]
+        situacoes = {gravacao.situacao for gravacao in gravacoes}
+        if situacoes - {INALTERADO}:
+            invalidar(self.nome, completo=ATUALIZADO in situacoes)
+        return gravacoes
+
+
+class RepositorioMedidas(Repositorio):
+    nome = "medidas"
+    chave_natural = CHAVES_NATURAIS["medidas"]
+
+    def listar(self, colunas=None):
+        return carregar_medidas(colunas)
+
+
+class RepositorioExercicios(Repositorio):
+    nome = "exercicios"
+
+    def listar(self, colunas=None):
+        return carregar_exercicios(colunas)
+
+    def catalogo(self):
+        """Catálogo indexado por dia do treino e por nome (ver dados.indice_catalogo)."""
+        return indice_catalogo()
+
+
+class RepositorioRegistros(Repositorio):
+    nome = "registros_exercicios"
+
+    def inserir(self, documento):
+        """Insere o registro e atualiza os recordes dos seus exercícios na mesma transação."""
+        def gravar(sessao):
+            gravacao, _ = self._gravar(documento, sessao)
+            registrar_recordes(documento, sessao)
+            return gravacao.id
+
+        _id = em_transacao(gravar)
+        invalidar(self.nome)
+        return _id
+
+    def listar(self, colunas=None):
+        registros = carregar_registros_exercicios()
+        if colunas is None:
+            return registros
+        return [{campo: registro[campo] for campo in colunas if campo in registro} for registro in registros]
+
+    def detalhes(self, colunas=None):
+        """Uma linha por exercício registrado (ver dados.achatar_registros)."""
+        return carregar_detalhes_exercicios(colunas)
+
+
+class RepositorioCondicoes(Repositorio):
+    nome = "condicoes_treino"
+
+    def listar(self, colunas=None):
+        return carregar_condicoes(colunas)
+
+
+treinos = RepositorioTreinos()
+medidas = RepositorioMedidas()
+exercicios = RepositorioExercicios()
+registros = RepositorioRegistros()
+condicoes = RepositorioCondicoes()
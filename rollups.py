@@ -0,0 +1,227 @@
+from datetime import timedelta
+
+import pandas as pd
+import streamlit as st
+from pymongo import ASCENDING, ReturnDocument, UpdateOne
+from pymongo.errors import PyMongoError
+
+from agregacoes import COLUNAS_ZONAS
+from conexao import colecao
+from dados import INTERVALO_SINCRONIZACAO, converter_datas, para_datetime, projecao, versao_escrita
+from instrumentacao import cronometrado
+from snapshots import consultar
+
+# Totais pré-calculados dos treinos por dia, semana ISO, mês e ano.
+# Cada documento de "treinos_rollups" tem _id "<periodo>:<chave>" (ex.: "mes:2025-01")
+# e guarda sessões, dias treinados, minutos, calorias, minutos por zona e BPM.
+# O formulário da aba 1 atualiza os totais a cada treino salvo (registrar_treino, ou
+# corrigir_treino quando substitui um treino da mesma data e tipo) e as abas de análise
+# leem só estas linhas, cujo número não cresce com o histórico.
+
+COLECAO_ROLLUPS = "treinos_rollups"
+# Período do rollup -> unidade do date_trunc do DuckDB (semana ISO começa na segunda)
+UNIDADES_SNAPSHOT = {"dia": "day", "semana": "week", "mes": "month", "ano": "year"}
+
+
+def _periodos(data):
+    ano_iso, semana_iso, _ = data.isocalendar()
+    return {
+        "dia": (data.strftime("%Y-%m-%d"), data.replace(hour=0, minute=0, second=0, microsecond=0)),
+        "semana": (f"{ano_iso}-W{semana_iso:02d}", data.fromisocalendar(ano_iso, semana_iso, 1)),
+        "mes": (data.strftime("%Y-%m"), data.replace(day=1, hour=0, minute=0, second=0, microsecond=0)),
+        "ano": (str(data.year), data.replace(month=1, day=1, hour=0, minute=0, second=0, microsecond=0)),
+    }
+
+
+def _valor(treino, campo):
+    return treino.get(campo) or 0
+
+
+@st.cache_resource(show_spinner=False)
+def criar_indice_rollups():
+    colecao(COLECAO_ROLLUPS).create_index([("periodo", ASCENDING), ("inicio", ASCENDING)])
+    return True
+
+
+def _somas(treino):
+    # Campos somados de cada treino nos totais
+    return {
+        "minutos": _valor(treino, "Tempo Total (min)"),
+        "calorias": _valor(treino, "Calorias Queimadas"),
+        "soma_bpm_medio": _valor(treino, "Batimento Médio (bpm)"),
+        **{f"zonas.{zona}": _valor(treino, coluna) for zona, coluna in COLUNAS_ZONAS.items()},
+    }
+
+
+def registrar_treino(treino, sessao=None):
+    """Soma um treino recém-inserido aos totais de dia, semana, mês e ano (na transação de `sessao`)."""
+    data = para_datetime(treino["Data"])
+    periodos = _periodos(data)
+    incrementos = {"sessoes": 1, **_somas(treino)}
+    maximos = {"bpm_max": _valor(treino, "Batimento Máximo (bpm)")}
+    rollups = colecao(COLECAO_ROLLUPS)
+
+    # O documento do dia diz se este é o primeiro treino da data (conta como novo dia treinado)
+    chave_dia, inicio_dia = periodos["dia"]
+    anterior = rollups.find_one_and_update(
+        {"_id": f"dia:{chave_dia}"},
+        {"$inc": incrementos, "$max": maximos, "$setOnInsert": {"periodo": "dia", "inicio": inicio_dia, "dias": 1}},
+        upsert=True,
+        return_document=ReturnDocument.BEFORE,
+        session=sessao,
+    )
+    novo_dia = int(anterior is None)
+    rollups.bulk_write([
+        UpdateOne(
+            {"_id": f"{periodo}:{chave}"},
+            {"$inc": {**incrementos, "dias": novo_dia}, "$max": maximos, "$setOnInsert": {"periodo": periodo, "inicio": inicio}},
+            upsert=True,
+        )
+        for periodo, (chave, inicio) in periodos.items()
+        if periodo != "dia"
+    ], ordered=False, session=sessao)
+
+
+def corrigir_treino(anterior, treino, sessao=None):
+    """
+    Troca nos totais os valores de um treino substituído no lugar (mesma data e tipo) pelos
+    novos: as somas recebem a diferença, e o BPM máximo, que o $max não desfaz, é refeito com
+    os treinos de cada período, já com a correção (na transação de `sessao`).
+    """
+    periodos = _periodos(para_datetime(treino["Data"]))
+    antigas, novas = _somas(anterior), _somas(treino)
+    diferencas = {campo: novas[campo] - antigas[campo] for campo in novas}
+
+    # Os quatro períodos cabem entre o início do ano (ou da semana ISO, que pode começar no
+    # ano anterior) e o fim do ano (ou da semana)
+    _, inicio_semana = periodos["semana"]
+    _, inicio_ano = periodos["ano"]
+    filtro = {"Data": {
+        "$gte": min(inicio_semana, inicio_ano),
+        "$lt": max(inicio_semana + timedelta(days=7), inicio_ano.replace(year=inicio_ano.year + 1)),
+    }}
+    maximos = dict.fromkeys(periodos, 0)
+    for outro in colecao("treinos").find(filtro, {"Data": 1, "Batimento Máximo (bpm)": 1}, session=sessao):
+        for periodo, (chave, _) in _periodos(outro["Data"]).items():
+            if chave == periodos[periodo][0]:
+                maximos[periodo] = max(maximos[periodo], _valor(outro, "Batimento Máximo (bpm)"))
+
+    colecao(COLECAO_ROLLUPS).bulk_write([
+        UpdateOne({"_id": f"{periodo}:{chave}"}, {"$inc": diferencas, "$set": {"bpm_max": maximos[periodo]}})
+        for periodo, (chave, _) in periodos.items()
+    ], ordered=False, session=sessao)
+
+
+def reconstruir_rollups():
+    """Recalcula todos os totais a partir da coleção de treinos (uso pontual)."""
+    colunas = ["Data", "Tempo Total (min)", "Calorias Queimadas", "Batimento Médio (bpm)", "Batimento Máximo (bpm)", *COLUNAS_ZONAS.values()]
+    df = pd.DataFrame(list(colecao("treinos").find({}, projecao(colunas))), columns=colunas)
+    df["Data"] = converter_datas(df["Data"])
+    df = df.dropna(subset=["Data"])
+    df[colunas[1:]] = df[colunas[1:]].apply(pd.to_numeric, errors="coerce").fillna(0)
+
+    iso = df["Data"].dt.isocalendar()
+    inicios = {
+        "dia": df["Data"].dt.normalize(),
+        "semana": df["Data"].dt.normalize() - pd.to_timedelta(iso["day"] - 1, unit="D"),
+        "mes": df["Data"].dt.to_period("M").dt.start_time,
+        "ano": df["Data"].dt.to_period("Y").dt.start_time,
+    }
+    documentos = []
+    for periodo, inicio in inicios.items():
+        grupos = df.assign(inicio=inicio, dia=df["Data"].dt.normalize()).groupby("inicio")
+        totais = grupos.agg(
+            sessoes=("Data", "size"),
+            dias=("dia", "nunique"),
+            minutos=("Tempo Total (min)", "sum"),
+            calorias=("Calorias Queimadas", "sum"),
+            soma_bpm_medio=("Batimento Médio (bpm)", "sum"),
+            bpm_max=("Batimento Máximo (bpm)", "max"),
+        )
+        zonas = grupos[list(COLUNAS_ZONAS.values())].sum()
+        for linha in totais.reset_index().to_dict("records"):
+            inicio_periodo = linha.pop("inicio").to_pydatetime()
+            documentos.append({
+                "_id": f"{periodo}:{_periodos(inicio_periodo)[periodo][0]}",
+                "periodo": periodo,
+                "inicio": inicio_periodo,
+                **linha,
+                "zonas": {zona: float(zonas.at[inicio_periodo, coluna]) for zona, coluna in COLUNAS_ZONAS.items()},
+            })
+
+    rollups = colecao(COLECAO_ROLLUPS)
+    rollups.delete_many({})
+    if documentos:
+        rollups.insert_many(documentos, ordered=False)
+    criar_indice_rollups()
+    return len(documentos)
+
+
+# Reconstrói os totais uma vez por processo se estiverem vazios ou fora de sincronia
+# com a coleção de treinos (ex.: treinos inseridos por fora do app)
+@st.cache_resource(show_spinner=False)
+def garantir_rollups():
+    criar_indice_rollups()
+    sessoes = sum(doc["sessoes"] for doc in colecao(COLECAO_ROLLUPS).find({"periodo": "ano"}, {"sessoes": 1}))
+    if sessoes != colecao("treinos").count_documents({}):
+        reconstruir_rollups()
+    return True
+
+
+@st.cache_data(ttl=INTERVALO_SINCRONIZACAO, show_spinner=False)
+def _ler_rollups(periodo, data_inicio, data_fim, versao):
+    filtro = {"periodo": periodo}
+    if data_inicio or data_fim:
+        filtro["inicio"] = {}
+        if data_inicio:
+            filtro["inicio"]["$gte"] = para_datetime(data_inicio)
+        if data_fim:
+            filtro["inicio"]["$lte"] = para_datetime(data_fim)
+    try:
+        df = pd.DataFrame(list(colecao(COLECAO_ROLLUPS).find(filtro, {"_id": 0}).sort("inicio", ASCENDING)))
+    except PyMongoError:
+        df = _rollups_snapshot(periodo, data_inicio, data_fim)
+        if df is None:
+            raise
+    if df.empty:
+        return pd.DataFrame(columns=["inicio", "sessoes", "dias", "minutos", "calorias", "bpm_medio", "bpm_max"])
+    df["bpm_medio"] = df["soma_bpm_medio"] / df["sessoes"]
+    return df
+
+
+def _rollups_snapshot(periodo, data_inicio, data_fim):
+    # Mesmos totais calculados em SQL sobre o snapshot Parquet (MongoDB indisponível)
+    condicoes, parametros = [], []
+    if data_inicio:
+        condicoes.append("inicio >= ?")
+        parametros.append(para_datetime(data_inicio))
+    if data_fim:
+        condicoes.append("inicio <= ?")
+        parametros.append(para_datetime(data_fim))
+    return consultar(f"""
+        SELECT
+            date_trunc('{UNIDADES_SNAPSHOT[periodo]}', "Data") AS inicio,
+            count(*) AS sessoes,
+            count(DISTINCT date_trunc('day', "Data")) AS dias,
+            coalesce(sum("Tempo Total (min)"), 0)::BIGINT AS minutos,
+            coalesce(sum("Calorias Queimadas"), 0)::BIGINT AS calorias,
+            coalesce(sum("Batimento Médio (bpm)"), 0)::BIGINT AS soma_bpm_medio,
+            max("Batimento Máximo (bpm)") AS bpm_max
+        FROM {{treinos}}
+        GROUP BY inicio
+        {"HAVING " + " AND ".join(condicoes) if condicoes else ""}
+        ORDER BY inicio
+    """, parametros)
+
+
+@cronometrado("agregacao")
+def ler_rollups(periodo, data_inicio=None, data_fim=None):
+    """
+    Totais de um período ("dia", "semana", "mes" ou "ano"), um por linha, ordenados por "inicio".
+    O filtro de datas se aplica ao início de cada período.
+    """
+    return _ler_rollups(periodo, data_inicio, data_fim, versao_escrita("treinos"))
+
+
+if __name__ == "__main__":
+    print(f"{reconstruir_rollups()} totais recalculados em '{COLECAO_ROLLUPS}'.")
@@ -0,0 +1,258 @@
+"""
+Snapshots colunares das coleções em Parquet e consultas DuckDB sobre eles.
+
+Cada conjunto (treinos, medidas, condicoes_treino e os registros de exercícios já
+desaninhados em detalhes_exercicios) é gravado em
+<SNAPSHOTS_DIR>/<conjunto>/ano=AAAA/mes=M/dados.parquet.
+A atualização é incremental: os documentos com _id maior que o último exportado são
+acrescentados só às partições dos seus meses. Remoções (a contagem de documentos não
+bate), documentos substituídos pelo app (marcar_reconstrucao), mudanças no catálogo de
+exercícios e a passagem de INTERVALO_RECONSTRUCAO segundos disparam uma exportação completa.
+
+As análises rodam em SQL no DuckDB sobre os arquivos (leitura colunar, paralela) e,
+com o MongoDB lento ou fora do ar, seguem com o último snapshot gravado.
+
+Uso: MONGO_URL=... python snapshots.py [--completo]
+"""
+import argparse
+import glob
+import os
+import threading
+import time
+
+import pandas as pd
+import streamlit as st
+from bson import json_util
+from pymongo import ASCENDING
+from pymongo.errors import PyMongoError
+
+from conexao import colecao
+from dados import INTERVALO_SINCRONIZACAO, achatar_registros, compactar, converter_datas, versao_escrita
+from instrumentacao import cronometrado
+
+PASTA_SNAPSHOTS = os.getenv("SNAPSHOTS_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "snapshots"))
+# Intervalo (s) entre exportações completas, que apanham edições feitas por fora do app
+INTERVALO_RECONSTRUCAO = float(os.getenv("SNAPSHOTS_RECONSTRUCAO_SEGUNDOS", "86400"))
+# Espera (s) antes de tentar de novo quando o MongoDB não respondeu
+ESPERA_APOS_FALHA = float(os.getenv("SNAPSHOTS_ESPERA_APOS_FALHA_SEGUNDOS", "60"))
+
+# Conjunto exportado -> coleção de origem. Em todos a partição sai da coluna "Data"
+# (nos detalhes, a "Data do Registro" de cada registro).
+CONJUNTOS = {
+    "treinos": "treinos",
+    "medidas": "medidas",
+    "condicoes_treino": "condicoes_treino",
+    "detalhes_exercicios": "registros_exercicios",
+}
+
+_lock = threading.Lock()
+# Próxima verificação de cada conjunto: (versão de escrita da coleção, instante)
+_proximas = {}
+
+
+def _pasta(nome):
+    return os.path.join(PASTA_SNAPSHOTS, nome)
+
+
+def _arquivo(nome, ano, mes):
+    return os.path.join(_pasta(nome), f"ano={ano}", f"mes={mes}", "dados.parquet")
+
+
+def _particoes(nome):
+    return set(glob.glob(os.path.join(_pasta(nome), "ano=*", "mes=*", "dados.parquet")))
+
+
+def disponivel(nome):
+    return bool(_particoes(nome))
+
+
+def _ler_estado(nome):
+    try:
+        with open(os.path.join(_pasta(nome), "_estado.json"), encoding="utf-8") as arquivo:
+            return json_util.loads(arquivo.read())
+    except FileNotFoundError:
+        return None
+
+
+def _gravar_estado(nome, estado):
+    os.makedirs(_pasta(nome), exist_ok=True)
+    caminho = os.path.join(_pasta(nome), "_estado.json")
+    with open(caminho + ".tmp", "w", encoding="utf-8") as arquivo:
+        arquivo.write(json_util.dumps(estado))
+    os.replace(caminho + ".tmp", caminho)
+
+
+def _gravar(caminho, frame):
+    # Grava ao lado e troca de uma vez: consultas em andamento nunca veem um arquivo pela metade
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    frame.to_parquet(caminho + ".tmp", index=False)
+    os.replace(caminho + ".tmp", caminho)
+
+
+def _catalogo():
+    return pd.DataFrame(list(colecao("exercicios").find({}, {"_id": 0, "nome": 1, "series": 1, "musculo": 1})))
+
+
+def _frame(nome, documentos):
+    if nome == "detalhes_exercicios":
+        frame = achatar_registros(documentos, _catalogo())
+    else:
+        frame = pd.DataFrame(documentos).drop(columns="_id", errors="ignore")
+    if "Data" not in frame.columns:
+        return pd.DataFrame(columns=["Data"])
+    frame["Data"] = converter_datas(frame["Data"])
+    # Sem data não há partição: esses documentos ficam de fora do snapshot
+    return compactar(frame.dropna(subset=["Data"]).reset_index(drop=True))
+
+
+def _por_mes(frame):
+    return frame.groupby([frame["Data"].dt.year, frame["Data"].dt.month])
+
+
+def _reconstruir(nome):
+    documentos = list(colecao(CONJUNTOS[nome]).find({}).sort("_id", ASCENDING))
+    frame = _frame(nome, documentos)
+    gravadas = set()
+    for (ano, mes), parte in _por_mes(frame):
+        _gravar(_arquivo(nome, ano, mes), parte)
+        gravadas.add(_arquivo(nome, ano, mes))
+    # Meses que ficaram sem documentos (remoções)
+    for caminho in _particoes(nome) - gravadas:
+        os.remove(caminho)
+    estado = {
+        "ultimo_id": documentos[-1]["_id"] if documentos else None,
+        "total": len(documentos),
+        "reconstruido_em": time.time(),
+        "catalogo": colecao("exercicios").count_documents({}) if nome == "detalhes_exercicios" else None,
+    }
+    _gravar_estado(nome, estado)
+    return estado
+
+
+def atualizar(nome, completo=False):
+    """Atualiza o snapshot de um conjunto (incremental, salvo se completo=True) e devolve o estado gravado."""
+    estado = _ler_estado(nome)
+    origem = colecao(CONJUNTOS[nome])
+    if (
+        completo
+        or estado is None
+        or time.time() - estado["reconstruido_em"] > INTERVALO_RECONSTRUCAO
+        or (nome == "detalhes_exercicios" and colecao("exercicios").count_documents({}) != estado["catalogo"])
+    ):
+        return _reconstruir(nome)
+
+    filtro = {"_id": {"$gt": estado["ultimo_id"]}} if estado["ultimo_id"] is not None else {}
+    novos = list(origem.find(filtro).sort("_id", ASCENDING))
+    # Menos documentos do que o esperado: houve remoção, exporta tudo de novo
+    if origem.count_documents({}) != estado["total"] + len(novos):
+        return _reconstruir(nome)
+    if not novos:
+        return estado
+
+    for (ano, mes), parte in _por_mes(_frame(nome, novos)):
+        caminho = _arquivo(nome, ano, mes)
+        if os.path.exists(caminho):
+            # Categorias diferentes nos dois lados viram object no concat: compacta de novo
+            parte = compactar(pd.concat([pd.read_parquet(caminho), parte], ignore_index=True))
+        _gravar(caminho, parte)
+    estado.update(ultimo_id=novos[-1]["_id"], total=estado["total"] + len(novos))
+    _gravar_estado(nome, estado)
+    return estado
+
+
+def marcar_reconstrucao(origem):
+    """
+    Faz a próxima atualização dos conjuntos vindos da coleção `origem` ser completa: documentos
+    substituídos no lugar não têm _id novo nem mudam a contagem. Fica gravado no estado, que
+    vale também para os outros processos e depois de reiniciar.
+    """
+    with _lock:
+        for nome, colecao_origem in CONJUNTOS.items():
+            estado = _ler_estado(nome) if colecao_origem == origem else None
+            if estado is not None:
+                estado["reconstruido_em"] = 0
+                _gravar_estado(nome, estado)
+
+
+@cronometrado("snapshot")
+def garantir_snapshots(*nomes):
+    """
+    Atualiza os conjuntos pedidos se o app gravou na coleção desde a última verificação
+    ou se ela tem mais de INTERVALO_SINCRONIZACAO segundos. Se o MongoDB não responde,
+    o último snapshot continua valendo e a próxima tentativa fica para ESPERA_APOS_FALHA
+    segundos depois. Devolve True se todos têm arquivos para consultar.
+    """
+    with _lock:
+        for nome in nomes:
+            versao = versao_escrita(CONJUNTOS[nome])
+            proxima = _proximas.get(nome)
+            if proxima is None or proxima[0] != versao or time.monotonic() >= proxima[1]:
+                try:
+                    atualizar(nome)
+                    espera = INTERVALO_SINCRONIZACAO
+                except PyMongoError:
+                    # Banco indisponível: segue com o que já está em disco
+                    espera = ESPERA_APOS_FALHA
+                _proximas[nome] = (versao, time.monotonic() + espera)
+    return all(disponivel(nome) for nome in nomes)
+
+
+# Conexão DuckDB em memória (só lê os Parquet); cada consulta usa o próprio cursor
+@st.cache_resource(show_spinner=False)
+def _duckdb():
+    import duckdb
+
+    return duckdb.connect()
+
+
+def _fonte(nome):
+    padrao = os.path.join(_pasta(nome), "**", "*.parquet").replace("\\", "/").replace("'", "''")
+    return f"read_parquet('{padrao}', hive_partitioning = true, union_by_name = true)"
+
+
+@cronometrado("duckdb")
+def consultar(sql, parametros=()):
+    """
+    Executa sql no DuckDB sobre os snapshots: {treinos}, {medidas}, {condicoes_treino} e
+    {detalhes_exercicios} no texto viram a leitura dos Parquet do conjunto (com as colunas
+    de partição ano e mes). Devolve um DataFrame, ou None se algum conjunto usado ainda
+    não tem snapshot ou a consulta falha (ex.: coluna que nunca foi gravada).
+    """
+    import duckdb
+
+    usados = [nome for nome in CONJUNTOS if "{" + nome + "}" in sql]
+    if not garantir_snapshots(*usados):
+        return None
+    cursor = _duckdb().cursor()
+    try:
+        return cursor.execute(sql.format(**{nome: _fonte(nome) for nome in CONJUNTOS}), list(parametros)).df()
+    except duckdb.Error:
+        return None
+    finally:
+        cursor.close()
+
+
+def ler_snapshot(nome, colunas=None, data_inicio=None, data_fim=None):
+    """Linhas do snapshot de um conjunto, ordenadas por Data (None se não houver snapshot)."""
+    if nome not in CONJUNTOS:
+        return None
+    selecao = ", ".join(f'"{coluna}"' for coluna in colunas) if colunas is not None else "* EXCLUDE (ano, mes)"
+    condicoes, parametros = [], []
+    if data_inicio is not None:
+        condicoes.append('"Data" >= ?')
+        parametros.append(pd.Timestamp(data_inicio))
+    if data_fim is not None:
+        condicoes.append('"Data" <= ?')
+        parametros.append(pd.Timestamp(data_fim))
+    onde = f"WHERE {' AND '.join(condicoes)}" if condicoes else ""
+    frame = consultar(f'SELECT {selecao} FROM {{{nome}}} {onde} ORDER BY "Data"', parametros)
+    return None if frame is None else compactar(frame)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Exporta as coleções para Parquet particionado por ano/mês.")
+    parser.add_argument("--completo", action="store_true", help="regrava todas as partições")
+    argumentos = parser.parse_args()
+    for nome in CONJUNTOS:
+        estado = atualizar(nome, completo=argumentos.completo)
+        print(f"{nome}: {estado['total']} documentos exportados, {len(_particoes(nome))} partições")
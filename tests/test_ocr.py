@@ -0,0 +1,164 @@
+"""
+Leitura por recortes de ocr.processar_imagem sobre as imagens de benchmarks/fixtures/ocr.
+
+O tesseract é substituído por um leitor falso que acha as palavras pelos pixels (linhas e
+espaços em branco da imagem binarizada) e devolve o texto que o gerador das imagens
+desenhou em cada linha; a posição das regiões, o rótulo ao lado e os recortes continuam
+vindo das imagens reais.
+
+Uso: python -m pytest tests
+"""
+import hashlib
+import json
+import os
+import sys
+
+import numpy as np
+import pytest
+from PIL import Image
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+import ocr  # noqa: E402
+
+PASTA = os.path.join(RAIZ, "benchmarks", "fixtures", "ocr")
+with open(os.path.join(PASTA, "esperado.json"), encoding="utf-8") as arquivo:
+    ESPERADO = json.load(arquivo)
+# Linhas dos valores no relatório (gerar_fixtures_ocr.py): depois do título e da data
+PRIMEIRA_LINHA_VALORES = 2
+# Topo (px, na largura de 1080) da linha de cada campo e a altura de cada linha
+TOPOS = {"tempo_total": 410, "calorias": 560, "bpm_medio": 710, "bpm_max": 860}
+ALTURA_LINHA = 150
+
+
+def _textos(valores, ordem=("tempo_total", "calorias", "bpm_medio", "bpm_max")):
+    horas, minutos = divmod(valores["tempo_total"], 60)
+    linhas = {
+        "tempo_total": f"{horas}:{minutos:02d}:00 Tempo total",
+        "calorias": f"{valores['calorias']} kcal Queimou",
+        "bpm_medio": f"{valores['bpm_medio']} bpm Média de frequência cardíaca",
+        "bpm_max": f"{valores['bpm_max']} bpm BPM máximo",
+    }
+    return [linhas[campo] for campo in ordem]
+
+
+def _palavras(imagem):
+    # Caixas (esquerda, topo, largura, altura) das palavras de cada linha de texto, de cima para baixo
+    preto = np.asarray(imagem) == 0
+    linhas = []
+    for topo, base in _trechos(preto.any(axis=1), 0):
+        colunas = preto[topo:base].any(axis=0)
+        # Espaço entre palavras: bem mais largo que o vão entre letras (inclusive o de "1:05")
+        palavras = []
+        for esquerda, direita in _trechos(colunas, round(0.3 * (base - topo))):
+            linha = preto[topo:base, esquerda:direita].any(axis=1).nonzero()[0]
+            palavras.append((esquerda, topo + linha[0], direita - esquerda, linha[-1] - linha[0] + 1))
+        linhas.append(palavras)
+    return linhas
+
+
+def _trechos(marcados, vao_minimo):
+    # Intervalos [início, fim) de posições marcadas, juntando os separados por menos de vao_minimo
+    trechos = []
+    for posicao in np.flatnonzero(marcados):
+        if trechos and posicao - trechos[-1][1] <= vao_minimo:
+            trechos[-1][1] = posicao + 1
+        else:
+            trechos.append([posicao, posicao + 1])
+    return [tuple(trecho) for trecho in trechos]
+
+
+class TesseractFalso:
+    """image_to_data e ler_valor sobre as palavras achadas nos pixels, com os textos registrados."""
+
+    def __init__(self):
+        self.textos = {}
+        self.paginas_lidas = 0
+
+    def registrar(self, imagem, textos):
+        self.textos[self._chave(ocr.preprocessar(imagem))] = textos
+
+    @staticmethod
+    def _chave(imagem):
+        return hashlib.sha256(imagem.tobytes()).hexdigest()
+
+    def _layout(self, imagem):
+        textos = self.textos[self._chave(imagem)]
+        layout = []
+        for numero, caixas in enumerate(_palavras(imagem)):
+            indice = numero - PRIMEIRA_LINHA_VALORES
+            palavras = textos[indice].split() if 0 <= indice < len(textos) else ["x"] * len(caixas)
+            assert len(palavras) == len(caixas), (numero, palavras, caixas)
+            layout.extend((numero, palavra, caixa) for palavra, caixa in zip(palavras, caixas))
+        return layout
+
+    def image_to_data(self, imagem, lang=None, output_type=None):
+        self.paginas_lidas += 1
+        layout = self._layout(imagem)
+        return {
+            "text": [palavra for _, palavra, _ in layout],
+            "block_num": [1] * len(layout),
+            "par_num": [1] * len(layout),
+            "line_num": [numero for numero, _, _ in layout],
+            "left": [caixa[0] for _, _, caixa in layout],
+            "top": [caixa[1] for _, _, caixa in layout],
+            "width": [caixa[2] for _, _, caixa in layout],
+            "height": [caixa[3] for _, _, caixa in layout],
+        }
+
+    def ler_valor(self, imagem, regiao):
+        # A palavra cujo centro cai no recorte
+        for _, palavra, (esquerda, topo, largura, altura) in self._layout(imagem):
+            if regiao[0] <= esquerda + largura / 2 <= regiao[2] and regiao[1] <= topo + altura / 2 <= regiao[3]:
+                return palavra
+        return ""
+
+
+@pytest.fixture
+def tesseract(monkeypatch):
+    falso = TesseractFalso()
+    monkeypatch.setattr(ocr.pytesseract, "image_to_data", falso.image_to_data)
+    monkeypatch.setattr(ocr, "ler_valor", falso.ler_valor)
+    monkeypatch.setattr(ocr, "_regioes_por_tamanho", {})
+    return falso
+
+
+def _abrir(nome):
+    return Image.open(os.path.join(PASTA, nome)).convert("RGB")
+
+
+def _trocar_linhas(imagem, campo, outro):
+    # Mesmo tamanho, outro layout: as linhas de dois campos trocam de lugar
+    trocada = imagem.copy()
+    faixas = {
+        nome: (0, TOPOS[nome] - 20, imagem.width, TOPOS[nome] - 20 + ALTURA_LINHA) for nome in (campo, outro)
+    }
+    trocada.paste(imagem.crop(faixas[campo]), faixas[outro][:2])
+    trocada.paste(imagem.crop(faixas[outro]), faixas[campo][:2])
+    return trocada
+
+
+def test_mesmo_layout_le_so_os_recortes(tesseract):
+    primeira, segunda = "relatorio_1080x2340_1.png", "relatorio_1080x2340_2.png"
+    for nome in (primeira, segunda):
+        tesseract.registrar(_abrir(nome), _textos(ESPERADO[nome]))
+
+    assert ocr.processar_imagem(_abrir(primeira)) == ESPERADO[primeira]
+    assert ocr.processar_imagem(_abrir(segunda)) == ESPERADO[segunda]
+    assert tesseract.paginas_lidas == 1
+
+
+def test_layout_diferente_refaz_a_leitura_completa(tesseract):
+    primeira, segunda = "relatorio_1080x2340_1.png", "relatorio_1080x2340_2.png"
+    tesseract.registrar(_abrir(primeira), _textos(ESPERADO[primeira]))
+    trocada = _trocar_linhas(_abrir(segunda), "bpm_medio", "bpm_max")
+    tesseract.registrar(trocada, _textos(ESPERADO[segunda], ("tempo_total", "calorias", "bpm_max", "bpm_medio")))
+
+    assert ocr.processar_imagem(_abrir(primeira)) == ESPERADO[primeira]
+    # Nas regiões guardadas, os dois BPM sairiam trocados (e ambos plausíveis)
+    regioes = ocr._regioes_por_tamanho[(ocr.LARGURA_OCR, round(2340 * ocr.LARGURA_OCR / 1080))]
+    preprocessada = ocr.preprocessar(trocada)
+    assert tesseract.ler_valor(preprocessada, regioes["bpm_medio"].valor) == str(ESPERADO[segunda]["bpm_max"])
+
+    assert ocr.processar_imagem(trocada) == ESPERADO[segunda]
+    assert tesseract.paginas_lidas == 2